@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -7,6 +8,9 @@ load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# The production_model package (shared with the AI microservice) lives next to backend/
+sys.path.append(str(BASE_DIR.parent))
+
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY")
 DEBUG = os.getenv("DJANGO_DEBUG", "True") == "True"
 
@@ -27,7 +31,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "flood.middleware.MetricsMiddleware",
     'corsheaders.middleware.CorsMiddleware',
+    "flood.middleware.AdmissionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -37,6 +43,14 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Requests shed by AdmissionMiddleware are counted in /metrics instead of logged
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {"skip_shed_requests": {"()": "flood.middleware.SkipShedRequests"}},
+    "loggers": {"django.request": {"filters": ["skip_shed_requests"]}},
+}
+
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# Load road data, model and caches in the background once the server is up
+# (importing the views does no I/O, so manage.py commands skip all of this).
+# Under production_model/gunicorn.conf.py the master preloads road data and
+# model before forking, and each worker starts the rest after the fork.
+from flood.views import preload, startup  # noqa: E402
+from production_model import prefork  # noqa: E402
+
+prefork.register(preload)
+prefork.worker_start(startup.start)
@@ -0,0 +1,221 @@
+"""
+Client for the AI microservice (production_model/app.py).
+
+When MICROSERVICE_URL is set, the predict views ask the microservice for
+the flood probability instead of running the model in every gateway
+worker.
+
+- One pooled httpx client per process: keep-alive connections, HTTP/2
+  when the `h2` package is installed and the server negotiates it (TLS).
+  It is created on first use in each process, so gunicorn workers forked
+  from a preloading master (production_model/prefork.py) never share
+  connection-pool state.
+- Identical requests in flight at the same time are coalesced: one HTTP
+  call, every caller gets its answer.
+- `predict_many` scores several rows with one POST /predict/batch.
+- Failures fall back to the local model, and a circuit breaker stops
+  calling the service for a while after repeated failures, so an outage
+  costs one fast local prediction per request instead of a timeout.
+
+Configuration (environment variables):
+  MICROSERVICE_URL            base URL, e.g. https://ai.example.com/api ("" = local model)
+  MICROSERVICE_TIMEOUT        seconds per call (default 2)
+  MICROSERVICE_MAX_CONNECTIONS  pool size (default 20)
+  MICROSERVICE_BREAKER_FAILURES consecutive failures that open the breaker (default 5)
+  MICROSERVICE_BREAKER_RESET    seconds the breaker stays open (default 30)
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import httpx
+
+from production_model.feature_store import api_name
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling the service while the breaker is open."""
+
+
+class CircuitBreaker:
+    """closed -> open after `failures` consecutive errors -> half-open after `reset` s."""
+
+    def __init__(self, failures=5, reset=30.0):
+        self.failures = failures
+        self.reset = reset
+        self.consecutive = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset else "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self._trial):
+                raise CircuitOpen("AI microservice circuit is open")
+            if state == "half-open":
+                self._trial = True  # let exactly one probe through
+
+    def record(self, ok):
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.consecutive, self.opened_at = 0, None
+                return
+            self.consecutive += 1
+            if self.opened_at is not None or self.consecutive >= self.failures:
+                self.opened_at = time.monotonic()
+
+
+class AIClient:
+    def __init__(self, base_url, fallback=None, timeout=None, max_connections=None,
+                 breaker=None, transport=None):
+        """
+        fallback:  called as fallback(values, city) when the service fails
+        transport: optional httpx transport (tests / local stand-ins)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.fallback = fallback
+        self.timeout = float(os.getenv("MICROSERVICE_TIMEOUT", "2")) if timeout is None else timeout
+        self.max_connections = int(os.getenv("MICROSERVICE_MAX_CONNECTIONS", "20")) \
+            if max_connections is None else max_connections
+        self.transport = transport
+        self._http = None
+        self._pid = None
+        self.breaker = breaker or CircuitBreaker(
+            failures=int(os.getenv("MICROSERVICE_BREAKER_FAILURES", "5")),
+            reset=float(os.getenv("MICROSERVICE_BREAKER_RESET", "30")),
+        )
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "coalesced": 0, "failures": 0, "fallbacks": 0, "short_circuited": 0}
+
+    @property
+    def http(self):
+        """This process's pooled httpx client (a forked child builds its own)."""
+        self._ensure_process()
+        return self._http
+
+    def _ensure_process(self):
+        """
+        Build the client and in-flight table on first use in this process.
+        Callers register in-flight requests only after this, so the reset
+        can never drop a live entry.
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._http = httpx.Client(
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                        limits=httpx.Limits(max_connections=self.max_connections,
+                                            max_keepalive_connections=self.max_connections),
+                        http2=HTTP2 and self.transport is None,
+                        transport=self.transport,
+                    )
+                    self._inflight = {}
+                    self._pid = os.getpid()
+
+    @staticmethod
+    def payload(values, city=None):
+        """Request body for /predict: API field names, unset features left out."""
+        body = {api_name(key): value for key, value in values.items() if value is not None}
+        if city:
+            body["city"] = city
+        return body
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _post(self, path, body):
+        self.breaker.before_call()
+        self._count("calls")
+        try:
+            response = self.http.post(path, json=body)
+        except httpx.HTTPError:
+            self.breaker.record(False)
+            raise
+        # A rejected request (4xx) says nothing about the service's health
+        self.breaker.record(response.status_code < 500)
+        response.raise_for_status()
+        return response.json()
+
+    def _remote_probability(self, values, city):
+        """Coalesced POST /predict; raises on failure."""
+        body = self.payload(values, city)
+        key = json.dumps(body, sort_keys=True)
+        self._ensure_process()
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.counters["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            prob = float(self._post("/predict", body)["flood_probability"])
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(prob)
+            return prob
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _fall_back(self, error, compute):
+        if isinstance(error, CircuitOpen):
+            self._count("short_circuited")
+        else:
+            self._count("failures")
+            print("[ai_client] Microservice call failed, using local model:", error)
+        if self.fallback is None:
+            return None
+        self._count("fallbacks")
+        return compute()
+
+    def predict(self, values, city=None):
+        """P(flood) from the microservice, or the local fallback."""
+        try:
+            return self._remote_probability(values, city)
+        except Exception as e:
+            return self._fall_back(e, lambda: self.fallback(values, city))
+
+    def predict_many(self, rows):
+        """P(flood) for [(values, city), ...] with one /predict/batch call."""
+        if not rows:
+            return []
+        body = {"rows": [self.payload(values, city) for values, city in rows]}
+        try:
+            return [float(p) for p in self._post("/predict/batch", body)["flood_probabilities"]]
+        except Exception as e:
+            return self._fall_back(e, lambda: [self.fallback(values, city) for values, city in rows])
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, breaker=self.breaker.state, base_url=self.base_url, http2=HTTP2)
+
+    def close(self):
+        if self._http is not None and self._pid == os.getpid():
+            self._http.close()
+        self._http = self._pid = None
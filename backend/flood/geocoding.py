@@ -0,0 +1,268 @@
+"""
+Tiered reverse geocoding.
+
+Lookups go through, in order:
+  1. an in-process LRU keyed on a quantized lat/lon cell,
+  2. a persistent SQLite cache shared by every worker on the host,
+  3. Nominatim (skipped entirely in offline mode),
+  4. an offline gazetteer of Metro Manila cities and known road records.
+
+Configuration (environment variables):
+  GEOCODER_OFFLINE        "1"/"true" to never touch the network
+  GEOCODE_CELL_DECIMALS   lat/lon rounding for cache keys (default 3, ~110 m)
+  GEOCODE_LRU_SIZE        in-process cache entries (default 4096)
+  GEOCODE_CACHE_PATH      SQLite file ("" disables the disk tier)
+  GEOCODE_DISK_TTL        seconds before a disk entry is refreshed (default 30 days)
+  GEOCODE_TIMEOUT         Nominatim timeout in seconds (default 10)
+  GEOCODE_RETRY_AFTER     seconds an offline answer given because Nominatim
+                          failed is cached before retrying (default 60)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from production_model.cities import CITY_CENTROIDS
+
+from .spatial import RoadIndex, haversine_m
+
+
+# Road records further than this from the query point are not used as "road"
+OFFLINE_ROAD_RADIUS_M = 250
+
+
+def env_flag(name, default="false"):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def nominatim_lookup(lat, lon, timeout=10):
+    """Single Nominatim reverse call. Returns None when nothing is found."""
+    from geopy.geocoders import Nominatim
+
+    location = Nominatim(user_agent="flood_app").reverse((lat, lon), timeout=timeout)
+    if not location:
+        return None
+    addr = location.raw.get("address", {})
+    return {
+        "city": addr.get("city") or addr.get("town") or addr.get("municipality"),
+        "road": addr.get("road"),
+        "neighborhood": addr.get("suburb") or addr.get("neighbourhood"),
+        "full_address": location.address,
+    }
+
+
+class Gazetteer:
+    """Offline reverse geocoder built from city centroids and road records."""
+
+    def __init__(self, road_data=None, road_index=None):
+        """road_index: a RoadIndex already built over road_data, to share instead of rebuilding."""
+        centroids = dict(CITY_CENTROIDS)
+        self.road_data = road_data if road_data is not None else pd.DataFrame()
+        self.road_index = road_index if road_index is not None else RoadIndex(self.road_data)
+
+        # Prefer centroids derived from our own road coordinates when we have them
+        if len(self.road_index) and "City" in self.road_data.columns:
+            cities = self.road_data["City"].iloc[self.road_index.positions].to_numpy()
+            for city in pd.unique(cities):
+                mask = cities == city
+                centroids[city] = (
+                    float(self.road_index.lat[mask].mean()),
+                    float(self.road_index.lon[mask].mean()),
+                )
+
+        self.city_names = list(centroids)
+        self.city_lat = np.array([c[0] for c in centroids.values()])
+        self.city_lon = np.array([c[1] for c in centroids.values()])
+
+    def reverse(self, lat, lon):
+        distances = haversine_m(lat, lon, self.city_lat, self.city_lon)
+        city = self.city_names[int(np.argmin(distances))]
+
+        road = None
+        positions, _ = self.road_index.query_radius(lat, lon, OFFLINE_ROAD_RADIUS_M)
+        if len(positions) and "Location" in self.road_data.columns:
+            nearest = self.road_data.iloc[positions[0]]
+            road = nearest["Location"]
+            city = nearest.get("City", city)
+
+        return {
+            "city": city,
+            "road": road,
+            "neighborhood": None,
+            "full_address": ", ".join(p for p in (road, city) if p),
+        }
+
+
+class DiskCache:
+    """SQLite-backed cache; safe to share between worker processes."""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "cell TEXT PRIMARY KEY, result TEXT, created REAL)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection opened before a fork (preloading master) stays with the parent
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, cell):
+        row = self._conn().execute(
+            "SELECT result, created FROM geocode WHERE cell = ?", (cell,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def set(self, cell, result):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode (cell, result, created) VALUES (?, ?, ?)",
+                (cell, json.dumps(result), time.time()),
+            )
+
+
+class Geocoder:
+    def __init__(self, gazetteer=None, offline=None, cell_decimals=None,
+                 lru_size=None, cache_path=None, disk_ttl=None, timeout=None,
+                 retry_after=None, network_lookup=nominatim_lookup):
+        self.gazetteer = gazetteer or Gazetteer()
+        self.offline = env_flag("GEOCODER_OFFLINE") if offline is None else offline
+        self.cell_decimals = int(os.getenv("GEOCODE_CELL_DECIMALS", "3")) if cell_decimals is None else cell_decimals
+        self.lru_size = int(os.getenv("GEOCODE_LRU_SIZE", "4096")) if lru_size is None else lru_size
+        self.timeout = float(os.getenv("GEOCODE_TIMEOUT", "10")) if timeout is None else timeout
+        self.retry_after = float(os.getenv("GEOCODE_RETRY_AFTER", "60")) if retry_after is None else retry_after
+        self.network_lookup = network_lookup
+
+        if cache_path is None:
+            cache_path = os.getenv(
+                "GEOCODE_CACHE_PATH",
+                os.path.join(os.path.dirname(__file__), "..", "geocode_cache.sqlite3"),
+            )
+        disk_ttl = float(os.getenv("GEOCODE_DISK_TTL", str(30 * 24 * 3600))) if disk_ttl is None else disk_ttl
+        self.disk = None
+        if cache_path:
+            try:
+                self.disk = DiskCache(cache_path, disk_ttl)
+            except sqlite3.Error as e:
+                print("[geocode] Disk cache disabled:", e)
+
+        self._lru = OrderedDict()  # cell -> (result, expires_at or None)
+        self._lock = threading.Lock()
+        self.counters = {
+            "lru_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "network_calls": 0,
+            "network_errors": 0,
+            "offline_lookups": 0,
+        }
+
+    def cell(self, lat, lon):
+        return f"{round(float(lat), self.cell_decimals)},{round(float(lon), self.cell_decimals)}"
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _remember(self, cell, result, ttl=None):
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._lru[cell] = (result, expires)
+            self._lru.move_to_end(cell)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def reverse(self, lat, lon, network=True):
+        """
+        Return an area dict for (lat, lon), or None when nothing is known.
+        network=False (load shedding) skips Nominatim; the offline answer is
+        then not cached, so a later lookup can still ask Nominatim.
+        """
+        cell = self.cell(lat, lon)
+
+        with self._lock:
+            entry = self._lru.get(cell)
+            if entry is not None:
+                if entry[1] is None or entry[1] > time.monotonic():
+                    self._lru.move_to_end(cell)
+                    self.counters["lru_hits"] += 1
+                    return entry[0]
+                del self._lru[cell]
+
+        if self.disk is not None:
+            try:
+                result = self.disk.get(cell)
+            except sqlite3.Error as e:
+                print("[geocode] Disk cache read failed:", e)
+                result = None
+            if result is not None:
+                self._count("disk_hits")
+                self._remember(cell, result)
+                return result
+
+        self._count("misses")
+        failed = False
+        if network and not self.offline:
+            self._count("network_calls")
+            try:
+                result = self.network_lookup(lat, lon, timeout=self.timeout)
+            except Exception as e:
+                print("[reverse_geocode] Error:", e)
+                self._count("network_errors")
+                failed = True
+            else:
+                if result is not None:
+                    self._remember(cell, result)
+                    if self.disk is not None:
+                        try:
+                            self.disk.set(cell, result)
+                        except sqlite3.Error as e:
+                            print("[geocode] Disk cache write failed:", e)
+                    return result
+
+        # Offline answers are never persisted to disk. They stay in the LRU
+        # for good in offline mode or when Nominatim found nothing; after a
+        # Nominatim error only for retry_after seconds, so the cell is looked
+        # up online again once the service recovers. Shed lookups
+        # (network=False) are not cached at all.
+        self._count("offline_lookups")
+        result = self.gazetteer.reverse(lat, lon)
+        if failed:
+            self._remember(cell, result, ttl=self.retry_after)
+        elif network or self.offline:
+            self._remember(cell, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, lru_size=len(self._lru), offline=self.offline)
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """Process-wide Geocoder, created on first use."""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = Geocoder()
+    return _geocoder
@@ -0,0 +1,121 @@
+"""
+- MetricsMiddleware: latency histogram per route for /metrics, and the
+  opt-in per-request sampling profiler (see production_model/profiler.py).
+- AdmissionMiddleware: admission control for the predict views (see
+  production_model/admission.py).
+
+Both work in both modes: under ASGI they stay async, so Django does not
+run async views (predict_async) through a single sync thread.
+
+- SkipShedRequests: logging filter (see LOGGING in settings.py) that drops
+  django.request's error line for requests AdmissionMiddleware shed;
+  they are counted in /metrics, and a line each would flood the log in a
+  burst.
+"""
+
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import JsonResponse
+from django.urls import reverse
+
+from production_model import metrics, profiler
+from production_model.admission import Overloaded
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if profiler.requested(request.headers.get(profiler.HEADER)):
+            with profiler.SamplingProfiler() as prof:
+                response = self.get_response(request)
+            response[profiler.HEADER] = f"{prof.save(request.path)}; samples={prof.samples}"
+        else:
+            response = self.get_response(request)
+        return self.observe(request, response, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        if profiler.requested(request.headers.get(profiler.HEADER)):
+            # Samples the event loop thread
+            with profiler.SamplingProfiler() as prof:
+                response = await self.get_response(request)
+            response[profiler.HEADER] = f"{prof.save(request.path)}; samples={prof.samples}"
+        else:
+            response = await self.get_response(request)
+        return self.observe(request, response, start)
+
+    @staticmethod
+    def observe(request, response, start):
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match is not None else "unmatched"
+        metrics.observe_request("backend", request.method, route, response.status_code,
+                                time.perf_counter() - start)
+        return response
+
+
+class AdmissionMiddleware:
+    """
+    Holds an admission slot of flood.views.predict_admission for each
+    predict request and hands the view its Ticket as `request.admission`.
+    It sits ahead of the session/auth/CSRF middleware, so a shed request
+    costs next to nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from . import views
+
+        self.get_response = get_response
+        self.views = views
+        self.paths = {reverse("predict"), reverse("predict-async")}
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.path not in self.paths:
+            return self.get_response(request)
+        try:
+            with self.views.predict_admission.admit() as ticket:
+                request.admission = ticket
+                return self.get_response(request)
+        except Overloaded as e:
+            return self.overloaded(request, e)
+
+    async def __acall__(self, request):
+        if request.path not in self.paths:
+            return await self.get_response(request)
+        try:
+            async with self.views.predict_admission.admit_async() as ticket:
+                request.admission = ticket
+                return await self.get_response(request)
+        except Overloaded as e:
+            return self.overloaded(request, e)
+
+    @staticmethod
+    def overloaded(request, e):
+        request.shed = True  # see SkipShedRequests
+        response = JsonResponse({"error": "server busy, retry later", "reason": e.reason}, status=503)
+        response["Retry-After"] = str(e.retry_after)
+        return response
+
+
+class SkipShedRequests(logging.Filter):
+    def filter(self, record):
+        return not getattr(getattr(record, "request", None), "shed", False)
@@ -0,0 +1,159 @@
+"""
+Compact, memory-mapped copy of the road dataset.
+
+The flood-report CSV is parsed once into a directory of .npy columns,
+keyed by the CSV's content hash:
+
+  ROAD_STORE_DIR/roads-<sha256 prefix>/meta.json, c0.npy, c1.npy, ...
+
+- String columns (City, Location, Passability, Road_Sector, ...) are
+  dictionary-encoded: one small integer code per row plus the distinct
+  values in meta.json.
+- Flood Type/Depth codes follow DEPTH_LEVELS (shallowest first), so a
+  depth code is also a depth rank; labels outside the list come after it.
+- datetime is parsed once into datetime64[ns] (NaT when unparseable).
+- Numeric columns (latitude, longitude) are float64.
+
+`load_compact` maps the files read-only (np.load(mmap_mode="r")) and
+wraps them in a DataFrame of categoricals without copying, so every
+gunicorn worker shares one copy of the column data through the page cache
+and only the first worker to see a new CSV pays for parsing it. The
+directory is written under a temp name and renamed into place, so
+workers never map a half-written store.
+
+Configuration (environment variables):
+  ROAD_STORE_DIR   where stores live (default <ARTIFACT_CACHE_DIR>/roads)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from production_model.artifacts import DEFAULT_CACHE_DIR
+
+FORMAT_VERSION = 1
+TIME_COLUMN = "datetime"
+DEPTH_COLUMN = "Flood Type/Depth"
+
+# MMDA flood gauge labels, shallowest first
+DEPTH_LEVELS = [
+    "Subsided", "Half Gutter Deep", "Gutter Deep", "Above Gutter Deep", "Half Knee Deep",
+    "Half Tire Deep", "Knee Deep", "Tire Deep", "Knee-Waist Deep", "Waist Deep",
+    "Chest Deep", "4 Feet Deep", "6 Feet Deep", "Flooded",
+]
+
+
+def default_store_dir():
+    return os.getenv("ROAD_STORE_DIR") or os.path.join(
+        os.getenv("ARTIFACT_CACHE_DIR", DEFAULT_CACHE_DIR), "roads")
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def format_timestamp(value):
+    """'YYYY-MM-DD HH:MM:SS' (the CSV's own format), or None for missing times."""
+    return None if pd.isna(value) else pd.Timestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def compact_frame(df):
+    """Typed copy of a raw road DataFrame: categoricals, datetime64, float64."""
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if name == TIME_COLUMN:
+            columns[name] = pd.to_datetime(series, errors="coerce").astype("datetime64[ns]")
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            columns[name] = series.astype(np.float64)
+        else:
+            values = series.astype(object).where(series.notna(), None)
+            values = values.map(lambda v: v if v is None else str(v))
+            present = pd.unique(values.dropna())
+            if name == DEPTH_COLUMN:
+                categories = DEPTH_LEVELS + sorted(set(present) - set(DEPTH_LEVELS))
+            else:
+                categories = sorted(present)
+            columns[name] = pd.Categorical(values, categories=categories)
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+
+
+def write_store(frame, path, source_sha256=None):
+    """Write a compact_frame() result as .npy columns + meta.json into `path`."""
+    os.makedirs(path, exist_ok=True)
+    meta = {"version": FORMAT_VERSION, "rows": len(frame), "source_sha256": source_sha256, "columns": []}
+    for i, name in enumerate(frame.columns):
+        series = frame[name]
+        entry = {"name": name, "file": f"c{i}.npy"}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # pandas' own code dtype, so from_codes can wrap the map without a copy
+            entry.update(kind="category", categories=[str(c) for c in series.cat.categories])
+            data = series.cat.codes.to_numpy()
+        elif name == TIME_COLUMN:
+            entry["kind"] = "datetime"
+            data = series.to_numpy(dtype="datetime64[ns]")
+        else:
+            entry["kind"] = "float"
+            data = series.to_numpy(dtype=np.float64)
+        np.save(os.path.join(path, entry["file"]), np.ascontiguousarray(data))
+        meta["columns"].append(entry)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def read_store(path):
+    """DataFrame over the memory-mapped columns of a store directory."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    columns = {}
+    for entry in meta["columns"]:
+        data = np.load(os.path.join(path, entry["file"]), mmap_mode="r")
+        if entry["kind"] == "category":
+            dtype = pd.CategoricalDtype(entry["categories"])
+            columns[entry["name"]] = pd.Categorical.from_codes(data, dtype=dtype, validate=False)
+        else:
+            columns[entry["name"]] = data
+    return pd.DataFrame(columns, index=pd.RangeIndex(meta["rows"]), copy=False)
+
+
+def load_compact(csv_path, store_dir=None):
+    """
+    Road data for `csv_path` as a memory-mapped compact DataFrame, building
+    the store on first use.
+    """
+    store_dir = store_dir or default_store_dir()
+    digest = file_digest(csv_path)
+    path = os.path.join(store_dir, f"roads-{digest[:16]}-v{FORMAT_VERSION}")
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        os.makedirs(store_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".tmp-", dir=store_dir)
+        try:
+            write_store(compact_frame(pd.read_csv(csv_path)), staging, source_sha256=digest)
+            os.rename(staging, path)
+            print(f"[road_store] Built compact road store {os.path.basename(path)}.")
+        except OSError:
+            # Another worker renamed its copy into place first
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.exists(os.path.join(path, "meta.json")):
+                raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        _prune(store_dir, keep=os.path.basename(path))
+    return read_store(path)
+
+
+def _prune(store_dir, keep):
+    """Remove stores of older CSVs (workers still mapping them keep valid pages)."""
+    for name in os.listdir(store_dir):
+        if name.startswith("roads-") and name != keep:
+            shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
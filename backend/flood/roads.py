@@ -0,0 +1,204 @@
+"""
+Pre-serialized, columnar payloads for the /roads endpoint.
+
+Every distinct value of every column of road_data is JSON-encoded once when
+the data is loaded; rows keep only a small integer code per column (the
+categorical codes themselves when road_data is the compact store, see
+road_store.py), and float columns keep their numbers. A request then only
+looks up and joins ready-made strings: filters map to precomputed row
+positions, pagination is a cursor into those positions, and rendered pages
+are cached (raw + gzip) under an ETag that changes whenever road_data does.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Output field -> (source column, default when the column is missing)
+ROAD_FIELDS = {
+    "road_sector": ("Road_Sector", "Unknown"),
+    "city": ("City", "Unknown"),
+    "location": ("Location", None),
+    "flood_depth": ("Flood Type/Depth", None),
+    "passability": ("Passability", None),
+    "datetime": ("datetime", None),
+    "latitude": ("latitude", None),
+    "longitude": ("longitude", None),
+}
+DEFAULT_FIELDS = ["road_sector", "city", "latitude", "longitude"]
+
+# Query parameter -> source column it filters on
+FILTERS = {"city": "City", "road_sector": "Road_Sector"}
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+RENDER_CACHE_SIZE = 64
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+class EncodedColumn:
+    """
+    One output field. Non-float columns: the JSON text of each distinct
+    value plus one code per row (-1 = missing). Float columns: the values,
+    formatted when a page is rendered.
+    """
+
+    def __init__(self, series, default=None):
+        self.missing = json.dumps(default)
+        if pd.api.types.is_float_dtype(series):
+            self.lookup, self.data = None, series.to_numpy(dtype=float)
+            return
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+            codes = codes.astype(np.int32)
+        self.lookup = [json.dumps(v, default=str) for v in uniques.tolist()] + [self.missing]
+        self.data = codes
+
+    @classmethod
+    def constant(cls, default, n_rows):
+        """A column road_data lacks: `default` on every row."""
+        column = cls.__new__(cls)
+        column.missing = json.dumps(default)
+        column.lookup = [column.missing]
+        column.data = np.full(n_rows, -1, dtype=np.int8)
+        return column
+
+    def encode(self, rows):
+        """JSON texts for `rows` (a slice or an array of positions)."""
+        picked = self.data[rows].tolist()
+        if self.lookup is None:
+            missing = self.missing
+            return [repr(v) if math.isfinite(v) else missing for v in picked]
+        lookup = self.lookup
+        return [lookup[c] for c in picked]
+
+    def update_digest(self, digest):
+        digest.update("\x1f".join(self.lookup or [self.missing]).encode())
+        digest.update(np.ascontiguousarray(self.data).tobytes())
+
+
+class RoadsPayload:
+    def __init__(self, df):
+        df = df if df is not None else pd.DataFrame()
+        self.n_rows = len(df)
+
+        self.columns = {}
+        for field, (source, default) in ROAD_FIELDS.items():
+            if source in df.columns:
+                self.columns[field] = EncodedColumn(df[source], default)
+            else:
+                self.columns[field] = EncodedColumn.constant(default, self.n_rows)
+        self.version = self._fingerprint(self.columns)
+
+        # Row positions per filter value, in dataset order
+        self.filter_positions = {}
+        for param, source in FILTERS.items():
+            if source in df.columns:
+                codes, uniques = pd.factorize(df[source])
+                order = np.argsort(codes, kind="stable")
+                bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+                self.filter_positions[param] = {
+                    value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(uniques)
+                }
+            else:
+                self.filter_positions[param] = {}
+
+        self._rendered = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(columns):
+        """Content hash of the encoded output; changes whenever road_data does."""
+        digest = hashlib.sha1()
+        for field, column in columns.items():
+            digest.update(field.encode())
+            column.update_digest(digest)
+        return digest.hexdigest()[:16]
+
+    def _encode_cursor(self, offset):
+        raw = json.dumps({"v": self.version, "o": offset}).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(raw)
+            version, offset = data["v"], int(data["o"])
+        except (ValueError, KeyError, TypeError):
+            raise InvalidQuery("malformed cursor")
+        if version != self.version:
+            raise InvalidQuery("cursor is stale; road data has changed, restart pagination")
+        return max(offset, 0)
+
+    def normalize(self, params):
+        """Validate query params and return a hashable cache key."""
+        fields = params.get("fields")
+        fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else DEFAULT_FIELDS
+        unknown = [f for f in fields if f not in ROAD_FIELDS]
+        if unknown:
+            raise InvalidQuery(f"unknown fields: {unknown}")
+
+        try:
+            limit = int(params.get("limit", DEFAULT_PAGE_SIZE))
+        except (TypeError, ValueError):
+            raise InvalidQuery("limit must be an integer")
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+
+        cursor = params.get("cursor")
+        offset = self._decode_cursor(cursor) if cursor else 0
+        filters = tuple((p, params[p]) for p in FILTERS if params.get(p))
+        return tuple(fields), filters, offset, limit
+
+    def _positions(self, filters):
+        positions = None
+        for param, value in filters:
+            matched = self.filter_positions[param].get(value, np.empty(0, dtype=np.intp))
+            positions = matched if positions is None else np.intersect1d(positions, matched)
+        return positions
+
+    def _render(self, key):
+        fields, filters, offset, limit = key
+        positions = self._positions(filters)
+        total = self.n_rows if positions is None else len(positions)
+        end = min(offset + limit, total)
+
+        rows = slice(offset, end) if positions is None else positions[offset:end]
+        parts = [f'"{field}":[{",".join(self.columns[field].encode(rows))}]' for field in fields]
+
+        next_cursor = json.dumps(self._encode_cursor(end)) if end < total else "null"
+        body = (
+            f'{{"version":"{self.version}","count":{total},"offset":{offset},'
+            f'"fields":{json.dumps(list(fields))},"data":{{{",".join(parts)}}},'
+            f'"next_cursor":{next_cursor}}}'
+        ).encode()
+
+        etag = '"%s"' % hashlib.sha1(self.version.encode() + repr(key).encode()).hexdigest()[:20]
+        return body, gzip.compress(body, compresslevel=6), etag
+
+    def render(self, params):
+        """Return (body, gzipped_body, etag) for the given query params."""
+        key = self.normalize(params)
+        with self._lock:
+            cached = self._rendered.get(key)
+            if cached is not None:
+                self._rendered.move_to_end(key)
+                return cached
+
+        rendered = self._render(key)
+        with self._lock:
+            self._rendered[key] = rendered
+            while len(self._rendered) > RENDER_CACHE_SIZE:
+                self._rendered.popitem(last=False)
+        return rendered
@@ -0,0 +1,120 @@
+"""
+Precomputed (City, Location) -> flood severity index.
+
+All reports are sorted once by (City, Location, time) into two flat numpy
+arrays (int64 times, float64 depth scores); each key maps to its slice of
+them. "Latest severity" is a constant-time lookup and "severity as of
+time t" is a binary search. New reports can be appended without a rebuild
+(only the affected key's arrays are copied).
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+DEPTH_SCORES = {
+    "Gutter Deep": 0.3,
+    "Knee Deep": 0.5,
+    "Waist Deep": 0.7,
+    "Flooded": 1.0
+}
+
+LOCAL_TZ = "Asia/Manila"
+
+# Reports without a parseable time sort before every timed report
+MISSING_TIME = np.iinfo(np.int64).min
+
+
+def severity_label(score):
+    if score >= 0.7:
+        return "Severe"
+    elif score >= 0.4:
+        return "Moderate"
+    elif score > 0:
+        return "Light"
+    return "No Flood"
+
+
+def to_time_key(when):
+    """
+    Convert a datetime-like value into int64 nanoseconds of naive Manila
+    local time, the convention used by the flood report CSVs.
+    Raises ValueError when `when` cannot be parsed.
+    """
+    ts = pd.Timestamp(when)
+    if pd.isna(ts):
+        raise ValueError(f"Invalid timestamp: {when!r}")
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(LOCAL_TZ).tz_localize(None)
+    return ts.value
+
+
+class SeverityIndex:
+    def __init__(self):
+        self._series = {}  # (city, location) -> (times, scores), both sorted by time
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dataframe(cls, df):
+        index = cls()
+        required = {"City", "Location", "Flood Type/Depth"}
+        if df is None or df.empty or not required.issubset(df.columns):
+            return index
+
+        times = pd.to_datetime(df["datetime"], errors="coerce") if "datetime" in df.columns \
+            else pd.Series(pd.NaT, index=df.index)
+        time_keys = times.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        time_keys[times.isna().to_numpy()] = MISSING_TIME
+
+        # Works on plain and categorical columns; scores are looked up per distinct label
+        depth_codes, depths = pd.factorize(df["Flood Type/Depth"])
+        depth_scores = np.array([DEPTH_SCORES.get(d, 0) for d in depths] + [0], dtype=float)
+        scores = depth_scores[depth_codes]
+        city_codes, cities = pd.factorize(df["City"])
+        location_codes, locations = pd.factorize(df["Location"])
+
+        # Reports without a city or location cannot be looked up
+        keep = np.flatnonzero((city_codes >= 0) & (location_codes >= 0))
+        # lexsort is stable: CSV order is kept for reports sharing a timestamp
+        order = keep[np.lexsort((time_keys[keep], location_codes[keep], city_codes[keep]))]
+        pair = city_codes[order].astype(np.int64) * len(locations) + location_codes[order]
+        all_times, all_scores = time_keys[order], scores[order]
+
+        bounds = np.flatnonzero(np.diff(pair)) + 1
+        for start, stop in zip([0, *bounds.tolist()], [*bounds.tolist(), len(order)]):
+            row = order[start]
+            key = (cities[city_codes[row]], locations[location_codes[row]])
+            index._series[key] = (all_times[start:stop], all_scores[start:stop])
+        return index
+
+    def __len__(self):
+        return len(self._series)
+
+    def append(self, city, location, depth, when=None):
+        """Add one flood report; keeps the key's arrays time-sorted."""
+        key = (city, location)
+        time_key = MISSING_TIME if when is None else to_time_key(when)
+        score = DEPTH_SCORES.get(depth, 0)
+        with self._lock:
+            times, scores = self._series.get(key, (np.empty(0, np.int64), np.empty(0)))
+            pos = int(np.searchsorted(times, time_key, side="right"))
+            # One tuple swap, so readers never pair new times with old scores
+            self._series[key] = (np.insert(times, pos, time_key), np.insert(scores, pos, score))
+
+    def score(self, city, location, as_of=None):
+        """Depth score of the most recent report at or before `as_of` (None if none)."""
+        series = self._series.get((city, location))
+        if series is None or not len(series[0]):
+            return None
+        times, scores = series
+        if as_of is None:
+            return float(scores[-1])
+        pos = int(np.searchsorted(times, to_time_key(as_of), side="right"))
+        return float(scores[pos - 1]) if pos else None
+
+    def lookup(self, city, location, as_of=None):
+        score = self.score(city, location, as_of)
+        if score is None:
+            return {"score": 0, "severity": "No Flood"}
+        return {"score": score, "severity": severity_label(score)}
@@ -0,0 +1,72 @@
+"""
+Spatial index over road records for "what is within R meters of this point"
+queries.
+
+Points are projected onto the unit sphere and stored in a KD-tree, so a
+great-circle radius becomes a straight-line (chord) radius and each query
+only touches nearby records instead of scanning the whole dataset.
+"""
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def to_unit_xyz(lat, lon):
+    """Convert degrees lat/lon into 3D points on the unit sphere."""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in meters."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class RoadIndex:
+    """KD-tree over the rows of a road DataFrame that carry coordinates."""
+
+    def __init__(self, df, lat_col="latitude", lon_col="longitude"):
+        from scipy.spatial import cKDTree  # deferred: slow to import, only needed once data loads
+
+        if df is None or lat_col not in df.columns or lon_col not in df.columns:
+            coords = pd.DataFrame({lat_col: [], lon_col: []})
+        else:
+            coords = df[[lat_col, lon_col]].apply(pd.to_numeric, errors="coerce")
+        valid = coords.notna().all(axis=1).to_numpy()
+
+        # Positional row numbers into the source DataFrame
+        self.positions = np.flatnonzero(valid)
+        self.lat = coords[lat_col].to_numpy(dtype=float)[valid]
+        self.lon = coords[lon_col].to_numpy(dtype=float)[valid]
+        self.tree = cKDTree(to_unit_xyz(self.lat, self.lon)) if len(self.positions) else None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def query_radius(self, lat, lon, radius_m):
+        """
+        Return (positions, distances_m) of records within radius_m of the point,
+        sorted by distance. Positions index the source DataFrame via iloc.
+        """
+        if self.tree is None or radius_m < 0:
+            return np.empty(0, dtype=int), np.empty(0)
+
+        # Great-circle radius -> chord length on the unit sphere
+        angle = min(radius_m / EARTH_RADIUS_M, np.pi)
+        chord = 2 * np.sin(angle / 2)
+        hits = np.asarray(
+            self.tree.query_ball_point(to_unit_xyz(lat, lon)[0], chord), dtype=int
+        )
+        if len(hits) == 0:
+            return np.empty(0, dtype=int), np.empty(0)
+
+        distances = haversine_m(lat, lon, self.lat[hits], self.lon[hits])
+        order = np.argsort(distances, kind="stable")
+        return self.positions[hits[order]], distances[order]
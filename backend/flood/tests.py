@@ -1,3 +1,924 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import types
+from datetime import datetime
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import numpy as np
+import pandas as pd
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase
+from django.urls import reverse
+from django.utils.log import log_response
+
+from benchmarks.fakes import FakeBucket, FakeStorage
+from production_model import feature_store, heatmap, pipeline, preprocess, scraper
+from production_model.admission import AdmissionControl, Overloaded, Ticket
+from production_model.artifacts import ArtifactCache
+from production_model.batching import MicroBatcher, QueueFull
+from production_model.compiled_model import CompiledEnsemble, compile_model
+from production_model.feature_store import FEATURE_COLUMNS, STORE_FEATURES, LatestFeatures
+from production_model.jobs import RetrainJobs
+from production_model.prediction_cache import PredictionCache
+from production_model.stages import Pipeline, Stage
+
+from . import views
+from .ai_client import AIClient, CircuitBreaker
+from .geocoding import Gazetteer, Geocoder
+from .middleware import AdmissionMiddleware
+from .roads import InvalidQuery, RoadsPayload
+from .severity import SeverityIndex
+from .spatial import RoadIndex, haversine_m
+
+
+def training_set(rows=400, features=14, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, features))
+    y = (X[:, 0] + 0.5 * X[:, 3] - X[:, 7] + rng.normal(scale=0.5, size=rows) > 0).astype(int)
+    return X, y
+
+
+class CompiledModelTests(SimpleTestCase):
+    """The compiled ensemble must give sklearn's probabilities, row for row."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+        from sklearn.tree import DecisionTreeClassifier
+
+        cls.X, y = training_set()
+        cls.X_eval, _ = training_set(rows=50, seed=1)
+        cls.models = [
+            RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(cls.X, y),
+            GradientBoostingClassifier(n_estimators=30, max_depth=3, random_state=0).fit(cls.X, y),
+            DecisionTreeClassifier(max_depth=8, random_state=0).fit(cls.X, y),
+        ]
+
+    def test_matches_sklearn(self):
+        for model in self.models:
+            with self.subTest(model=type(model).__name__):
+                compiled = compile_model(model)
+                self.assertIsInstance(compiled, CompiledEnsemble)
+                self.assertTrue(np.allclose(compiled.predict_proba(self.X_eval), model.predict_proba(self.X_eval)))
+                np.testing.assert_array_equal(compiled.predict(self.X_eval), model.predict(self.X_eval))
+
+    def test_single_row(self):
+        for model in self.models:
+            with self.subTest(model=type(model).__name__):
+                compiled = compile_model(model)
+                row = self.X_eval[:1]
+                self.assertTrue(np.allclose(compiled.predict_proba(row), model.predict_proba(row)))
+                self.assertTrue(np.allclose(compiled.predict_proba(row[0]), model.predict_proba(row)))
+
+    def test_save_and_load(self):
+        compiled = compile_model(self.models[0])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "compiled.npz")
+            compiled.save(path)
+            reloaded = CompiledEnsemble.load(path)
+            self.assertTrue(np.allclose(reloaded.predict_proba(self.X_eval), compiled.predict_proba(self.X_eval)))
+
+    def test_unsupported_model_is_not_compiled(self):
+        from sklearn.linear_model import LogisticRegression
+
+        X, y = training_set()
+        self.assertIsNone(compile_model(LogisticRegression().fit(X, y)))
+
+
+# ==========================================================
+# Severity index (severity.py)
+# ==========================================================
+class SeverityIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SeverityIndex.from_dataframe(pd.DataFrame({
+            "City": ["Quezon City", "Quezon City", "Quezon City", "Manila"],
+            "Location": ["EDSA Aurora Tunnel NB"] * 3 + ["Taft Ave."],
+            "Flood Type/Depth": ["Gutter Deep", "Waist Deep", "Knee Deep", "Flooded"],
+            "datetime": ["2025-09-12 14:00:00", "2025-09-12 16:00:00", "2025-09-12 15:00:00",
+                         "2025-09-12 15:00:00"],
+        }))
+
+    def test_latest_report_wins_without_as_of(self):
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.score("Quezon City", "EDSA Aurora Tunnel NB"), 0.7)
+        self.assertEqual(self.index.lookup("Manila", "Taft Ave."), {"score": 1.0, "severity": "Severe"})
+
+    def test_as_of_picks_the_report_in_force(self):
+        score = lambda as_of: self.index.score("Quezon City", "EDSA Aurora Tunnel NB", as_of)  # noqa: E731
+        self.assertIsNone(score("2025-09-12 13:59:59"))
+        self.assertEqual(score("2025-09-12 14:00:00"), 0.3)
+        self.assertEqual(score("2025-09-12 15:30:00"), 0.5)
+        self.assertEqual(score("2025-09-13"), 0.7)
+
+    def test_aware_as_of_is_converted_to_manila_time(self):
+        # 07:30 UTC is 15:30 in Manila
+        self.assertEqual(self.index.score("Quezon City", "EDSA Aurora Tunnel NB", "2025-09-12T07:30:00Z"), 0.5)
+
+    def test_unknown_key_and_bad_as_of(self):
+        self.assertEqual(self.index.lookup("Pasig", "Ortigas Ave."), {"score": 0, "severity": "No Flood"})
+        with self.assertRaises(ValueError):
+            self.index.score("Manila", "Taft Ave.", "not a time")
+
+    def test_append_keeps_reports_in_time_order(self):
+        self.index.append("Manila", "Taft Ave.", "Gutter Deep", "2025-09-12 14:00:00")
+        self.assertEqual(self.index.score("Manila", "Taft Ave."), 1.0)
+        self.assertEqual(self.index.score("Manila", "Taft Ave.", "2025-09-12 14:30:00"), 0.3)
+
+
+# ==========================================================
+# /roads payloads (roads.py, views.roads)
+# ==========================================================
+def road_frame(rows=5):
+    return pd.DataFrame({
+        "City": ["Quezon City", "Manila"] * (rows // 2) + ["Quezon City"] * (rows % 2),
+        "Road_Sector": [f"SECTOR_{i}" for i in range(rows)],
+        "latitude": np.linspace(14.5, 14.7, rows),
+        "longitude": np.linspace(121.0, 121.1, rows),
+    })
+
+
+class RoadsPayloadTests(SimpleTestCase):
+    def test_cursor_pagination_covers_every_row_once(self):
+        payload = RoadsPayload(road_frame())
+        sectors, params = [], {"limit": "2", "fields": "road_sector"}
+        while True:
+            page = json.loads(payload.render(params)[0])
+            self.assertEqual(page["count"], 5)
+            sectors += page["data"]["road_sector"]
+            if page["next_cursor"] is None:
+                break
+            params = dict(params, cursor=page["next_cursor"])
+        self.assertEqual(sectors, [f"SECTOR_{i}" for i in range(5)])
+
+    def test_filters_apply_before_paging(self):
+        page = json.loads(RoadsPayload(road_frame()).render({"city": "Manila", "fields": "road_sector,city"})[0])
+        self.assertEqual(page["count"], 2)
+        self.assertEqual(page["data"]["city"], ["Manila", "Manila"])
+
+    def test_cursor_from_other_data_is_rejected(self):
+        old = json.loads(RoadsPayload(road_frame()).render({"limit": "2"})[0])
+        with self.assertRaises(InvalidQuery):
+            RoadsPayload(road_frame(rows=6)).render({"cursor": old["next_cursor"]})
+        with self.assertRaises(InvalidQuery):
+            RoadsPayload(road_frame()).render({"cursor": "not-a-cursor"})
+        with self.assertRaises(InvalidQuery):
+            RoadsPayload(road_frame()).render({"fields": "nope"})
+
+    def test_etag_depends_on_data_and_query(self):
+        payload = RoadsPayload(road_frame())
+        etag = payload.render({})[2]
+        self.assertEqual(RoadsPayload(road_frame()).render({})[2], etag)
+        self.assertNotEqual(payload.render({"limit": "2"})[2], etag)
+        self.assertNotEqual(RoadsPayload(road_frame(rows=6)).render({})[2], etag)
+
+    def test_view_answers_304_for_a_matching_etag(self):
+        get = lambda **headers: views.roads(RequestFactory().get("/api/roads/", **headers))  # noqa: E731
+        with mock.patch.object(views, "road_data", road_frame()), \
+                mock.patch.object(views, "roads_payload", RoadsPayload(road_frame())):
+            first = get()
+            self.assertEqual(first.status_code, 200)
+            again = get(HTTP_IF_NONE_MATCH=first["ETag"])
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(again["ETag"], first["ETag"])
+            gzipped = get(HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(gzipped["Content-Encoding"], "gzip")
+            self.assertEqual(gzip.decompress(gzipped.content), first.content)
+
+
+# ==========================================================
+# Admission control (admission.py, AdmissionMiddleware)
+# ==========================================================
+class AdmissionControlTests(SimpleTestCase):
+    def test_sheds_when_the_waiting_line_is_full(self):
+        admission = AdmissionControl(limit=1, max_waiting=0, max_wait=1)
+        with admission.admit() as ticket:
+            self.assertFalse(ticket.degraded)
+            with self.assertRaises(Overloaded) as shed:
+                with admission.admit():
+                    pass
+        self.assertEqual(shed.exception.retry_after, admission.retry_after)
+        stats = admission.stats()
+        self.assertEqual((stats["admitted"], stats["shed_queue_full"], stats["in_flight"]), (1, 1, 0))
+
+    def test_sheds_a_waiter_when_its_time_is_up(self):
+        admission = AdmissionControl(limit=1, max_waiting=1, max_wait=0.01)
+        with admission.admit():
+            with self.assertRaises(Overloaded):
+                with admission.admit():
+                    pass
+        stats = admission.stats()
+        self.assertEqual((stats["shed_timeout"], stats["queue_depth"], stats["in_flight"]), (1, 0, 0))
+
+    def test_released_slot_goes_to_the_waiter(self):
+        admission = AdmissionControl(limit=1, max_waiting=1, max_wait=5)
+        holding, tickets = threading.Event(), []
+
+        def waiter():
+            with admission.admit() as ticket:
+                tickets.append(ticket)
+
+        with admission.admit():
+            thread = threading.Thread(target=waiter)
+            thread.start()
+            while admission.stats()["queue_depth"] == 0:
+                holding.wait(0.001)
+        thread.join(5)
+        self.assertEqual(len(tickets), 1)
+        self.assertTrue(tickets[0].degraded)  # arrived while the only slot was taken
+        self.assertEqual(admission.stats()["in_flight"], 0)
+
+    def test_async_admission_is_bounded(self):
+        admission = AdmissionControl(limit=2, max_waiting=2, max_wait=5)
+        peak = current = 0
+
+        async def one():
+            nonlocal peak, current
+            try:
+                async with admission.admit_async():
+                    current += 1
+                    peak = max(peak, current)
+                    await asyncio.sleep(0.005)
+                    current -= 1
+                return "ok"
+            except Overloaded:
+                return "shed"
+
+        async def burst():
+            return await asyncio.gather(*(one() for _ in range(8)))
+
+        results = asyncio.run(burst())
+        self.assertEqual(results.count("ok"), 4)
+        self.assertEqual(results.count("shed"), 4)
+        self.assertEqual(peak, 2)
+        self.assertEqual(admission.stats()["in_flight"], 0)
+
+
+class AdmissionMiddlewareTests(SimpleTestCase):
+    factory = RequestFactory()
+
+    def run_middleware(self, admission, path):
+        seen = []
+
+        def view(request):
+            seen.append(getattr(request, "admission", None))
+            return HttpResponse("ok")
+
+        with mock.patch.object(views, "predict_admission", admission):
+            response = AdmissionMiddleware(view)(self.factory.post(path))
+        return response, seen
+
+    def test_predict_requests_get_a_ticket(self):
+        response, seen = self.run_middleware(AdmissionControl(), reverse("predict"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(seen[0], Ticket)
+
+    def test_shed_request_gets_503_with_retry_after(self):
+        request = self.factory.post(reverse("predict"))
+        with mock.patch.object(views, "predict_admission", AdmissionControl(limit=0, max_waiting=0)):
+            response = AdmissionMiddleware(lambda request: HttpResponse("ok"))(request)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(json.loads(response.content)["reason"], "too many requests waiting")
+        # What Django's handler does with a 5xx; SkipShedRequests (settings.LOGGING) drops it
+        with self.assertNoLogs("django.request"):
+            log_response(response.reason_phrase, request=request, response=response)
+        with self.assertLogs("django.request", "ERROR"):
+            log_response("Server Error", request=self.factory.post(reverse("predict")),
+                         response=HttpResponse(status=500))
+
+    def test_other_paths_are_not_admitted(self):
+        response, seen = self.run_middleware(AdmissionControl(limit=0, max_waiting=0), reverse("roads"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(seen, [None])
+
+    def test_async_mode(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        middleware = AdmissionMiddleware(view)
+        with mock.patch.object(views, "predict_admission", AdmissionControl(limit=0, max_waiting=0)):
+            response = asyncio.run(middleware(AsyncRequestFactory().post(reverse("predict-async"))))
+        self.assertEqual(response.status_code, 503)
+
+
+# ==========================================================
+# Prediction cache (prediction_cache.py)
+# ==========================================================
+class ConstantModel:
+    def __init__(self, p):
+        self.p = p
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        return np.tile([1 - self.p, self.p], (len(X), 1))
+
+
+class PredictionCacheTests(SimpleTestCase):
+    row = np.arange(len(FEATURE_COLUMNS), dtype=float)
+
+    def test_hit_after_miss(self):
+        cache, model = PredictionCache(maxsize=10, ttl=60), ConstantModel(0.25)
+        self.assertEqual(cache.predict(model, self.row), 0.25)
+        self.assertEqual(cache.predict(model, self.row + 1e-6), 0.25)  # rounds to the same key
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_miss_scores_the_unrounded_row(self):
+        cache, model = PredictionCache(maxsize=10, ttl=60), mock.Mock()
+        model.predict_proba.return_value = np.array([[0.5, 0.5]])
+        row = self.row + 0.123456
+        cache.predict(model, row)
+        np.testing.assert_array_equal(model.predict_proba.call_args.args[0], row[None, :])
+
+    def test_model_swap_invalidates(self):
+        cache, old, new = PredictionCache(maxsize=10, ttl=60), ConstantModel(0.25), ConstantModel(0.75)
+        cache.predict(old, self.row)
+        self.assertEqual(cache.predict(new, self.row), 0.75)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+        self.assertEqual(cache.stats()["size"], 1)
+
+    def test_store_from_a_replaced_model_is_dropped(self):
+        cache, old, new = PredictionCache(maxsize=10, ttl=60), ConstantModel(0.25), ConstantModel(0.75)
+        _, key, _ = cache.lookup(old, self.row)
+        cache.lookup(new, self.row + 100)  # swap happens while the old model is scoring
+        cache.store(old, key, 0.25)
+        self.assertEqual(cache.predict(new, self.row), 0.75)
+
+    def test_expired_entries_are_rescored(self):
+        cache, model = PredictionCache(maxsize=10, ttl=0), ConstantModel(0.25)
+        cache.predict(model, self.row)
+        cache.predict(model, self.row)
+        self.assertEqual(model.calls, 2)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+
+# ==========================================================
+# Heatmap tiles (heatmap.py)
+# ==========================================================
+class HeatmapTileTests(SimpleTestCase):
+    def setUp(self):
+        rows, cols = heatmap.grid_axes()
+        self.grid = heatmap.HeatmapGrid(np.random.default_rng(0).random((len(rows), len(cols))))
+
+    def test_zoom_zero_is_one_cell(self):
+        with mock.patch.object(heatmap.np, "pad", wraps=np.pad) as pad:
+            tile = self.grid.tile(zoom=0)
+        self.assertEqual(tile["shape"], [1, 1])
+        self.assertEqual(tile["probabilities"], [[round(float(self.grid.probabilities.max()), 3)]])
+        # Padding never grows past one block the size of the grid
+        _, (pad_r, pad_c) = pad.call_args.args
+        self.assertLess(max(pad_r[1], pad_c[1]), max(self.grid.shape))
+
+    def test_tile_covers_the_bbox(self):
+        tile = self.grid.tile(bbox=(14.55, 121.0, 14.60, 121.05), zoom=heatmap.MAX_ZOOM)
+        self.assertEqual(tile["shape"], [10, 10])
+        self.assertEqual(tile["bbox"], [14.55, 121.0, 14.6, 121.05])
+        self.assertEqual(self.grid.tile(zoom=heatmap.MAX_ZOOM - 1)["shape"], [43, 25])
+
+    def test_etag_follows_window_zoom_and_content(self):
+        makati = (14.55, 121.0, 14.60, 121.05)
+        self.assertEqual(self.grid.etag(makati, 12), self.grid.etag(makati, 12))
+        self.assertNotEqual(self.grid.etag(makati, 12), self.grid.etag(makati, 13))
+        self.assertNotEqual(self.grid.etag(makati, 12), self.grid.etag(None, 12))
+        other = heatmap.HeatmapGrid(self.grid.probabilities + 0.01)
+        self.assertNotEqual(other.etag(makati, 12), self.grid.etag(makati, 12))
+
+    def test_zooms_past_the_grid_share_a_factor(self):
+        self.assertEqual(self.grid.tile(zoom=0)["cell_deg"], self.grid.tile(zoom=2)["cell_deg"])
+        self.assertNotEqual(self.grid.etag(zoom=0), self.grid.etag(zoom=2))
+
+
+class HeatmapRefresherTests(SimpleTestCase):
+    def setUp(self):
+        self.model = ConstantModel(0.5)
+        table = LatestFeatures([], np.empty((0, len(STORE_FEATURES))), [])
+        self.refresher = heatmap.HeatmapRefresher(get_model=lambda: self.model, get_table=lambda: table)
+
+    def test_unchanged_inputs_reuse_the_grid(self):
+        with mock.patch.object(heatmap, "scoring_hour", return_value=datetime(2025, 9, 1, 14)):
+            grid = self.refresher.refresh()
+            self.assertIs(self.refresher.refresh(), grid)
+        self.assertEqual(self.model.calls, 1)
+
+    def test_new_hour_rescores(self):
+        with mock.patch.object(heatmap, "scoring_hour", return_value=datetime(2025, 9, 1, 14)):
+            self.refresher.refresh()
+        with mock.patch.object(heatmap, "scoring_hour", return_value=datetime(2025, 9, 1, 15)):
+            self.refresher.refresh()
+        self.assertEqual(self.model.calls, 2)
+
+
+# ==========================================================
+# Road index (spatial.py)
+# ==========================================================
+class RoadIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.roads = pd.DataFrame({
+            "Location": ["Taft Ave.", "no coordinates", "Quezon Blvd.", "Ortigas Ave."],
+            "latitude": [14.5600, None, 14.5995, 14.5866],
+            "longitude": [120.9950, 121.0, 120.9842, 121.0614],
+        })
+        self.index = RoadIndex(self.roads)
+
+    def test_rows_without_coordinates_are_skipped(self):
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(list(self.index.positions), [0, 2, 3])
+
+    def test_radius_query_is_sorted_and_bounded(self):
+        positions, distances = self.index.query_radius(14.5995, 120.9842, 5000)
+        self.assertEqual(list(self.roads["Location"].iloc[positions]), ["Quezon Blvd.", "Taft Ave."])
+        self.assertAlmostEqual(distances[0], 0.0, places=3)
+        np.testing.assert_allclose(
+            distances, haversine_m(14.5995, 120.9842, self.roads["latitude"].iloc[positions],
+                                   self.roads["longitude"].iloc[positions]))
+        self.assertTrue((distances <= 5000).all())
+
+    def test_radius_matches_a_full_scan(self):
+        lat, lon, radius = 14.58, 121.02, 4500
+        everything = haversine_m(lat, lon, self.index.lat, self.index.lon)
+        positions, _ = self.index.query_radius(lat, lon, radius)
+        self.assertEqual(sorted(positions), sorted(self.index.positions[everything <= radius]))
+
+    def test_empty_index(self):
+        positions, distances = RoadIndex(pd.DataFrame()).query_radius(14.5, 121.0, 1000)
+        self.assertEqual((len(positions), len(distances)), (0, 0))
+
+
+# ==========================================================
+# Reverse geocoding (geocoding.py)
+# ==========================================================
+QUIAPO = {"city": "Manila", "road": "Quezon Blvd.", "neighborhood": "Quiapo",
+          "full_address": "Quezon Blvd., Quiapo, Manila"}
+
+
+class GeocoderTests(SimpleTestCase):
+    point = (14.5995, 120.9842)
+
+    def geocoder(self, network_lookup, **kwargs):
+        kwargs.setdefault("offline", False)
+        kwargs.setdefault("cache_path", "")
+        return Geocoder(gazetteer=Gazetteer(), network_lookup=network_lookup, **kwargs)
+
+    def test_lru_hit_skips_the_network(self):
+        lookup = mock.Mock(return_value=QUIAPO)
+        geocoder = self.geocoder(lookup)
+        self.assertEqual(geocoder.reverse(*self.point), QUIAPO)
+        self.assertEqual(geocoder.reverse(self.point[0] + 1e-5, self.point[1]), QUIAPO)  # same cell
+        self.assertEqual(lookup.call_count, 1)
+        self.assertEqual(geocoder.stats()["lru_hits"], 1)
+
+    def test_disk_tier_is_shared_between_geocoders(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "geocode.sqlite3")
+            self.geocoder(mock.Mock(return_value=QUIAPO), cache_path=path).reverse(*self.point)
+            lookup = mock.Mock()
+            other = self.geocoder(lookup, cache_path=path)
+            self.assertEqual(other.reverse(*self.point), QUIAPO)
+        lookup.assert_not_called()
+        self.assertEqual(other.stats()["disk_hits"], 1)
+
+    def test_offline_mode_uses_the_gazetteer(self):
+        lookup = mock.Mock()
+        geocoder = self.geocoder(lookup, offline=True)
+        self.assertEqual(geocoder.reverse(*self.point)["city"], "Manila City")
+        geocoder.reverse(*self.point)
+        lookup.assert_not_called()
+        self.assertEqual(geocoder.stats()["offline_lookups"], 1)
+
+    def test_shed_lookup_is_not_cached(self):
+        lookup = mock.Mock(return_value=QUIAPO)
+        geocoder = self.geocoder(lookup)
+        self.assertEqual(geocoder.reverse(*self.point, network=False)["city"], "Manila City")
+        lookup.assert_not_called()
+        self.assertEqual(geocoder.reverse(*self.point), QUIAPO)
+
+    def test_network_failure_is_cached_briefly(self):
+        lookup = mock.Mock(side_effect=OSError("Nominatim down"))
+        geocoder = self.geocoder(lookup, retry_after=60)
+        self.assertEqual(geocoder.reverse(*self.point)["city"], "Manila City")
+        geocoder.reverse(*self.point)
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_network_recovers_after_retry_after(self):
+        lookup = mock.Mock(side_effect=[OSError("Nominatim down"), QUIAPO])
+        geocoder = self.geocoder(lookup, retry_after=0)
+        self.assertIsNone(geocoder.reverse(*self.point)["neighborhood"])
+        self.assertEqual(geocoder.reverse(*self.point), QUIAPO)
+        self.assertEqual(geocoder.reverse(*self.point), QUIAPO)
+        self.assertEqual(lookup.call_count, 2)
+
+
+# ==========================================================
+# Tweet scraper (scraper.py)
+# ==========================================================
+TWEET = """MMCMMC-FCIC
+DATE: 09-{day}-2025
+TIME: : 2:50 PM
+
+REPORTED FLOODINGS:
+
+QUEZON CITY:
+
+- EDSA Aurora Tunnel NB : Knee deep. Not passable to light vehicles.
+- Elliptical East Ave.: Gutter deep. Passable to all types of vehicles.
+"""
+
+
+class ScraperTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dump = os.path.join(tmp.name, "dump.txt")
+        self.output = os.path.join(tmp.name, "scraped.csv")
+
+    def write(self, *days, mode="w"):
+        with open(self.dump, mode, encoding="utf-8") as f:
+            for day in days:
+                f.write("===TWEET===\n\n" + TWEET.format(day=day) + "\n")
+
+    def scraped(self):
+        return pd.read_csv(self.output)
+
+    def test_parse_tweet(self):
+        records = scraper.parse_tweet(TWEET.format(day=12))
+        self.assertEqual([r["Location"] for r in records], ["EDSA Aurora Tunnel NB", "Elliptical East Ave."])
+        self.assertEqual(records[0]["City"], "Quezon City")
+        self.assertEqual(records[0]["Flood Type/Depth"], "Knee Deep")
+        self.assertEqual(records[0]["Passability"], "Not passable to light vehicles")
+        self.assertEqual(records[1]["datetime"], "2025-09-12 14:50:00")
+        self.assertEqual(scraper.parse_tweet("No date or time here."), [])
+
+    def test_appended_tweets_are_parsed_from_the_high_water_mark(self):
+        self.write(10)
+        first = scraper.scrape(self.dump, self.output)
+        self.assertEqual((first["resumed_from"], first["records"]), (0, 2))
+        size = os.path.getsize(self.dump)
+
+        self.write(11, mode="a")
+        second = scraper.scrape(self.dump, self.output)
+        self.assertEqual((second["resumed_from"], second["tweets"], second["records"]), (size, 1, 2))
+        self.assertEqual(len(self.scraped()), 4)
+
+        unchanged = scraper.scrape(self.dump, self.output)
+        self.assertEqual(unchanged["records"], 0)
+
+    def test_rewritten_dump_only_emits_newer_tweets(self):
+        self.write(10, 11)
+        scraper.scrape(self.dump, self.output)
+        self.write(12, 10, 11)  # newest first, as a fresh export would be
+        rescan = scraper.scrape(self.dump, self.output)
+        self.assertEqual((rescan["resumed_from"], rescan["records"], rescan["skipped_old"]), (0, 2, 2))
+        self.assertEqual(sorted(self.scraped()["datetime"].str[:10].unique()),
+                         ["2025-09-10", "2025-09-11", "2025-09-12"])
+
+    def test_dump_fingerprint_tracks_content(self):
+        self.assertIsNone(scraper.dump_fingerprint(self.dump))
+        self.write(10)
+        before = scraper.dump_fingerprint(self.dump)
+        self.write(11, mode="a")
+        self.assertNotEqual(scraper.dump_fingerprint(self.dump), before)
+
+
+# ==========================================================
+# Training pipeline stages (stages.py, pipeline.py)
+# ==========================================================
+class PipelineStageTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+        self.source = "v1"
+        self.runs = []
+
+    def pipeline(self, scale=2):
+        def load():
+            self.runs.append("load")
+            return self.source
+
+        def build(data, scale):
+            self.runs.append("build")
+            return data * scale
+
+        return Pipeline([
+            Stage("load", load, source=lambda: self.source, cache=False),
+            Stage("build", build, deps=["load"], params={"scale": scale}),
+        ], cache_dir=self.cache_dir)
+
+    def run_pipeline(self, **kwargs):
+        self.runs = []
+        outputs, report = self.pipeline(**kwargs.pop("params", {})).run(targets=["build"], **kwargs)
+        return outputs, {name: info["status"] for name, info in report.items()}
+
+    def test_unchanged_inputs_skip_upstream_stages(self):
+        outputs, status = self.run_pipeline()
+        self.assertEqual((outputs["build"], status), ("v1v1", {"load": "ran", "build": "ran"}))
+        outputs, status = self.run_pipeline()
+        self.assertEqual((outputs["build"], status), ("v1v1", {"load": "skipped", "build": "cached"}))
+        self.assertEqual(self.runs, [])
+
+    def test_source_and_params_change_the_fingerprint(self):
+        base = self.pipeline().fingerprints()
+        self.assertEqual(self.pipeline().fingerprints(), base)
+        self.assertNotEqual(self.pipeline(scale=3).fingerprints()["build"], base["build"])
+        self.source = "v2"
+        self.assertNotEqual(self.pipeline().fingerprints()["build"], base["build"])
+
+        self.run_pipeline()
+        self.source = "v3"
+        outputs, status = self.run_pipeline()
+        self.assertEqual((outputs["build"], status["build"]), ("v3v3", "ran"))
+
+    def test_forced_stages_rebuild_their_dependents(self):
+        self.run_pipeline()
+        _, status = self.run_pipeline(force=["load"])
+        self.assertEqual(status, {"load": "ran", "build": "ran"})
+        _, status = self.run_pipeline(force=True)
+        self.assertEqual(status, {"load": "ran", "build": "ran"})
+
+    def test_new_tweets_invalidate_the_model(self):
+        with mock.patch.object(pipeline, "training_data_fingerprint", return_value={"etag": "a"}), \
+                mock.patch.object(pipeline, "dump_fingerprint", return_value="dump-1"):
+            before = pipeline.build_pipeline(cache_dir=self.cache_dir).fingerprints()
+        with mock.patch.object(pipeline, "training_data_fingerprint", return_value={"etag": "a"}), \
+                mock.patch.object(pipeline, "dump_fingerprint", return_value="dump-2"):
+            after = pipeline.build_pipeline(cache_dir=self.cache_dir).fingerprints()
+        self.assertEqual(before["download"], after["download"])
+        for stage in ("clean", "train", "upload"):
+            self.assertNotEqual(before[stage], after[stage])
+
+    def test_new_weather_invalidates_the_model(self):
+        def fingerprints():
+            with mock.patch.object(pipeline, "training_data_fingerprint", return_value={"etag": "a"}), \
+                    mock.patch.object(pipeline, "dump_fingerprint", return_value="dump-1"), \
+                    mock.patch.object(feature_store, "weather_fingerprint", return_value=fingerprint):
+                return pipeline.build_pipeline(cache_dir=self.cache_dir).fingerprints()
+
+        fingerprint = feature_store.weather_fingerprint(store_dir=self.cache_dir, raw_dir=self.cache_dir)
+        self.assertEqual(fingerprint, [])
+        before = fingerprints()
+        with open(os.path.join(self.cache_dir, "202509.csv"), "w") as f:
+            f.write("datetime,city_name\n")
+        fingerprint = feature_store.weather_fingerprint(store_dir=self.cache_dir, raw_dir=self.cache_dir)
+        self.assertEqual([name for name, _, _ in fingerprint], ["202509.csv"])
+        after = fingerprints()
+        self.assertEqual(before["clean"], after["clean"])
+        self.assertNotEqual(before["train"], after["train"])
+
+    def test_listed_modules_change_the_fingerprint(self):
+        helper = types.ModuleType("helper")
+        helper.__file__ = os.path.join(self.cache_dir, "helper.py")
+        with open(helper.__file__, "w") as f:
+            f.write("SCALE = 2\n")
+        stage = Stage("build", lambda: None, modules=[helper])
+        before = Pipeline([stage], cache_dir=self.cache_dir).fingerprints()
+        with open(helper.__file__, "w") as f:
+            f.write("SCALE = 3\n")
+        self.assertNotEqual(Pipeline([stage], cache_dir=self.cache_dir).fingerprints(), before)
+
+    def test_training_data_fingerprint_does_not_download(self):
+        bucket = FakeBucket({"train.csv": b"City,Location\nManila,Taft Ave.\n"})
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ArtifactCache(FakeStorage(bucket), "data", cache_dir=tmp)
+            with mock.patch.object(preprocess, "get_artifacts", return_value=cache):
+                first = preprocess.training_data_fingerprint("train.csv")
+                self.assertEqual(bucket.downloads, 0)
+                bucket.files["train.csv"] += b"Pasig,Ortigas Ave.\n"
+                self.assertNotEqual(preprocess.training_data_fingerprint("train.csv"), first)
+                self.assertEqual(bucket.downloads, 0)
+
+
+
+# ==========================================================
+# Artifact cache (artifacts.py)
+# ==========================================================
+class ArtifactCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.bucket = FakeBucket({"model.pkl": b"v1"})
+        self.cache = ArtifactCache(FakeStorage(self.bucket), "models", cache_dir=tmp.name, revalidate_after=0)
+
+    def read(self, **kwargs):
+        with open(self.cache.fetch("model.pkl", **kwargs), "rb") as f:
+            return f.read()
+
+    def test_unchanged_remote_is_not_downloaded_again(self):
+        self.assertEqual(self.read(), b"v1")
+        self.assertEqual(self.read(revalidate=True), b"v1")
+        self.assertEqual(self.bucket.downloads, 1)
+
+    def test_recently_checked_ref_skips_the_listing(self):
+        self.cache.revalidate_after = 60
+        self.read()
+        with mock.patch.object(self.bucket, "list", side_effect=AssertionError("listed")):
+            self.assertEqual(self.read(), b"v1")
+
+    def test_changed_remote_replaces_the_object(self):
+        old_path = self.cache.fetch("model.pkl")
+        self.bucket.files["model.pkl"] = b"v2"
+        self.assertEqual(self.read(), b"v2")
+        self.assertEqual(self.bucket.downloads, 2)
+        self.assertFalse(os.path.exists(old_path))
+
+    def test_unreachable_listing_serves_the_cached_copy(self):
+        self.read()
+        with mock.patch.object(self.bucket, "list", side_effect=OSError("offline")):
+            self.assertEqual(self.read(revalidate=True), b"v1")
+        self.assertEqual(self.bucket.downloads, 1)
+
+
+# ==========================================================
+# Background retraining (jobs.py)
+# ==========================================================
+class RetrainJobsTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.installed = []
+
+        def train():
+            self.started.set()
+            self.release.wait(5)
+            return {"model": ConstantModel(0.5), "auc": 0.9}
+
+        self.jobs = RetrainJobs(train=train, install=self.installed.append)
+
+    def wait_for(self, job_id):
+        for _ in range(500):
+            job = self.jobs.get(job_id)
+            if job["status"] in ("succeeded", "failed"):
+                return job
+            time.sleep(0.01)
+        self.fail(f"job {job_id} did not finish")
+
+    def test_requests_during_a_run_coalesce_into_one_follow_up(self):
+        first = self.jobs.submit()
+        self.assertTrue(self.started.wait(5))
+        second = self.jobs.submit()
+        third = self.jobs.submit()
+        self.assertNotEqual(second["job_id"], first["job_id"])
+        self.assertEqual(third["job_id"], second["job_id"])
+        self.assertEqual(third["coalesced"], 1)
+
+        self.release.set()
+        self.assertEqual(self.wait_for(first["job_id"])["status"], "succeeded")
+        job = self.wait_for(second["job_id"])
+        self.assertEqual((job["status"], job["result"]["auc"]), ("succeeded", 0.9))
+        self.assertEqual(len(self.installed), 2)
+
+    def test_failed_training_keeps_the_current_model(self):
+        self.jobs.train = mock.Mock(side_effect=RuntimeError("no data"))
+        job = self.wait_for(self.jobs.submit()["job_id"])
+        self.assertEqual((job["status"], job["error"]), ("failed", "no data"))
+        self.assertEqual(self.installed, [])
+
+
+# ==========================================================
+# Latest-values feature table (feature_store.py)
+# ==========================================================
+class LatestFeaturesTests(SimpleTestCase):
+    def setUp(self):
+        values = np.arange(2 * len(STORE_FEATURES), dtype=np.float32).reshape(2, -1)
+        self.table = LatestFeatures(["Makati City", "Quezon City"], values,
+                                    ["2025-09-01T13:00:00+08:00", "2025-09-01T14:00:00+08:00"])
+        self.when = datetime(2025, 9, 6, 14, 30)  # a Saturday
+
+    def vector(self, values=None, city=None):
+        return dict(zip(FEATURE_COLUMNS, self.table.vector(values or {}, city=city, when=self.when)))
+
+    def column(self, name):
+        return self.table.values[:, STORE_FEATURES.index(name)]
+
+    def test_missing_values_come_from_the_city(self):
+        vector = self.vector(city="quezon city")
+        self.assertEqual(vector["main.temp"], self.table.lookup("Quezon City")["main.temp"])
+        self.assertEqual(vector["rain_24h"], self.column("rain_24h")[1])
+
+    def test_caller_values_override_the_table(self):
+        vector = self.vector({"rain1h": 12.5, "main.temp": None}, city="Makati")
+        self.assertEqual(vector["rain1h"], 12.5)
+        self.assertEqual(vector["main.temp"], self.column("main.temp")[0])
+
+    def test_unknown_city_uses_the_metro_median(self):
+        vector = self.vector(city="Atlantis")
+        for name in STORE_FEATURES:
+            self.assertEqual(vector[name], float(np.median(self.column(name))))
+
+    def test_time_features_come_from_when(self):
+        vector = self.vector()
+        self.assertEqual([vector[n] for n in ("hour", "day_of_week", "month", "is_weekend")], [14, 5, 9, 1])
+
+
+# ==========================================================
+# Micro-batching (batching.py)
+# ==========================================================
+class GatedModel:
+    """P(flood) is the first feature; predict_proba blocks until `gate` is set."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+        self.batches = []
+
+    def predict_proba(self, X):
+        self.entered.set()
+        self.gate.wait(5)
+        self.batches.append(len(X))
+        return np.column_stack([1 - X[:, 0], X[:, 0]])
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_rows_queued_during_a_call_share_the_next_batch(self):
+        model, batcher = GatedModel(), MicroBatcher(window=0, max_batch=64, max_queue=64, timeout=5)
+        first = batcher.submit(model, np.array([0.1]))
+        self.assertTrue(model.entered.wait(5))
+        rest = [batcher.submit(model, np.array([i / 10])) for i in range(2, 6)]
+        model.gate.set()
+        self.assertEqual(first.result(5), 0.1)
+        self.assertEqual([f.result(5) for f in rest], [0.2, 0.3, 0.4, 0.5])
+        self.assertEqual(model.batches, [1, 4])
+        self.assertEqual(batcher.stats()["requests"], 5)
+
+    def test_full_queue_rejects(self):
+        model, batcher = GatedModel(), MicroBatcher(window=0, max_batch=64, max_queue=1, timeout=5)
+        batcher.submit(model, np.array([0.1]))
+        self.assertTrue(model.entered.wait(5))
+        batcher.submit(model, np.array([0.2]))
+        with self.assertRaises(QueueFull):
+            batcher.submit(model, np.array([0.3]))
+        model.gate.set()
+        self.assertEqual(batcher.stats()["rejected"], 1)
+
+    def test_model_errors_reach_the_caller(self):
+        model = mock.Mock()
+        model.predict_proba.side_effect = ValueError("bad row")
+        future = MicroBatcher(window=0, timeout=5).submit(model, np.array([0.1]))
+        with self.assertRaisesMessage(ValueError, "bad row"):
+            future.result(5)
+
+
+# ==========================================================
+# AI microservice client (ai_client.py)
+# ==========================================================
+class AIClientTests(SimpleTestCase):
+    def ai_client(self, handler, **kwargs):
+        client = AIClient("http://ai.test/api", transport=httpx.MockTransport(handler), **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_breaker_opens_after_repeated_failures(self):
+        handler = mock.Mock(return_value=httpx.Response(500))
+        fallback = mock.Mock(return_value=0.25)
+        client = self.ai_client(handler, fallback=fallback, breaker=CircuitBreaker(failures=2, reset=60))
+        self.assertEqual([client.predict({"rain1h": 1.0}) for _ in range(3)], [0.25] * 3)
+        self.assertEqual(handler.call_count, 2)
+        self.assertEqual(client.breaker.state, "open")
+        self.assertEqual((client.counters["failures"], client.counters["short_circuited"]), (2, 1))
+
+    def test_half_open_probe_closes_the_breaker(self):
+        handler = mock.Mock(return_value=httpx.Response(200, json={"flood_probability": 0.5}))
+        breaker = CircuitBreaker(failures=1, reset=0)
+        breaker.record(False)
+        self.assertEqual(self.ai_client(handler, breaker=breaker).predict({"rain1h": 1.0}), 0.5)
+        self.assertEqual(breaker.state, "closed")
+
+    def test_client_errors_do_not_open_the_breaker(self):
+        client = self.ai_client(lambda request: httpx.Response(422), fallback=lambda values, city: None,
+                             breaker=CircuitBreaker(failures=1, reset=60))
+        client.predict({"rain1h": 1.0})
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_identical_requests_in_flight_are_coalesced(self):
+        entered, release, calls = threading.Event(), threading.Event(), []
+
+        def handler(request):
+            calls.append(json.loads(request.content))
+            entered.set()
+            release.wait(5)
+            return httpx.Response(200, json={"flood_probability": 0.75})
+
+        client = self.ai_client(handler)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.predict({"rain1h": 1.0}, "Manila")))
+                   for _ in range(3)]
+        threads[0].start()
+        self.assertTrue(entered.wait(5))
+        for thread in threads[1:]:
+            thread.start()
+        for _ in range(500):
+            if client.counters["coalesced"] == 2:
+                break
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [0.75] * 3)
+        self.assertEqual(calls, [{"rain1h": 1.0, "city": "Manila"}])
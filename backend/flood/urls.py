@@ -3,6 +3,13 @@ from . import views
 
 urlpatterns = [
     path("predict/", views.predict, name="predict"),
+    path("predict/async/", views.predict_async, name="predict-async"),
+    path("predict/cache/", views.predict_cache_stats, name="predict-cache"),
     path("roads/", views.roads, name="roads"),
+    path("roads/nearby/", views.roads_nearby, name="roads-nearby"),
+    path("heatmap/", views.heatmap_tile, name="heatmap"),
+    path("ready/", views.readiness, name="ready"),
+    path("metrics/", views.prometheus_metrics, name="metrics"),
     path("retrain/", views.retrain, name="retrain"),
+    path("retrain/<str:job_id>/", views.retrain_status, name="retrain-status"),
 ]
@@ -1,51 +1,90 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 import pandas as pd
 import numpy as np
-import joblib
-from io import BytesIO
 from datetime import datetime
-from geopy.geocoders import Nominatim
 from dotenv import load_dotenv
-from supabase import create_client
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
 import threading
 import os
 
+from production_model.storage import get_artifacts
+from production_model.admission import AdmissionControl, Ticket
+from production_model.jobs import RetrainJobs, warmup
+from production_model.compiled_model import serving_model
+from production_model.feature_store import FEATURE_COLUMNS, api_name, get_latest_features
+from production_model.heatmap import HeatmapRefresher, parse_tile_query
+from production_model.prediction_cache import PredictionCache
+from production_model.startup import Startup
+from production_model import metrics, prefork
+from production_model.metrics import GaugeFunc, span
+
+from .spatial import RoadIndex
+from .geocoding import Gazetteer, get_geocoder
+from .severity import SeverityIndex
+from .roads import RoadsPayload, InvalidQuery
+from .road_store import format_timestamp, load_compact
+from .ai_client import AIClient
+
 # ==========================================================
 # Load environment variables
 # ==========================================================
+# Importing this module does no I/O. The Supabase client (shared, see
+# production_model/storage.py), road data and model are loaded by the
+# startup hook that backend/wsgi.py and backend/asgi.py start, or on first
+# use, so manage.py commands never touch the network.
 load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-BUCKET_NAME = "data"
-
-# ==========================================================
-# Initialize Supabase client
-# ==========================================================
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Score on the AI microservice when set; otherwise (and as fallback) in-process
+MICROSERVICE_URL = os.getenv("MICROSERVICE_URL", "").strip()
 
 # ==========================================================
 # Load CSV (from Supabase or fallback)
 # ==========================================================
 def load_road_data():
-    print("[startup] Downloading flooded_roads_phase1.csv from Supabase...")
+    """
+    Road data as a compact, memory-mapped DataFrame (see road_store.py):
+    workers share one parsed copy instead of each reading the CSV.
+    """
+    print("[startup] Loading flooded_roads_phase1.csv from artifact cache...")
     try:
-        data = supabase.storage.from_(BUCKET_NAME).download("flooded_roads_phase1.csv")
-        df = pd.read_csv(BytesIO(data))
+        df = load_compact(get_artifacts().fetch("flooded_roads_phase1.csv"))
         print(f"[startup] Road data loaded successfully. Shape: {df.shape}")
         return df
     except Exception as e:
         print("[startup] Failed to load from Supabase:", e)
         if os.path.exists("../data/interim/flooded_roads_phase1.csv"):
             print("[startup] Loading local backup CSV...")
-            return pd.read_csv("../data/interim/flooded_roads_phase1.csv")
+            return load_compact("../data/interim/flooded_roads_phase1.csv")
         print("[startup] No data available.")
         return pd.DataFrame()
 
-road_data = load_road_data()
+road_data = road_index = severity_index = roads_payload = None
+road_data_lock = threading.Lock()
+
+def set_road_data(df):
+    """Install a new road dataset and rebuild every structure derived from it."""
+    global road_data, road_index, severity_index, roads_payload
+    road_index = RoadIndex(df)
+    print(f"[startup] Spatial index built over {len(road_index)} road records with coordinates.")
+    # Offline tier of the geocoder knows our own road records too
+    get_geocoder().gazetteer = Gazetteer(df, road_index=road_index)
+    severity_index = SeverityIndex.from_dataframe(df)
+    print(f"[startup] Severity index built for {len(severity_index)} (city, location) pairs.")
+    roads_payload = RoadsPayload(df)
+    road_data = df  # set last: ensure_road_data checks it
+
+def ensure_road_data():
+    """Load the road dataset and its indexes if that has not happened yet."""
+    if road_data is None:
+        with road_data_lock:
+            if road_data is None:
+                set_road_data(load_road_data())
 
 # ==========================================================
 # Lazy-load ML model (Render-friendly)
@@ -61,61 +100,131 @@ def load_model():
     with model_lock:
         if model is not None:  # double-check inside lock
             return model
-        print("[model] Downloading best_flood_model.pkl from Supabase...")
+        print("[model] Loading best_flood_model.pkl from artifact cache...")
         try:
-            model_data = supabase.storage.from_(BUCKET_NAME).download("best_flood_model.pkl")
-            model = joblib.load(BytesIO(model_data))
+            with span("model_load"):
+                model = serving_model(get_artifacts().load_joblib("best_flood_model.pkl"))
             print("[model] Model loaded successfully.")
         except Exception as e:
             print("[model] Failed to load model:", e)
             model = None
     return model
 
-# Optional: preload model in background (won’t block startup)
-threading.Thread(target=load_model, daemon=True).start()
+# Probabilities of recently seen (rounded) feature vectors; clears itself on model swaps
+prediction_cache = PredictionCache()
+
+# Flood probability grid for the map, rescored when the model or weather changes
+heatmap = HeatmapRefresher(get_model=lambda: model, get_table=get_latest_features)
+
+def warm_model():
+    current = load_model()
+    if current is None:
+        raise RuntimeError("model not available")
+    warmup(current)
+
+def preload():
+    """
+    Road data and model for the gunicorn master to load before it forks the
+    workers (see production_model/prefork.py); runs again on every reload.
+    """
+    global model
+    with road_data_lock:
+        set_road_data(load_road_data())
+    if not MICROSERVICE_URL:
+        with span("model_load"):
+            model = serving_model(get_artifacts().load_joblib("best_flood_model.pkl", revalidate=True))
+        print("[model] Model preloaded for the workers.")
+
+# Warm-up started by the server (backend/wsgi.py, backend/asgi.py) in the
+# background; GET /api/ready/ reports progress. The model is only needed
+# when scoring happens in-process.
+startup = Startup("backend", [
+    ("road_data", ensure_road_data),
+    *([] if MICROSERVICE_URL else [("model", warm_model)]),
+    ("features", get_latest_features),
+    ("heatmap", lambda: heatmap.start().poke()),
+])
 
 # ==========================================================
 # Helper functions
 # ==========================================================
-geolocator = Nominatim(user_agent="flood_app")
+def reverse_geocode(lat, lon, network=True):
+    ensure_road_data()  # the offline tier uses our road records
+    with span("geocode"):
+        return get_geocoder().reverse(lat, lon, network=network) or {}
 
-def reverse_geocode(lat, lon):
-    try:
-        location = geolocator.reverse((lat, lon), timeout=10)
-        if location:
-            address = location.raw.get('address', {})
-            return {
-                "city": address.get("city", address.get("town", None)),
-                "road": address.get("road", None),
-                "neighborhood": address.get("suburb", None),
-                "full_address": location.address
-            }
-    except Exception as e:
-        print("[reverse_geocode] Error:", e)
-    return {}
-
-def calculate_severity_from_csv(city, location):
-    subset = road_data[(road_data['City'] == city) & (road_data['Location'] == location)]
-    if subset.empty:
-        return {"score": 0, "severity": "No Flood"}
-    
-    depth_map = {
-        "Gutter Deep": 0.3,
-        "Knee Deep": 0.5,
-        "Waist Deep": 0.7,
-        "Flooded": 1.0
-    }
-    depth = subset.iloc[-1]['Flood Type/Depth']
-    score = depth_map.get(depth, 0)
-    if score >= 0.7:
-        severity = "Severe"
-    elif score >= 0.4:
-        severity = "Moderate"
-    elif score > 0:
-        severity = "Light"
-    else:
-        severity = "No Flood"
-    return {"score": score, "severity": severity}
+def calculate_severity_from_csv(city, location, as_of=None):
+    ensure_road_data()
+    with span("severity"):
+        return severity_index.lookup(city, location, as_of)
+
+def roads_within(lat, lon, radius):
+    """Road records within `radius` meters of (lat, lon), nearest first."""
+    ensure_road_data()
+    positions, distances = road_index.query_radius(lat, lon, radius)
+    nearby = road_data.iloc[positions]
+    return [
+        {
+            "road_sector": row.get("Road_Sector", "Unknown"),
+            "city": row.get("City", "Unknown"),
+            "location": row.get("Location"),
+            "flood_depth": row.get("Flood Type/Depth"),
+            "passability": row.get("Passability"),
+            "datetime": format_timestamp(row.get("datetime")),
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+            "distance_m": round(float(distance), 1),
+        }
+        for row, distance in zip(nearby.to_dict("records"), distances)
+    ]
+
+def infer_probability(values, city):
+    """P(flood) from request feature values (model loaded on demand); None without a model."""
+    model_instance = load_model()
+    if model_instance is None:
+        return None
+    with span("feature_build"):
+        features = get_latest_features().vector(values, city=city)
+    return prediction_cache.predict(model_instance, features)
+
+# Pooled, coalescing client for the AI microservice; falls back to the local model
+ai_client = AIClient(MICROSERVICE_URL, fallback=infer_probability) if MICROSERVICE_URL else None
+
+def predict_probability(values, city):
+    if ai_client is not None:
+        with span("ai_service"):
+            return ai_client.predict(values, city)
+    return infer_probability(values, city)
+
+def numeric_stats(stats):
+    return {k: v for k, v in stats.items() if isinstance(v, (int, float)) and not isinstance(v, bool)}
+
+GaugeFunc("flood_geocoder", "Reverse geocoder counters and LRU size.",
+          lambda: numeric_stats(get_geocoder().stats()), labelname="stat")
+GaugeFunc("flood_prediction_cache", "Prediction cache counters and size.",
+          lambda: numeric_stats(prediction_cache.stats()), labelname="stat")
+GaugeFunc("flood_ai_client", "AI microservice client counters.",
+          lambda: numeric_stats(ai_client.stats()) if ai_client else None, labelname="stat")
+
+# Bounds in-flight /predict work per worker (both views), applied by
+# flood.middleware.AdmissionMiddleware: the excess gets a fast 503, and
+# requests admitted under pressure skip Nominatim
+predict_admission = AdmissionControl()
+GaugeFunc("flood_predict_admission", "Admission control for /predict: in-flight, waiting and shed requests.",
+          lambda: predict_admission.stats(), labelname="stat")
+
+def admission_ticket(request):
+    """The request's admission Ticket; requests that bypassed the middleware are not degraded."""
+    return getattr(request, "admission", None) or Ticket(degraded=False, waited=0.0)
+
+def parse_point(lat, lon, radius):
+    """Coerce lat/lon/radius to floats; raises ValueError on bad input."""
+    lat, lon, radius = float(lat), float(lon), float(radius)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("latitude/longitude out of range")
+    if radius < 0:
+        raise ValueError("radius must be non-negative")
+    return lat, lon, radius
 
 # ==========================================================
 # Django REST API Views
@@ -130,6 +239,7 @@ def predict(request):
     lat = data.get("latitude")
     lon = data.get("longitude")
     radius = data.get("radius", 1000)  # default value if not provided
+    as_of = data.get("as_of")  # optional: severity as of this timestamp
 
     if lat is None or lon is None:
         return Response(
@@ -137,77 +247,259 @@ def predict(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    area = reverse_geocode(lat, lon)
-    severity_info = calculate_severity_from_csv(area.get("city"), area.get("road"))
+    try:
+        lat, lon, radius = parse_point(lat, lon, radius)
+    except (TypeError, ValueError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Load model on demand
-    model_instance = load_model()
+    # Under pressure, the area comes from the geocoder's caches and gazetteer only
+    ticket = admission_ticket(request)
+    area = reverse_geocode(lat, lon, network=not ticket.degraded)
+    try:
+        severity_info = calculate_severity_from_csv(area.get("city"), area.get("road"), as_of)
+    except ValueError as e:
+        return Response({"error": f"invalid as_of: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Get weather/temporal features (optional)
-    main_temp = data.get("main_temp", 0)
-    main_humidity = data.get("main_humidity", 0)
-    main_pressure = data.get("main_pressure", 0)
-    rain1h = data.get("rain1h", 0)
-    wind_speed = data.get("wind_speed", 0)
-    hour = data.get("hour", datetime.now().hour)
-    day_of_week = data.get("day_of_week", datetime.now().weekday())
-    month = data.get("month", datetime.now().month)
-    is_weekend = data.get("is_weekend", int(datetime.now().weekday() >= 5))
-
-    flood_prob = None
-    if model_instance is not None:
-        try:
-            features = np.array([[
-                main_temp,
-                main_humidity,
-                main_pressure,
-                rain1h,
-                wind_speed,
-                hour,
-                day_of_week,
-                month,
-                is_weekend
-            ]])
-            flood_prob = float(model_instance.predict_proba(features)[0, 1])
-        except Exception as e:
-            print("[predict] Model prediction failed:", e)
-            flood_prob = None
+    # Weather/temporal features are optional: missing ones come from the
+    # latest readings for the geocoded city, time features default to now
+    values = {c: data.get(api_name(c)) for c in FEATURE_COLUMNS}
+    city = data.get("city") or area.get("city")
+
+    try:
+        flood_prob = predict_probability(values, city)
+    except Exception as e:
+        print("[predict] Model prediction failed:", e)
+        flood_prob = None
 
     return Response({
         "area": area,
         "severity": severity_info,
         "ai_probability": flood_prob,
         "timestamp": datetime.now().isoformat(),
-        "radius": radius
+        "radius": radius,
+        "nearby_roads": roads_within(lat, lon, radius),
+        "degraded": ticket.degraded,
+    })
+
+# ==========================================================
+# Async predict (ASGI)
+# ==========================================================
+# Per-dependency time limits; a dependency that misses its limit is left
+# out of the response instead of failing the request
+PREDICT_GEOCODE_TIMEOUT = float(os.getenv("PREDICT_GEOCODE_TIMEOUT", "3"))
+PREDICT_MODEL_TIMEOUT = float(os.getenv("PREDICT_MODEL_TIMEOUT", "2"))
+
+# Separate bounded pools, so slow Nominatim calls cannot starve inference
+geocode_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("GEOCODE_POOL_WORKERS", "16")), thread_name_prefix="geocode")
+inference_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INFERENCE_POOL_WORKERS", str(os.cpu_count() or 2))),
+    thread_name_prefix="inference")
+
+async def run_bounded(pool, timeout, fn, *args):
+    """Run fn in `pool`; returns (result, None) or (None, "timeout" / error message)."""
+    future = asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    try:
+        return await asyncio.wait_for(future, timeout), None
+    except asyncio.TimeoutError:
+        return None, "timeout"
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+@csrf_exempt
+async def predict_async(request):
+    """
+    Same contract as `predict`, for ASGI servers (backend.asgi). Reverse
+    geocoding and inference run concurrently on bounded thread pools.
+    Inference uses the offline gazetteer's city so it does not wait for
+    Nominatim. If a dependency times out or fails, the response still
+    comes back: the area falls back to the gazetteer, ai_probability is
+    null, and the dependency is listed in "partial". Under pressure
+    ("degraded", see AdmissionMiddleware) the area comes from the
+    geocoder's caches and gazetteer only.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "method not allowed"}, status=405)
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return JsonResponse({"error": "invalid JSON body"}, status=400)
+    lat, lon = data.get("latitude"), data.get("longitude")
+    if lat is None or lon is None:
+        return JsonResponse({"error": "latitude and longitude are required"}, status=400)
+    try:
+        lat, lon, radius = parse_point(lat, lon, data.get("radius", 1000))
+    except (TypeError, ValueError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if road_data is None:
+        await asyncio.get_running_loop().run_in_executor(None, ensure_road_data)
+    nearest = get_geocoder().gazetteer.reverse(lat, lon)  # in-memory, microseconds
+    values = {c: data.get(api_name(c)) for c in FEATURE_COLUMNS}
+    city = data.get("city") or nearest.get("city")
+
+    ticket = admission_ticket(request)
+    if ticket.degraded:
+        # Cache/gazetteer lookup only (sqlite, so off the event loop), on the default
+        # executor: the geocode pool may be full of slow Nominatim calls
+        geocode = run_bounded(None, PREDICT_GEOCODE_TIMEOUT, reverse_geocode, lat, lon, False)
+    else:
+        geocode = run_bounded(geocode_pool, PREDICT_GEOCODE_TIMEOUT, reverse_geocode, lat, lon)
+    (area, geocode_error), (flood_prob, model_error) = await asyncio.gather(
+        geocode,
+        run_bounded(inference_pool, PREDICT_MODEL_TIMEOUT, predict_probability, values, city),
+    )
+    partial = {}
+    if geocode_error:
+        partial["geocode"] = geocode_error
+        area = nearest
+    if model_error:
+        print("[predict] Model prediction failed:", model_error)
+        partial["model"] = model_error
+
+    try:
+        severity_info = calculate_severity_from_csv(area.get("city"), area.get("road"), data.get("as_of"))
+    except ValueError as e:
+        return JsonResponse({"error": f"invalid as_of: {e}"}, status=400)
+
+    return JsonResponse({
+        "area": area,
+        "severity": severity_info,
+        "ai_probability": flood_prob,
+        "timestamp": datetime.now().isoformat(),
+        "radius": radius,
+        "nearby_roads": roads_within(lat, lon, radius),
+        "partial": partial,
+        "degraded": ticket.degraded,
     })
 
+@api_view(['GET'])
+def predict_cache_stats(request):
+    """
+    Hit ratio, evictions and size of the prediction cache.
+    """
+    return Response(prediction_cache.stats())
+
+def readiness(request):
+    """
+    Readiness probe: 200 once the startup warm-up finished, 503 before.
+    """
+    state = startup.status()
+    return JsonResponse(state, status=200 if state["ready"] else 503)
+
+def prometheus_metrics(request):
+    """
+    Prometheus text exposition of spans, request latencies and cache gauges.
+    """
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    candidates = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in candidates or etag in candidates
+
 @api_view(['GET'])
 def roads(request):
     """
-    Returns all roads from CSV (for debugging)
+    Returns road records as paginated, columnar JSON.
+    Query params: fields, city, road_sector, limit, cursor.
     """
-    all_roads = []
-    for _, row in road_data.iterrows():
-        all_roads.append({
-            "road_sector": row.get("Road_Sector", "Unknown"),
-            "city": row.get("City", "Unknown"),
-            "latitude": row.get("latitude"),
-            "longitude": row.get("longitude"),
-        })
-    return Response(all_roads)
+    ensure_road_data()
+    payload = roads_payload  # pin one version for the whole request
+    try:
+        body, gzipped, etag = payload.render(request.query_params)
+    except InvalidQuery as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    elif "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = HttpResponse(gzipped, content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = "no-cache"
+    return response
 
-@api_view(['POST'])
-def retrain(request):
+
+@api_view(['GET'])
+def heatmap_tile(request):
     """
-    Retrains the model using the AI pipeline and reloads it.
+    Precomputed flood probabilities for the map.
+    Query params: bbox (south,west,north,east), zoom.
     """
+    grid = heatmap.grid  # pin one version for the whole request
+    if grid is None:
+        return Response({"error": "heatmap not available yet"},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    try:
+        bbox, zoom = parse_tile_query(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    etag = grid.etag(bbox, zoom)
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = Response(grid.tile(bbox, zoom))
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@api_view(['GET'])
+def roads_nearby(request):
+    """
+    Returns road records within `radius` meters of (lat, lon), nearest first.
+    """
+    params = request.query_params
+    if params.get("lat") is None or params.get("lon") is None:
+        return Response(
+            {"error": "lat and lon are required"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        lat, lon, radius = parse_point(params["lat"], params["lon"], params.get("radius", 1000))
+    except (TypeError, ValueError) as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    nearby = roads_within(lat, lon, radius)
+    return Response({"count": len(nearby), "radius": radius, "roads": nearby})
+
+
+def run_retrain_pipeline():
     from production_model.pipeline import run_pipeline
+    return run_pipeline()
+
+def install_model(new_model):
     global model
-    try:
-        run_pipeline()
-        model = None
-        load_model()  # reload after retrain
-        return JsonResponse({"status": "success", "message": "Model retrained and reloaded."})
-    except Exception as e:
-        return JsonResponse({"status": "error", "message": str(e)}, status=500)
+    model = serving_model(new_model)  # single reference swap; never None while serving
+    heatmap.poke()
+    prefork.request_reload()  # under a pre-forking master, every worker moves to the new model
+
+def reload_model():
+    with model_lock:
+        return get_artifacts().load_joblib("best_flood_model.pkl")
+
+retrain_jobs = RetrainJobs(train=run_retrain_pipeline, install=install_model, reload=reload_model)
+
+
+@api_view(['POST'])
+def retrain(request):
+    """
+    Starts (or joins) a background retrain job and returns its id.
+    """
+    return Response(retrain_jobs.submit(), status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+def retrain_status(request, job_id):
+    """
+    Status of a retrain job started via POST /retrain/.
+    """
+    job = retrain_jobs.get(job_id)
+    if job is None:
+        return Response({"error": "unknown job id"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job)
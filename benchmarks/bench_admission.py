@@ -0,0 +1,143 @@
+"""
+bench_admission.py
+------------------
+Open-loop load test of /api/predict/async/ (one ASGI event loop, like a
+uvicorn worker) at increasing arrival rates, with and without admission
+control (production_model/admission.py). Nominatim is replaced by a
+stand-in that takes `--geocode-ms` per call (slow, as during a typhoon),
+and every request asks about a different spot, so caches do not help.
+
+Requests arrive as a Poisson process regardless of how the server keeps
+up (clients do not wait for each other), which is what makes a burst
+pile up. Per rate it reports:
+  goodput    200 responses within the latency target, per second of load
+  ok/shed    200 / 503 responses; degraded = 200s served without Nominatim
+  p50/p99    latency of the 200 responses
+  max queue  most requests seen waiting for an admission slot
+
+Usage (from the repo root):
+    python -m benchmarks.bench_admission --rates 25 50 100 200 400 --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ.setdefault("DJANGO_SECRET_KEY", "bench")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("GEOCODE_CACHE_PATH", "")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, ROOT)
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import AsyncClient  # noqa: E402
+
+from benchmarks.bench_async_predict import fake_nominatim, payloads  # noqa: E402
+from benchmarks.fakes import FakeStorage, FakeSupabase, seeded_bucket  # noqa: E402
+from flood import views  # noqa: E402
+from flood.geocoding import get_geocoder  # noqa: E402
+from production_model import storage  # noqa: E402
+from production_model.admission import AdmissionControl  # noqa: E402
+from production_model.artifacts import ArtifactCache  # noqa: E402
+
+
+async def run_rate(rate, seconds, slo, seed):
+    client = AsyncClient()
+    rng = np.random.default_rng(seed)
+    arrivals = np.cumsum(rng.exponential(1 / rate, size=int(rate * seconds * 1.5)))
+    arrivals = arrivals[arrivals < seconds]
+    bodies = payloads(len(arrivals), seed=seed)
+    results = []
+    max_queue = 0
+
+    async def one(body):
+        start = time.perf_counter()
+        response = await client.post("/api/predict/async/", json.dumps(body), content_type="application/json")
+        elapsed = time.perf_counter() - start
+        degraded = response.status_code == 200 and json.loads(response.content)["degraded"]
+        results.append((response.status_code, elapsed, degraded))
+
+    async def watch_queue():
+        nonlocal max_queue
+        while True:
+            max_queue = max(max_queue, views.predict_admission.stats()["queue_depth"])
+            await asyncio.sleep(0.01)
+
+    watcher = asyncio.create_task(watch_queue())
+    start = time.perf_counter()
+    tasks = []
+    for at, body in zip(arrivals, bodies):
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(body)))
+    await asyncio.gather(*tasks)
+    watcher.cancel()
+
+    codes = np.array([r[0] for r in results])
+    latencies = np.array([r[1] for r in results])
+    ok = codes == 200
+    good = ok & (latencies <= slo)
+    ok_ms = latencies[ok] * 1e3 if ok.any() else np.array([np.nan])
+    return {
+        "sent": len(results),
+        "goodput": good.sum() / seconds,
+        "ok": int(ok.sum()),
+        "shed": int((codes == 503).sum()),
+        "degraded": sum(r[2] for r in results),
+        "p50": float(np.percentile(ok_ms, 50)),
+        "p99": float(np.percentile(ok_ms, 99)),
+        "max_queue": max_queue,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rates", type=float, nargs="+", default=[25, 50, 100, 200, 400],
+                        help="arrival rates, requests/second")
+    parser.add_argument("--seconds", type=float, default=5, help="length of each load step")
+    parser.add_argument("--geocode-ms", type=float, default=1000)
+    parser.add_argument("--slo-ms", type=float, default=2000, help="latency target for goodput")
+    args = parser.parse_args()
+
+    fake = FakeStorage(seeded_bucket())
+    storage.configure(client=FakeSupabase(fake),
+                      artifacts=ArtifactCache(fake, storage.BUCKET_NAME, tempfile.mkdtemp(prefix="flood-admission-")))
+    views.ensure_road_data()
+    views.warm_model()
+    geocoder = get_geocoder()
+    geocoder.offline, geocoder.disk, geocoder.lru_size = False, None, 0
+    geocoder.network_lookup = fake_nominatim(0.0, args.geocode_ms / 1e3, args.geocode_ms / 1e3)
+
+    modes = {
+        "no admission": AdmissionControl(limit=10 ** 9),
+        "admission": AdmissionControl(),
+    }
+    limits = modes["admission"]
+    print(f"[bench] Nominatim {args.geocode_ms:.0f} ms/call, geocode pool {views.geocode_pool._max_workers} "
+          f"threads; admission limit {limits.limit}, {limits.max_waiting} waiting, "
+          f"{limits.max_wait * 1e3:.0f} ms max wait; goodput = 200s within {args.slo_ms:.0f} ms")
+    for rate in args.rates:
+        for label, admission in modes.items():
+            views.predict_admission = admission
+            r = asyncio.run(run_rate(rate, args.seconds, args.slo_ms / 1e3, seed=int(rate)))
+            print(f"[bench] {rate:5.0f} req/s {label:<12}: goodput {r['goodput']:6.1f}/s  "
+                  f"ok {r['ok']:5d} (degraded {r['degraded']:5d})  shed {r['shed']:5d}  "
+                  f"p50 {r['p50']:7.0f} ms  p99 {r['p99']:7.0f} ms  max queue {r['max_queue']}")
+            time.sleep(args.geocode_ms / 1e3)  # let leftover geocode calls finish
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+bench_ai_client.py
+------------------
+Exercises backend/flood/ai_client.py against a local stand-in of the AI
+microservice: the real FastAPI app from production_model/app.py with a
+synthetic model, served by uvicorn on 127.0.0.1. Reports
+
+- per-call latency: in-process model vs pooled client vs a new
+  connection per call (the service's prediction cache is warm after the
+  first pass, as in production),
+- coalescing of identical concurrent requests,
+- one /predict/batch call vs a loop of /predict calls,
+- behaviour during an outage: fallbacks and circuit-breaker short circuits.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_ai_client
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, ROOT)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+from flood.ai_client import AIClient, CircuitBreaker  # noqa: E402
+from production_model import app as app_module  # noqa: E402
+from production_model.compiled_model import serving_model  # noqa: E402
+from production_model.feature_store import FEATURE_COLUMNS, get_latest_features  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stand_in(port):
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread
+
+
+def per_call_ms(fn, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, len(FEATURE_COLUMNS)))
+    y = (X[:, 3] + 0.5 * X[:, 0] + rng.normal(scale=0.7, size=len(X)) > 0).astype(int)
+    local_model = serving_model(RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y))
+    app_module.install_model(local_model)
+    table = get_latest_features()
+
+    def local(values, city):
+        return float(local_model.predict_proba(table.vector(values, city=city)[None, :])[0, 1])
+
+    port = free_port()
+    server, thread = start_stand_in(port)
+    base_url = f"http://127.0.0.1:{port}"
+    client = AIClient(base_url, fallback=local, timeout=2,
+                      breaker=CircuitBreaker(failures=5, reset=60))
+    rows = [({"rain1h": round(float(r), 2)}, "Quezon City") for r in rng.exponential(3.0, args.calls)]
+
+    print(f"[bench] stand-in at {base_url}, {args.calls} calls each")
+    ms = per_call_ms(lambda i: local(*rows[i]), args.calls)
+    print(f"[bench] in-process model        : {ms:7.2f} ms/call")
+    ms = per_call_ms(lambda i: client.predict(*rows[i]), args.calls)
+    print(f"[bench] pooled client           : {ms:7.2f} ms/call")
+    ms = per_call_ms(lambda i: httpx.post(f"{base_url}/predict",
+                                          json=AIClient.payload(*rows[i])).raise_for_status(), args.calls)
+    print(f"[bench] new connection per call : {ms:7.2f} ms/call")
+
+    start = time.perf_counter()
+    batch = client.predict_many(rows)
+    batch_ms = (time.perf_counter() - start) * 1e3
+    print(f"[bench] predict_many ({len(rows)} rows)   : {batch_ms:7.2f} ms total "
+          f"({batch_ms / len(rows):.3f} ms/row)")
+
+    before = client.stats()["calls"]
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(lambda _: client.predict({"rain1h": 12.5}, "Marikina City"), range(256)))
+    stats = client.stats()
+    print(f"[bench] 256 identical concurrent requests -> {stats['calls'] - before} HTTP calls "
+          f"({stats['coalesced']} coalesced, {len(set(results))} distinct answer)")
+
+    server.should_exit = True
+    thread.join()
+    start = time.perf_counter()
+    outage = [client.predict(*row) for row in rows[:50]]
+    seconds = time.perf_counter() - start
+    stats = client.stats()
+    print(f"[bench] outage, 50 requests     : {seconds * 1e3 / 50:7.2f} ms/call, "
+          f"{stats['failures']} failed calls, {stats['short_circuited']} short-circuited, "
+          f"breaker {stats['breaker']}, all answered: {all(p is not None for p in outage)}")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
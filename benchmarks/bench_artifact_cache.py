@@ -0,0 +1,110 @@
+"""
+bench_artifact_cache.py
+-----------------------
+Cold-start vs warm-start model load times through ArtifactCache, compared to
+the old download-into-memory path. Supabase is replaced by an in-process
+stand-in that simulates network bandwidth and a metadata round trip.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_artifact_cache --bandwidth-mbps 50
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model.artifacts import ArtifactCache  # noqa: E402
+
+
+class FakeBucket:
+    def __init__(self, files, bandwidth_mbps, rtt):
+        self.files, self.bandwidth_mbps, self.rtt = files, bandwidth_mbps, rtt
+        self.downloads = 0
+
+    def download(self, name):
+        data = self.files[name]
+        time.sleep(self.rtt + len(data) * 8 / (self.bandwidth_mbps * 1e6))
+        self.downloads += 1
+        return data
+
+    def list(self, path=None, options=None):
+        time.sleep(self.rtt)
+        return [
+            {"name": name, "updated_at": "2025-10-01T00:00:00Z",
+             "metadata": {"eTag": hashlib.md5(data).hexdigest(), "size": len(data)}}
+            for name, data in self.files.items()
+            if not options or options.get("search", "") in name
+        ]
+
+
+class FakeStorage:
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def from_(self, _name):
+        return self.bucket
+
+
+def model_bytes(n_estimators):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(20000, 9))
+    y = (X[:, 3] + rng.normal(size=len(X)) > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=0).fit(X, y)
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+    return buf.getvalue()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--bandwidth-mbps", type=float, default=50.0)
+    parser.add_argument("--rtt-ms", type=float, default=80.0)
+    parser.add_argument("--trees", type=int, default=100)
+    args = parser.parse_args()
+
+    data = model_bytes(args.trees)
+    bucket = FakeBucket({"best_flood_model.pkl": data}, args.bandwidth_mbps, args.rtt_ms / 1e3)
+    storage = FakeStorage(bucket)
+    print(f"[bench] model artifact: {len(data) / 1e6:.1f} MB, "
+          f"{args.bandwidth_mbps:g} Mbit/s, {args.rtt_ms:g} ms RTT")
+
+    ms = timed(lambda: joblib.load(io.BytesIO(bucket.download("best_flood_model.pkl"))))
+    print(f"  old path (download every start): {ms:8.1f} ms")
+
+    cache_dir = tempfile.mkdtemp(prefix="artifact-bench-")
+    try:
+        cold = ArtifactCache(storage, "data", cache_dir=cache_dir, revalidate_after=0)
+        ms = timed(lambda: cold.load_joblib("best_flood_model.pkl"))
+        print(f"  cold start (empty cache)       : {ms:8.1f} ms")
+
+        warm = ArtifactCache(storage, "data", cache_dir=cache_dir, revalidate_after=0)
+        ms = timed(lambda: warm.load_joblib("best_flood_model.pkl"))
+        print(f"  warm start (revalidate)        : {ms:8.1f} ms")
+
+        fresh = ArtifactCache(storage, "data", cache_dir=cache_dir, revalidate_after=3600)
+        ms = timed(lambda: fresh.load_joblib("best_flood_model.pkl"))
+        print(f"  warm start (within TTL)        : {ms:8.1f} ms")
+        print(f"  downloads performed            : {bucket.downloads} (1 old path + 1 cold)")
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+bench_async_predict.py
+----------------------
+Load test of the Django predict view: the synchronous DRF view behind a
+fixed pool of WSGI workers (like gunicorn sync workers) vs predict_async
+on one ASGI event loop. Nominatim is replaced by a stand-in that sleeps
+(most calls fast, a few slow), so no network is needed. Reports
+requests/sec, p50/p99 latency and how many async responses were partial.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_async_predict --requests 400 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+os.environ.setdefault("DJANGO_SECRET_KEY", "bench")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("GEOCODE_CACHE_PATH", "")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, ROOT)
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import AsyncClient, Client  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+from flood import views  # noqa: E402
+from flood.geocoding import get_geocoder  # noqa: E402
+from production_model.feature_store import FEATURE_COLUMNS  # noqa: E402
+
+
+def fake_nominatim(slow_fraction, fast_s, slow_s):
+    def lookup(lat, lon, timeout=10):
+        time.sleep(min(slow_s if random.random() < slow_fraction else fast_s, timeout))
+        return {"city": "Quezon City", "road": "EDSA", "neighborhood": None,
+                "full_address": f"{lat:.4f}, {lon:.4f}"}
+    return lookup
+
+
+def payloads(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"latitude": float(rng.uniform(14.40, 14.75)), "longitude": float(rng.uniform(120.95, 121.10)),
+             "radius": 300, "rain1h": float(rng.exponential(2.0))} for _ in range(n)]
+
+
+def summarize(label, latencies, seconds, extra=""):
+    lat_ms = np.array(latencies) * 1e3
+    print(f"[bench] {label:<26}: {len(lat_ms) / seconds:7.1f} req/s  p50 {np.percentile(lat_ms, 50):7.1f} ms  "
+          f"p99 {np.percentile(lat_ms, 99):7.1f} ms{extra}")
+
+
+def run_wsgi(bodies, workers, concurrency):
+    # `concurrency` clients share `workers` request slots; waiting for a slot counts
+    slots = threading.Semaphore(workers)
+
+    def one(body):
+        start = time.perf_counter()
+        with slots:
+            response = Client().post("/api/predict/", json.dumps(body), content_type="application/json")
+        assert response.status_code == 200, response.content[:200]
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, bodies))
+    return latencies, time.perf_counter() - start
+
+
+async def run_asgi(bodies, concurrency):
+    client = AsyncClient()
+    gate = asyncio.Semaphore(concurrency)
+    partial = 0
+
+    async def one(body):
+        nonlocal partial
+        async with gate:
+            start = time.perf_counter()
+            response = await client.post("/api/predict/async/", json.dumps(body), content_type="application/json")
+            assert response.status_code == 200, response.content[:200]
+            partial += bool(json.loads(response.content)["partial"])
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one(b) for b in bodies))
+    return latencies, time.perf_counter() - start, partial
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--wsgi-workers", type=int, default=4)
+    parser.add_argument("--geocode-ms", type=float, default=150)
+    parser.add_argument("--slow-geocode-s", type=float, default=5.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.02)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, len(FEATURE_COLUMNS)))
+    y = (X[:, 3] + 0.5 * X[:, 0] + rng.normal(scale=0.7, size=len(X)) > 0).astype(int)
+    views.install_model(RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y))
+
+    geocoder = get_geocoder()
+    geocoder.offline, geocoder.disk, geocoder.lru_size = False, None, 0
+    random.seed(0)
+    geocoder.network_lookup = fake_nominatim(args.slow_fraction, args.geocode_ms / 1e3, args.slow_geocode_s)
+    bodies = payloads(args.requests)
+    print(f"[bench] {args.requests} requests; geocode {args.geocode_ms:.0f} ms, "
+          f"{args.slow_fraction:.0%} take {args.slow_geocode_s:.0f} s; "
+          f"async geocode limit {views.PREDICT_GEOCODE_TIMEOUT:.0f} s")
+
+    latencies, seconds = run_wsgi(bodies, args.wsgi_workers, args.concurrency)
+    summarize(f"WSGI, {args.wsgi_workers} workers", latencies, seconds)
+    latencies, seconds, partial = asyncio.run(run_asgi(bodies, args.concurrency))
+    summarize(f"ASGI, {args.concurrency} in flight", latencies, seconds, f"  ({partial} partial)")
+
+
+if __name__ == "__main__":
+    main()
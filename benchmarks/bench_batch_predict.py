@@ -0,0 +1,98 @@
+"""
+bench_batch_predict.py
+----------------------
+Compares rows/sec of POST /predict/batch against looping over POST /predict
+on the FastAPI microservice. Runs fully in-process with a synthetic model,
+so no Supabase access is needed.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_batch_predict --rows 500 --batch-sizes 10 100 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+from production_model import app as app_module  # noqa: E402
+
+
+def synthetic_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "main_temp": float(rng.uniform(24, 34)),
+            "main_humidity": float(rng.uniform(50, 100)),
+            "main_pressure": float(rng.uniform(995, 1015)),
+            "rain1h": float(rng.exponential(2.0)),
+            "wind_speed": float(rng.uniform(0, 10)),
+            "hour": int(rng.integers(0, 24)),
+            "day_of_week": int(rng.integers(0, 7)),
+            "month": int(rng.integers(1, 13)),
+            "is_weekend": int(rng.integers(0, 2)),
+            "rain_3h": float(rng.exponential(4.0)),
+            "rain_6h": float(rng.exponential(8.0)),
+            "rain_24h": float(rng.exponential(20.0)),
+            "pressure_tendency_3h": float(rng.normal(0, 1.5)),
+            "humidity_trend_3h": float(rng.normal(0, 7)),
+        }
+        for _ in range(n)
+    ]
+
+
+def synthetic_model(n_features, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(2000, n_features))
+    y = (X[:, 3] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+    return RandomForestClassifier(n_estimators=100, random_state=seed).fit(X, y)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+
+    app_module.model = synthetic_model(len(app_module.FEATURE_ORDER))
+    app_module.PREDICT_MAX_BATCH_SIZE = max(args.batch_sizes + [args.rows])
+    client = TestClient(app_module.app)
+    rows = synthetic_rows(args.rows)
+
+    # Warm up both paths
+    client.post("/predict", json=rows[0])
+    client.post("/predict/batch", json={"rows": rows[:10]})
+
+    start = time.perf_counter()
+    looped = [client.post("/predict", json=r).json()["flood_probability"] for r in rows]
+    loop_elapsed = time.perf_counter() - start
+    print(f"[bench] /predict loop        : {args.rows / loop_elapsed:10.1f} rows/s")
+
+    for size in args.batch_sizes:
+        batched = []
+        start = time.perf_counter()
+        for i in range(0, args.rows, size):
+            resp = client.post("/predict/batch", json={"rows": rows[i:i + size]})
+            batched.extend(resp.json()["flood_probabilities"])
+        elapsed = time.perf_counter() - start
+        assert np.allclose(batched, looped), "batch results differ from /predict"
+        print(f"[bench] /predict/batch n={size:<5}: {args.rows / elapsed:10.1f} rows/s "
+              f"({loop_elapsed / elapsed:.1f}x)")
+
+    columns = {f: [r[f] for r in rows] for f in app_module.FEATURE_ORDER}
+    start = time.perf_counter()
+    resp = client.post("/predict/batch", json={"columns": columns})
+    elapsed = time.perf_counter() - start
+    assert np.allclose(resp.json()["flood_probabilities"], looped)
+    print(f"[bench] /predict/batch columnar: {args.rows / elapsed:10.1f} rows/s "
+          f"({loop_elapsed / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
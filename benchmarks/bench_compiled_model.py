@@ -0,0 +1,86 @@
+"""
+bench_compiled_model.py
+-----------------------
+Parity check and per-row latency of CompiledEnsemble against sklearn's
+predict_proba for the tree models trainer.train_model can select.
+Exits non-zero if compiled probabilities drift from sklearn's.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_compiled_model --rows 2000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model.compiled_model import CompiledEnsemble, compile_model  # noqa: E402
+from production_model.feature_store import FEATURE_COLUMNS  # noqa: E402
+
+N_FEATURES = len(FEATURE_COLUMNS)
+
+
+def per_row_us(predict, X, repeats):
+    start = time.perf_counter()
+    for i in range(repeats):
+        predict(X[i % len(X)][None, :])
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, N_FEATURES))
+    y = (X[:, 3] + 0.5 * X[:, 0] + rng.normal(scale=0.7, size=len(X)) > 0).astype(int)
+    X_eval = rng.normal(size=(args.rows, N_FEATURES)) * 1.5
+
+    models = {
+        "RandomForest": RandomForestClassifier(n_estimators=100, random_state=42,
+                                               class_weight="balanced"),
+        "GradientBoosting": GradientBoostingClassifier(random_state=42),
+    }
+
+    ok = True
+    for name, model in models.items():
+        model.fit(X, y)
+        compiled = compile_model(model)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "compiled.npz")
+            compiled.save(path)
+            reloaded = CompiledEnsemble.load(path)
+
+        expected = model.predict_proba(X_eval)
+        max_err = max(np.abs(m.predict_proba(X_eval) - expected).max() for m in (compiled, reloaded))
+        labels_match = np.array_equal(compiled.predict(X_eval), model.predict(X_eval))
+        ok &= max_err < 1e-9 and labels_match
+        print(f"[bench] {name}: parity max |dp| = {max_err:.2e}, labels match: {labels_match}")
+
+        sk = per_row_us(model.predict_proba, X_eval, args.repeats)
+        fast = per_row_us(compiled.predict_proba, X_eval, args.repeats)
+        print(f"  single row : sklearn {sk:9.1f} us   compiled {fast:8.1f} us   ({sk / fast:.0f}x)")
+        for batch in (16, 256):
+            start = time.perf_counter()
+            model.predict_proba(X_eval[:batch])
+            sk = (time.perf_counter() - start) / batch * 1e6
+            start = time.perf_counter()
+            compiled.predict_proba(X_eval[:batch])
+            fast = (time.perf_counter() - start) / batch * 1e6
+            print(f"  batch {batch:<4} : sklearn {sk:9.1f} us/row compiled {fast:8.1f} us/row")
+
+    if not ok:
+        sys.exit("[bench] compiled model does not match sklearn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+bench_feature_store.py
+----------------------
+Cost of the rolling weather features: computing them for every month of
+weather data, building the latest-values table, and filling one request's
+feature vector from the table vs filtering the weather DataFrame per
+request.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_feature_store
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model import feature_store  # noqa: E402
+
+
+def timed(fn, repeats=1):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def per_request_scan(weather, city):
+    """What a request would cost without the table: slice and sum on the fly."""
+    rows = weather[weather["city"] == city]
+    latest = rows["datetime"].max()
+    recent = rows[rows["datetime"] > latest - feature_store.pd.Timedelta(hours=24)]
+    return recent["rain1h"].sum(), rows.loc[rows["datetime"].idxmax(), "main.temp"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    seconds = timed(lambda: feature_store.load_weather())
+    weather = feature_store.load_weather()
+    print(f"[bench] load weather            : {seconds * 1e3:8.1f} ms ({len(weather)} rows)")
+    seconds = timed(lambda: feature_store.add_rolling_features(weather))
+    print(f"[bench] rolling features (all)  : {seconds * 1e3:8.1f} ms")
+
+    recent = feature_store.load_weather(start=feature_store._recent_start())
+    seconds = timed(lambda: feature_store.LatestFeatures.from_weather(recent))
+    table = feature_store.LatestFeatures.from_weather(recent)
+    print(f"[bench] latest table build      : {seconds * 1e3:8.1f} ms "
+          f"({len(table.cities)} cities, {table.values.nbytes} bytes)")
+
+    cities = [table.cities[i % len(table.cities)] for i in range(args.lookups)]
+    it = iter(cities)
+    seconds = timed(lambda: table.vector({"rain1h": 2.0}, city=next(it)), repeats=args.lookups)
+    print(f"[bench] table.vector per request: {seconds * 1e6:8.1f} us")
+
+    weather["city"] = weather["city"].astype(str)
+    it = iter(cities)
+    seconds = timed(lambda: per_request_scan(weather, next(it)), repeats=200)
+    print(f"[bench] DataFrame scan / request: {seconds * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+bench_heatmap.py
+----------------
+Full-grid refresh time (features for every cell + one predict_proba call)
+and per-tile latency of the precomputed heatmap at several zoom levels,
+with a model trained on synthetic data and the local weather snapshot.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_heatmap
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model import heatmap  # noqa: E402
+from production_model.compiled_model import serving_model  # noqa: E402
+from production_model.feature_store import FEATURE_COLUMNS, get_latest_features  # noqa: E402
+
+
+def timed(fn, repeats=1):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeats", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, len(FEATURE_COLUMNS)))
+    y = (X[:, 3] + 0.5 * X[:, 0] + rng.normal(scale=0.7, size=len(X)) > 0).astype(int)
+    model = serving_model(RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y))
+    table = get_latest_features()
+
+    lat, lon = heatmap.grid_axes()
+    seconds = timed(lambda: heatmap.grid_features(table, lat, lon), repeats=5)
+    print(f"[bench] grid features           : {seconds * 1e3:8.1f} ms ({len(lat)} x {len(lon)} cells)")
+    seconds = timed(lambda: heatmap.score_grid(model, table), repeats=5)
+    grid = heatmap.score_grid(model, table)
+    print(f"[bench] full refresh            : {seconds * 1e3:8.1f} ms "
+          f"({grid.probabilities.nbytes / 1024:.1f} KiB float32)")
+
+    refresher = heatmap.HeatmapRefresher(get_model=lambda: model, get_table=lambda: table)
+    refresher.refresh()
+    seconds = timed(refresher.refresh, repeats=100)
+    print(f"[bench] unchanged check         : {seconds * 1e6:8.1f} us")
+
+    makati = (14.53, 121.00, 14.58, 121.05)
+    for label, bbox, zoom in [("whole grid, zoom 10", None, 10),
+                              ("whole grid, zoom 14", None, 14),
+                              ("Makati bbox, zoom 14", makati, 14),
+                              ("Makati bbox, zoom 12", makati, 12)]:
+        tile = grid.tile(bbox, zoom)
+        seconds = timed(lambda: grid.tile(bbox, zoom), repeats=args.repeats)
+        etag_seconds = timed(lambda: grid.etag(bbox, zoom), repeats=args.repeats)
+        print(f"[bench] tile {label:<19}: {seconds * 1e6:8.1f} us  "
+              f"(shape {tile['shape']}; ETag check {etag_seconds * 1e6:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
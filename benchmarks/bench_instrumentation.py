@@ -0,0 +1,96 @@
+"""
+bench_instrumentation.py
+------------------------
+Overhead of the metrics layer: the cost of one span, and /predict latency
+on the AI microservice (in-process, fake storage) with metrics disabled,
+enabled, and with the per-request profiler switched on via X-Profile.
+Also times rendering /metrics.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_instrumentation --requests 2000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import install_fake_supabase, seeded_bucket  # noqa: E402
+
+
+def per_call_us(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["PROFILE_DIR"] = tempfile.mkdtemp(prefix="flood-profiles-")
+    os.environ["ARTIFACT_CACHE_DIR"] = tempfile.mkdtemp(prefix="flood-artifacts-")
+    install_fake_supabase(seeded_bucket())
+
+    from fastapi.testclient import TestClient
+
+    from production_model import app as app_module, metrics, profiler
+    from production_model.metrics import span
+
+    def bare(_):
+        pass
+
+    def with_span(_):
+        with span("bench"):
+            pass
+
+    base = per_call_us(bare, args.spans)
+    print(f"[bench] span, metrics enabled     : {per_call_us(with_span, args.spans) - base:6.2f} us")
+    metrics.ENABLED = False
+    print(f"[bench] span, metrics disabled    : {per_call_us(with_span, args.spans) - base:6.2f} us")
+
+    client = TestClient(app_module.app)
+    rng = np.random.default_rng(0)
+    # Distinct rows so every request runs the model (no prediction-cache hits)
+    payloads = [{"city": "Quezon City", "rain1h": float(r)} for r in rng.exponential(3.0, args.requests)]
+
+    def predict(i, headers=None):
+        client.post("/predict", json=payloads[i % len(payloads)], headers=headers).raise_for_status()
+
+    def run(enabled):
+        metrics.ENABLED = enabled
+        app_module.prediction_cache.clear()
+        return per_call_us(predict, args.requests)
+
+    for i in range(50):
+        predict(i)
+    # Interleaved rounds; the medians damp drift between runs
+    rounds = [(run(False), run(True)) for _ in range(args.rounds)]
+    off, on = np.median(rounds, axis=0)
+    print(f"[bench] /predict, metrics disabled: {off:8.1f} us/request (median of {args.rounds})")
+    print(f"[bench] /predict, metrics enabled : {on:8.1f} us/request")
+    print(f"        overhead {on - off:+.1f} us/request ({(on - off) / off:+.1%})")
+
+    profiler.ALLOWED = True
+    app_module.prediction_cache.clear()
+    n = max(args.requests // 10, 20)
+    us = per_call_us(lambda i: predict(i, headers={"X-Profile": "1"}), n)
+    print(f"[bench] /predict, profiled         : {us:8.1f} us/request ({n} requests, "
+          f"{len(os.listdir(os.environ['PROFILE_DIR']))} profiles written)")
+
+    us = per_call_us(lambda i: metrics.render(), 200)
+    print(f"[bench] render /metrics           : {us:8.1f} us ({len(metrics.render().splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main()
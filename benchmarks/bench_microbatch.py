@@ -0,0 +1,88 @@
+"""
+bench_microbatch.py
+-------------------
+Throughput and tail latency of single-row scoring with MicroBatcher vs one
+predict_proba call per request on a thread pool (what the old sync
+/predict did), for a range of concurrent clients. Every request has a
+distinct row, so nothing is served from the prediction cache.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_microbatch --concurrency 1 8 32 128 --window-ms 2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model.batching import MicroBatcher  # noqa: E402
+from production_model.compiled_model import serving_model  # noqa: E402
+from production_model.feature_store import FEATURE_COLUMNS  # noqa: E402
+
+
+async def closed_loop(score, rows, concurrency):
+    """`concurrency` clients each sending their next request when the last returns."""
+    latencies = []
+    it = iter(rows)
+
+    async def client():
+        for row in it:
+            start = time.perf_counter()
+            await score(row)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.array(latencies) * 1e3, time.perf_counter() - start
+
+
+def report(label, latencies, seconds, extra=""):
+    print(f"  {label:<10}: {len(latencies) / seconds:8.0f} req/s  p50 {np.percentile(latencies, 50):6.2f} ms  "
+          f"p99 {np.percentile(latencies, 99):7.2f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--window-ms", type=float, default=0.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, len(FEATURE_COLUMNS)))
+    y = (X[:, 3] + 0.5 * X[:, 0] + rng.normal(scale=0.7, size=len(X)) > 0).astype(int)
+    model = serving_model(RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y))
+    rows = rng.normal(size=(args.requests, len(FEATURE_COLUMNS)))
+
+    # FastAPI runs sync endpoints on a 40-thread pool
+    pool = ThreadPoolExecutor(max_workers=40)
+
+    async def unbatched(row):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, lambda: model.predict_proba(row[None, :])[0, 1])
+
+    for concurrency in args.concurrency:
+        print(f"[bench] {concurrency} concurrent clients, {args.requests} requests")
+        report("per-call", *asyncio.run(closed_loop(unbatched, rows, concurrency)))
+
+        batcher = MicroBatcher(window=args.window_ms / 1e3, max_batch=args.max_batch, max_queue=4096)
+
+        async def batched(row):
+            return await asyncio.wrap_future(batcher.submit(model, row))
+
+        latencies, seconds = asyncio.run(closed_loop(batched, rows, concurrency))
+        stats = batcher.stats()
+        report("batched", latencies, seconds,
+               f"  (mean batch {stats['batch_size_mean']}, queue delay p99 {stats['queue_delay_ms_p99']} ms)")
+
+
+if __name__ == "__main__":
+    main()
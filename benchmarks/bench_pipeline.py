@@ -0,0 +1,62 @@
+"""
+bench_pipeline.py
+-----------------
+Per-stage timings of run_pipeline against an in-memory stand-in for the
+Supabase bucket: a cold run, a rerun with the training CSV unchanged
+(train/upload come from the stage cache), a rerun after the CSV changed,
+and a forced rebuild. Caches live in a temp directory.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_pipeline
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model import pipeline, storage as storage_module  # noqa: E402
+from production_model.artifacts import ArtifactCache  # noqa: E402
+from benchmarks.fakes import TRAINING_CSV, FakeBucket, FakeStorage, FakeSupabase  # noqa: E402
+
+
+def run(label, bucket, **kwargs):
+    before = (bucket.downloads, bucket.uploads)
+    start = time.perf_counter()
+    result = pipeline.run_pipeline(**kwargs)
+    seconds = time.perf_counter() - start
+    stages = ", ".join(f"{name}={info['status']}:{info['seconds']:.2f}s"
+                       for name, info in result["stages"].items())
+    print(f"[bench] {label:<22}: {seconds:6.2f} s  downloads +{bucket.downloads - before[0]}, "
+          f"uploads +{bucket.uploads - before[1]}  [{stages}]\n")
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__.split("\n")[1]).parse_args()
+    with open(TRAINING_CSV, "rb") as f:
+        csv_bytes = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["PIPELINE_CACHE_DIR"] = os.path.join(tmp, "pipeline")
+        bucket = FakeBucket({pipeline.TRAINING_CSV: csv_bytes})
+        storage = FakeStorage(bucket)
+        storage_module.configure(
+            client=FakeSupabase(storage),
+            artifacts=ArtifactCache(storage, "data", cache_dir=os.path.join(tmp, "artifacts"),
+                                    revalidate_after=0),
+        )
+        pipeline.fetch_latest_data = lambda: None  # scraping is measured in bench_scraper
+
+        run("cold", bucket)
+        run("unchanged CSV", bucket)
+        bucket.files[pipeline.TRAINING_CSV] = csv_bytes + csv_bytes.split(b"\n", 1)[1]
+        run("CSV changed", bucket)
+        run("force train", bucket, force=["train"])
+        run("force all", bucket, force=True)
+
+
+if __name__ == "__main__":
+    main()
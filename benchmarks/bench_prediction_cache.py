@@ -0,0 +1,87 @@
+"""
+bench_prediction_cache.py
+-------------------------
+Single-row /predict throughput with and without PredictionCache under a
+Zipf-skewed query stream: a few hot spots get most of the traffic, the
+rest is a long tail. Each distinct query is a feature vector from the
+latest-values table of one city, with sensor noise below the cache's
+rounding and, for the tail, caller-supplied rain readings.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_prediction_cache --queries 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model.compiled_model import serving_model  # noqa: E402
+from production_model.feature_store import FEATURE_COLUMNS, get_latest_features  # noqa: E402
+from production_model.prediction_cache import PredictionCache  # noqa: E402
+
+
+def query_stream(n_queries, n_distinct, zipf_s, rng):
+    table = get_latest_features()
+    cities = table.cities or [None]
+    rain = FEATURE_COLUMNS.index("rain1h")
+    distinct = []
+    for i in range(n_distinct):
+        values = {"rain1h": round(float(rng.gamma(0.6, 4.0)), 1)} if i >= 50 else {}
+        distinct.append(table.vector(values, city=cities[i % len(cities)]))
+    distinct = np.array(distinct)
+
+    ranks = np.minimum(rng.zipf(zipf_s, size=n_queries), n_distinct) - 1
+    queries = distinct[ranks]
+    # Jitter well below the rounding step, as from float formatting / sensors
+    queries[:, rain] += rng.uniform(-0.01, 0.01, size=n_queries)
+    return np.maximum(queries, 0.0), len(np.unique(ranks))
+
+
+def run(label, predict, queries):
+    start = time.perf_counter()
+    for row in queries:
+        predict(row)
+    seconds = time.perf_counter() - start
+    print(f"[bench] {label:<26}: {len(queries) / seconds:9.0f} req/s  ({seconds / len(queries) * 1e6:6.1f} us/req)")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--distinct", type=int, default=5000)
+    parser.add_argument("--zipf", type=float, default=1.2)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, len(FEATURE_COLUMNS)))
+    y = (X[:, 3] + 0.5 * X[:, 0] + rng.normal(scale=0.7, size=len(X)) > 0).astype(int)
+    model = serving_model(RandomForestClassifier(n_estimators=100, random_state=42).fit(X, y))
+
+    queries, touched = query_stream(args.queries, args.distinct, args.zipf, rng)
+    print(f"[bench] {args.queries} queries over {touched} distinct vectors (zipf s={args.zipf})")
+
+    base = run("no cache", lambda row: model.predict_proba(row[None, :])[0, 1], queries)
+    for maxsize in (100, 1000, 10000):
+        cache = PredictionCache(maxsize=maxsize, ttl=300)
+        seconds = run(f"cache maxsize={maxsize}", lambda row: cache.predict(model, row), queries)
+        stats = cache.stats()
+        print(f"        speedup {base / seconds:4.1f}x  hit ratio {stats['hit_ratio']:.3f}  "
+              f"evictions {stats['evictions']}  size {stats['size']}")
+
+    cache = PredictionCache(maxsize=10000, ttl=300)
+    for row in queries[:1000]:
+        cache.predict(model, row)
+    retrained = serving_model(RandomForestClassifier(n_estimators=100, random_state=7).fit(X, y))
+    cache.predict(retrained, queries[0])
+    print(f"[bench] after model swap: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+bench_prefork.py
+----------------
+Memory of both services under gunicorn (started with
+production_model/gunicorn.conf.py): the Django backend on sync workers
+and the AI microservice on UvicornWorkers, with pre-fork loading off
+(SERVE_PRELOAD=0: every worker imports the app and loads its own model
+and road data) and on (the master loads them once, freezes them and
+forks the workers).
+
+For each mode, once every worker has warmed up and served predictions
+(for the microservice, cache misses scored by each worker's
+micro-batcher, so a worker whose batcher thread did not survive the fork
+shows up as a timeout), reports per process (from /proc/<pid>/smaps_rollup):
+  RSS      resident pages, shared ones included
+  private  pages only this process uses (USS) - what each extra worker costs
+  PSS      shared pages split evenly between the processes mapping them
+and the PSS total of master + workers, i.e. the memory the service uses.
+
+In preload mode it then tests the reload protocol: a new model goes into
+the bucket, the master gets SIGHUP (what a retrain sends, see
+production_model/prefork.py) and the benchmark times how long it takes
+until fresh workers answer with the new model.
+
+Storage is a directory-backed fake bucket (training CSV + a synthetic
+100-tree RandomForest) installed in the master by a small wrapper config.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_prefork --workers 4 [--services django fastapi]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CONF = os.path.join(ROOT, "production_model", "gunicorn.conf.py")
+
+# How to start and query each service
+SERVICES = {
+    "django": {
+        "cwd": os.path.join(ROOT, "backend"), "app": "backend.wsgi", "worker_class": "sync",
+        "path": "/api/predict/", "answer": "ai_probability",
+        "payload": lambda i: {"latitude": 14.6507, "longitude": 121.0497, "rain1h": 4.0},
+    },
+    "fastapi": {
+        "cwd": ROOT, "app": "production_model.app:app", "worker_class": "uvicorn.workers.UvicornWorker",
+        "path": "/predict", "answer": "flood_probability",
+        # A different row per call: prediction-cache misses go through the micro-batcher.
+        # The synthetic model was fit on N(0, 1) features, so stay near 0 to get varied answers.
+        "payload": lambda i: {"city": "Quezon City", "main_temp": 0.0, "rain1h": (i % 40 - 20) / 10},
+    },
+}
+
+# Gunicorn config used by the benchmark: the production one plus the fake bucket
+WRAPPER_CONF = """\
+import runpy
+globals().update({{k: v for k, v in runpy.run_path({conf!r}).items() if not k.startswith("__")}})
+
+from benchmarks.bench_prefork import install_bucket
+install_bucket({bucket!r})
+"""
+
+
+class DirBucket:
+    """Fake storage bucket over a directory, so the benchmark can swap files under a live server."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def download(self, name):
+        with open(os.path.join(self.path, name), "rb") as f:
+            return f.read()
+
+    def upload(self, name, f, file_options=None):
+        with open(os.path.join(self.path, name), "wb") as out:
+            out.write(f.read())
+
+    def list(self, path=None, options=None):
+        entries = []
+        for name in sorted(os.listdir(self.path)):
+            if options and options.get("search", "") not in name:
+                continue
+            data = self.download(name)
+            entries.append({"name": name, "updated_at": None,
+                            "metadata": {"eTag": hashlib.md5(data).hexdigest(), "size": len(data)}})
+        return entries
+
+
+def install_bucket(path):
+    """Point production_model.storage at a DirBucket (runs in the gunicorn master)."""
+    from benchmarks.fakes import FakeStorage, FakeSupabase
+    from production_model import storage
+
+    storage.configure(client=FakeSupabase(FakeStorage(DirBucket(path))))
+
+
+def memory_mib(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"rss": fields["Rss"] / 1024, "private": private / 1024, "pss": fields["Pss"] / 1024}
+
+
+def worker_pids(master):
+    with open(f"/proc/{master}/task/{master}/children") as f:
+        return sorted(int(pid) for pid in f.read().split())
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def predict(port, service, i=0):
+    spec = SERVICES[service]
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}{spec['path']}", data=json.dumps(spec["payload"](i)).encode(),
+        headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())[spec["answer"]]
+
+
+def count_lines(log_path, text):
+    with open(log_path, errors="replace") as f:
+        return f.read().count(text)
+
+
+def wait_for(condition, timeout, what):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"timed out waiting for {what}")
+        time.sleep(0.1)
+
+
+class Server:
+    def __init__(self, service, conf_path, port, workers, preload, env, log_path):
+        self.service, self.port, self.workers, self.log_path = service, port, workers, log_path
+        spec = SERVICES[service]
+        env = dict(env, SERVE_PRELOAD="1" if preload else "0", WEB_CONCURRENCY=str(workers))
+        self.log = open(log_path, "w")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", conf_path, "-b", f"127.0.0.1:{port}",
+             "--timeout", "120", "-k", spec["worker_class"], spec["app"]],
+            cwd=spec["cwd"], env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+    def warmed_up(self):
+        return count_lines(self.log_path, "warm-up finished")
+
+    def wait_ready(self, warmups):
+        wait_for(lambda: self.warmed_up() >= warmups, 300, "worker warm-up")
+        wait_for(lambda: len(worker_pids(self.proc.pid)) == self.workers, 60, "worker count")
+
+    def stop(self):
+        self.proc.send_signal(signal.SIGTERM)
+        self.proc.wait(timeout=60)
+        self.log.close()
+
+
+def measure(server, requests):
+    probabilities = {round(predict(server.port, server.service, i), 6) for i in range(requests)}
+    master = memory_mib(server.proc.pid)
+    workers = [memory_mib(pid) for pid in worker_pids(server.proc.pid)]
+    med = {k: float(np.median([w[k] for w in workers])) for k in workers[0]}
+    total = master["pss"] + sum(w["pss"] for w in workers)
+    return master, med, total, probabilities
+
+
+def report(label, master, med, total):
+    print(f"[bench] {label:<22}: worker RSS {med['rss']:6.1f}  private {med['private']:6.1f}  "
+          f"PSS {med['pss']:6.1f} | master PSS {master['pss']:6.1f} | total PSS {total:6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=40,
+                        help="predict calls before measuring, spread over the workers")
+    parser.add_argument("--services", nargs="+", choices=sorted(SERVICES), default=["django", "fastapi"])
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from benchmarks.fakes import TRAINING_CSV
+
+    tmp = tempfile.mkdtemp(prefix="flood-prefork-")
+    bucket = os.path.join(tmp, "bucket")
+    os.makedirs(bucket)
+    with open(TRAINING_CSV, "rb") as src, open(os.path.join(bucket, "flooded_roads_phase1.csv"), "wb") as dst:
+        dst.write(src.read())
+    conf_path = os.path.join(tmp, "gunicorn.conf.py")
+    with open(conf_path, "w") as f:
+        f.write(WRAPPER_CONF.format(conf=CONF, bucket=bucket))
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="backend.settings", PYTHONPATH=ROOT,
+               PYTHONUNBUFFERED="1", GEOCODE_CACHE_PATH="", GEOCODER_OFFLINE="1", MICROSERVICE_URL="",
+               # Dead address: anything that still reaches real storage fails fast
+               SUPABASE_URL="http://127.0.0.1:9", SUPABASE_KEY="bench")
+    env.setdefault("DJANGO_SECRET_KEY", "bench")
+
+    for service in args.services:
+        run_service(service, args, conf_path, bucket, env, tmp)
+
+
+def run_service(service, args, conf_path, bucket, env, tmp):
+    from benchmarks.fakes import synthetic_model_bytes
+
+    print(f"[bench] {service}: gunicorn, {args.workers} {SERVICES[service]['worker_class']} workers; MiB, "
+          f"median worker after {args.requests} predictions (logs in {tmp})")
+    with open(os.path.join(bucket, "best_flood_model.pkl"), "wb") as f:
+        f.write(synthetic_model_bytes(seed=42))
+    results = {}
+    for preload in (False, True):
+        label = f"{service} {'preload' if preload else 'no preload'}"
+        slug = label.replace(" ", "-")
+        env["ARTIFACT_CACHE_DIR"] = os.path.join(tmp, f"cache-{slug}")
+        server = Server(service, conf_path, free_port(), args.workers, preload, env,
+                        os.path.join(tmp, f"gunicorn-{slug}.log"))
+        try:
+            server.wait_ready(args.workers)
+            master, med, total, before = measure(server, args.requests)
+            report(label, master, med, total)
+            results[preload] = (med, total)
+            if not preload:
+                continue
+
+            # Reload protocol: new model in storage, SIGHUP to the master
+            with open(os.path.join(bucket, "best_flood_model.pkl"), "wb") as f:
+                f.write(synthetic_model_bytes(seed=7))
+            old_pids = set(worker_pids(server.proc.pid))
+            started = time.perf_counter()
+            server.proc.send_signal(signal.SIGHUP)
+            wait_for(lambda: not old_pids & set(worker_pids(server.proc.pid)), 120, "old workers to exit")
+            server.wait_ready(2 * args.workers)
+            reloaded = time.perf_counter() - started
+            master, med, total, after = measure(server, args.requests)
+            report(f"{service} after reload", master, med, total)
+            print(f"[bench] {service} reload: {reloaded:.2f}s from SIGHUP to {args.workers} fresh workers on "
+                  f"the new model ({len(before)} -> {len(after)} distinct answers, "
+                  f"changed: {before != after})")
+        finally:
+            server.stop()
+
+    (off, off_total), (on, on_total) = results[False], results[True]
+    print(f"[bench] {service}: preload saves {off['private'] - on['private']:.1f} MiB private per worker "
+          f"({off['private']:.1f} -> {on['private']:.1f}); service total PSS "
+          f"{off_total:.1f} -> {on_total:.1f} MiB; every prediction answered\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+bench_road_memory.py
+--------------------
+Per-worker memory of the Django backend's road data: N worker processes
+(fresh interpreters, like gunicorn workers without --preload) each load
+the dataset and build the structures derived from it (set_road_data),
+either by parsing the CSV (`csv`) or by mapping the compact store
+(`compact`, see backend/flood/road_store.py). All workers stay alive
+while they are measured, so pages they share really are shared.
+
+Reported per worker, as the growth over the same worker after it loaded
+a 20-row sample the same way (so one-time import and first-call costs
+are not counted):
+  RSS      resident pages, shared file pages included
+  private  pages only this worker uses (USS) - what each extra worker costs
+  PSS      shared pages split evenly between the processes mapping them
+
+The synthetic datasets resample data/interim/flooded_roads_phase1.csv and
+add coordinates inside Metro Manila, at `scale` x its row count.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_road_memory --scales 1 100 --workers 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def memory_mib():
+    """RSS, private (USS) and PSS of this process in MiB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"rss": fields["Rss"] / 1024, "private": private / 1024, "pss": fields["Pss"] / 1024}
+
+
+def worker(mode, csv_path, store_dir):
+    """One worker: warm up, report baseline, load, wait for the parent, report again."""
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    import django
+
+    django.setup()
+    import pandas as pd
+
+    from flood import road_store, views
+
+    def load(path, directory):
+        return pd.read_csv(path) if mode == "csv" else road_store.load_compact(path, store_dir=directory)
+
+    sample = os.path.join(os.path.dirname(csv_path), "sample.csv")
+    views.set_road_data(load(sample, os.path.join(store_dir + "-sample", str(os.getpid()))))
+    before = memory_mib()
+    started = time.perf_counter()
+    views.set_road_data(load(csv_path, store_dir))
+    seconds = time.perf_counter() - started
+    print("loaded", flush=True)
+    sys.stdin.readline()  # measure once every worker has loaded
+    after = memory_mib()
+    print(json.dumps({"seconds": seconds, **{k: after[k] - before[k] for k in after}}), flush=True)
+    sys.stdin.readline()
+
+
+def run_workers(mode, csv_path, store_dir, n_workers, env):
+    procs = []
+    for i in range(n_workers):
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_road_memory", "--worker", mode,
+             "--csv", csv_path, "--store-dir", store_dir],
+            cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True))
+        if i == 0:
+            # The first worker builds the compact store; the others only map it
+            while procs[0].stdout.readline().strip() != "loaded":
+                pass
+    for proc in procs[1:]:
+        while proc.stdout.readline().strip() != "loaded":
+            pass
+    results = []
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.flush()
+        results.append(json.loads(proc.stdout.readline()))
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.flush()
+        proc.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=["csv", "compact"], choices=["csv", "compact"])
+    parser.add_argument("--worker", choices=["csv", "compact"], help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    parser.add_argument("--store-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.worker, args.csv, args.store_dir)
+
+    sys.path.insert(0, ROOT)
+    from benchmarks.bench_roads import synthetic_roads
+
+    tmp = tempfile.mkdtemp(prefix="flood-road-memory-")
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="backend.settings", GEOCODE_CACHE_PATH="",
+               GEOCODER_OFFLINE="1", MICROSERVICE_URL="")
+    env.setdefault("DJANGO_SECRET_KEY", "bench")
+    base_rows = 392  # rows in data/interim/flooded_roads_phase1.csv
+
+    print(f"[bench] {args.workers} workers; MiB per worker (median), growth over a warmed-up worker")
+    for scale in args.scales:
+        csv_path = os.path.join(tmp, f"roads_x{scale}.csv")
+        synthetic_roads(base_rows * scale).to_csv(csv_path, index=False)
+        synthetic_roads(20, seed=1).to_csv(os.path.join(tmp, "sample.csv"), index=False)
+        size = os.path.getsize(csv_path) / 2 ** 20
+        for mode in args.modes:
+            store_dir = os.path.join(tmp, f"store-x{scale}")
+            results = run_workers(mode, csv_path, store_dir, args.workers, env)
+            med = {k: float(np.median([r[k] for r in results])) for k in results[0]}
+            print(f"[bench] x{scale:<4} ({base_rows * scale:>7,} rows, CSV {size:6.1f} MiB) {mode:<8}: "
+                  f"RSS {med['rss']:6.1f}  private {med['private']:6.1f}  PSS {med['pss']:6.1f}  "
+                  f"load {med['seconds'] * 1e3:7.0f} ms (first worker {results[0]['seconds'] * 1e3:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+bench_roads.py
+--------------
+Latency and payload size of the /roads payload builder at several dataset
+sizes, against the original iterrows() + per-row dict implementation.
+The synthetic datasets resample data/interim/flooded_roads_phase1.csv and add
+random coordinates inside Metro Manila.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_roads --sizes 10000 1000000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+from flood.roads import RoadsPayload  # noqa: E402
+
+
+def synthetic_roads(n, seed=0):
+    base = pd.read_csv(os.path.join(ROOT, "data/interim/flooded_roads_phase1.csv"))
+    rng = np.random.default_rng(seed)
+    df = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    df["latitude"] = rng.uniform(14.35, 14.78, n)
+    df["longitude"] = rng.uniform(120.90, 121.15, n)
+    return df
+
+
+def legacy_roads(road_data):
+    all_roads = []
+    for _, row in road_data.iterrows():
+        all_roads.append({
+            "road_sector": row.get("Road_Sector", "Unknown"),
+            "city": row.get("City", "Unknown"),
+            "latitude": row.get("latitude"),
+            "longitude": row.get("longitude"),
+        })
+    return json.dumps(all_roads).encode()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=100_000,
+                        help="skip the iterrows baseline above this many rows")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        df = synthetic_roads(n)
+        print(f"\n[bench] {n:,} rows")
+
+        if n <= args.legacy_max:
+            body, ms = timed(legacy_roads, df)
+            print(f"  legacy full dump     : {ms:9.1f} ms  {len(body) / 1e6:8.2f} MB "
+                  f"({len(gzip.compress(body)) / 1e6:.2f} MB gzip)")
+
+        payload, ms = timed(RoadsPayload, df)
+        print(f"  build (once per load): {ms:9.1f} ms")
+
+        (body, gz, _), ms = timed(payload.render, {})
+        print(f"  first page (cold)    : {ms:9.2f} ms  {len(body) / 1e3:8.1f} kB "
+              f"({len(gz) / 1e3:.1f} kB gzip)")
+        _, ms = timed(payload.render, {})
+        print(f"  first page (cached)  : {ms:9.3f} ms")
+        _, ms = timed(payload.render, {"city": "Quezon City", "fields": "city,location,flood_depth"})
+        print(f"  filtered page (cold) : {ms:9.2f} ms")
+
+        def walk():
+            params, raw, zipped, pages = {"limit": "10000"}, 0, 0, 0
+            while True:
+                body, gz, _ = payload.render(params)
+                raw, zipped, pages = raw + len(body), zipped + len(gz), pages + 1
+                cursor = json.loads(body)["next_cursor"]
+                if cursor is None:
+                    return raw, zipped, pages
+                params = {"limit": "10000", "cursor": cursor}
+
+        (raw, zipped, pages), ms = timed(walk)
+        print(f"  full walk, {pages:>4} pages: {ms:9.1f} ms  {raw / 1e6:8.2f} MB "
+              f"({zipped / 1e6:.2f} MB gzip)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+bench_scraper.py
+----------------
+Throughput of the streaming MMDA tweet parser on a synthetically enlarged
+dump (the real dump repeated --copies times), peak traced memory at two
+dump sizes (it should not grow with the dump), and the cost of an
+incremental rerun after a few tweets are appended.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_scraper [--copies 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model import scraper  # noqa: E402
+
+NEW_TWEET = """
+===TWEET===
+DATE: 09-13-2025
+TIME: 1:00 PM
+QUEZON CITY:
+- EDSA Kamuning NB: Knee deep. Not passable to light vehicles.
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--copies", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(scraper.RAW_DUMP, encoding="utf-8") as f:
+        raw = f.read()
+
+    def write_dump(path, copies):
+        with open(path, "w", encoding="utf-8") as f:
+            for _ in range(copies):
+                f.write(raw.rstrip("\n") + "\n")
+        return os.path.getsize(path) / 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, "dump.txt")
+        output = os.path.join(tmp, "out.csv")
+
+        for copies in (max(args.copies // 10, 1), args.copies):
+            size_mb = write_dump(dump, copies)
+            stats = scraper.scrape(dump, output, full=True)
+            print(f"[bench] {copies:>5} copies ({size_mb:6.1f} MB): {stats['tweets']} tweets, "
+                  f"{stats['records']} records in {stats['seconds']:.2f} s -> "
+                  f"{stats['tweets_per_sec']} tweets/s, {size_mb / stats['seconds']:.1f} MB/s")
+
+        for copies in (max(args.copies // 10, 1), args.copies):
+            write_dump(dump, copies)
+            tracemalloc.start()
+            scraper.scrape(dump, output, full=True)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"[bench] {copies:>5} copies: peak traced memory {peak / 1e6:.2f} MB")
+
+        start = time.perf_counter()
+        stats = scraper.scrape(dump, output)
+        print(f"[bench] rerun, nothing new : {(time.perf_counter() - start) * 1e3:.2f} ms "
+              f"({stats['tweets']} tweets parsed)")
+
+        with open(dump, "a", encoding="utf-8") as f:
+            f.write(NEW_TWEET * 5)
+        start = time.perf_counter()
+        stats = scraper.scrape(dump, output)
+        print(f"[bench] rerun, 5 appended : {(time.perf_counter() - start) * 1e3:.2f} ms "
+              f"({stats['tweets']} tweets parsed, {stats['records']} records)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+bench_spatial_index.py
+----------------------
+Measures per-query latency of the KD-tree RoadIndex against a linear
+haversine scan over synthetic road segments spread across Metro Manila.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_spatial_index --segments 100000 --radius 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from flood.spatial import RoadIndex, haversine_m  # noqa: E402
+
+# Rough Metro Manila bounding box
+LAT_RANGE = (14.35, 14.78)
+LON_RANGE = (120.90, 121.15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--segments", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--radius", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "latitude": rng.uniform(*LAT_RANGE, args.segments),
+        "longitude": rng.uniform(*LON_RANGE, args.segments),
+    })
+    q_lat = rng.uniform(*LAT_RANGE, args.queries)
+    q_lon = rng.uniform(*LON_RANGE, args.queries)
+
+    start = time.perf_counter()
+    index = RoadIndex(df)
+    print(f"[bench] build: {(time.perf_counter() - start) * 1e3:.1f} ms for {len(index)} segments")
+
+    start = time.perf_counter()
+    hits = [len(index.query_radius(la, lo, args.radius)[0]) for la, lo in zip(q_lat, q_lon)]
+    per_query = (time.perf_counter() - start) / args.queries
+    print(f"[bench] kd-tree    : {per_query * 1e6:8.1f} us/query (avg {np.mean(hits):.0f} hits)")
+
+    lat, lon = df["latitude"].to_numpy(), df["longitude"].to_numpy()
+    n_linear = min(args.queries, 200)
+    start = time.perf_counter()
+    for la, lo, expected in zip(q_lat[:n_linear], q_lon[:n_linear], hits):
+        found = np.count_nonzero(haversine_m(la, lo, lat, lon) <= args.radius)
+        assert found == expected, "index disagrees with linear scan"
+    linear = (time.perf_counter() - start) / n_linear
+    print(f"[bench] linear scan: {linear * 1e6:8.1f} us/query ({linear / per_query:.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+bench_startup.py
+----------------
+Cold-start cost of both services, each measured in a fresh Python process:
+
+- import time of production_model.app and of flood.views (after
+  django.setup), and which heavy packages the import pulled in;
+- time to the first /predict response without the startup hook (model,
+  road data and weather snapshot load on first use) and with it (import,
+  hook, wait for readiness, first request);
+- wall time of `manage.py check`, which imports the URLconf and views.
+
+Storage is the in-memory fake from fakes.py with a per-call latency; the
+artifact cache starts empty in every process. The fake replaces the
+Supabase client, so the supabase package's own import is not counted.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_startup --runs 3 --storage-ms 50
+"""
+
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY = ("supabase", "sklearn", "scipy", "joblib", "pyarrow", "httpx")
+PAYLOAD = {"latitude": 14.6507, "longitude": 121.0497, "rain1h": 4.0}
+
+
+# -------------------------------
+# Child processes (one measurement each)
+# -------------------------------
+def child(service, hook, bucket_path):
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    sys.path.insert(0, ROOT)
+    if service == "django":
+        import django
+
+        django.setup()  # settings and apps are not what we measure
+
+    start = time.perf_counter()
+    if service == "fastapi":
+        from production_model import app as module
+    else:
+        from flood import views as module
+    imported = time.perf_counter()
+    heavy = sorted(m for m in HEAVY if m in sys.modules)
+    if bucket_path is None:
+        threads = sorted(t.name for t in threading.enumerate() if t is not threading.main_thread())
+        print(json.dumps({"import_s": imported - start, "heavy_imports": heavy, "threads": threads}))
+        return
+
+    from benchmarks.fakes import FakeBucket, FakeStorage, FakeSupabase
+    from production_model import storage
+
+    with open(bucket_path, "rb") as f:
+        files, latency = pickle.load(f)
+    storage.configure(client=FakeSupabase(FakeStorage(FakeBucket(files, latency=latency))))
+
+    begin = time.perf_counter()
+    if service == "fastapi":
+        from fastapi.testclient import TestClient
+
+        client = TestClient(module.app)
+
+        def predict():
+            return client.post("/predict", json={"city": "Quezon City", "rain1h": 4.0})
+    else:
+        from django.test import Client
+
+        client = Client()
+
+        def predict():
+            return client.post("/api/predict/", json.dumps(PAYLOAD), content_type="application/json")
+
+    if hook:
+        module.startup.start()
+        module.startup.wait()
+    ready = time.perf_counter()
+    response = predict()
+    assert response.status_code == 200, response.status_code
+    done = time.perf_counter()
+    print(json.dumps({
+        "import_s": imported - start,
+        "startup_s": ready - begin,
+        "first_request_s": done - ready,
+        # Import plus everything after it, minus the fake's own setup
+        "first_prediction_s": (imported - start) + (done - begin),
+    }))
+
+
+def measure(service, env, bucket_path=None, hook=False):
+    cmd = [sys.executable, "-m", "benchmarks.bench_startup", "--child", service]
+    cmd += ["--bucket", bucket_path] if bucket_path else []
+    cmd += ["--hook"] if hook else []
+    out = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def manage_check(env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "manage.py", "check"], cwd=os.path.join(ROOT, "backend"),
+                   env=env, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--storage-ms", type=float, default=50,
+                        help="simulated latency of each storage call")
+    parser.add_argument("--child", choices=["fastapi", "django"], help=argparse.SUPPRESS)
+    parser.add_argument("--bucket", help=argparse.SUPPRESS)
+    parser.add_argument("--hook", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args.hook, args.bucket)
+
+    sys.path.insert(0, ROOT)
+    from benchmarks.fakes import seeded_bucket
+
+    tmp = tempfile.mkdtemp(prefix="flood-startup-")
+    bucket_path = os.path.join(tmp, "bucket.pkl")
+    with open(bucket_path, "wb") as f:
+        pickle.dump((seeded_bucket().files, args.storage_ms / 1e3), f)
+    env = dict(os.environ,
+               DJANGO_SETTINGS_MODULE="backend.settings",
+               GEOCODE_CACHE_PATH="", GEOCODER_OFFLINE="1", MICROSERVICE_URL="",
+               # Dead address: anything that still reaches real storage fails fast
+               SUPABASE_URL="http://127.0.0.1:9", SUPABASE_KEY="bench")
+    env.setdefault("DJANGO_SECRET_KEY", "bench")
+
+    def median(runs, key):
+        return float(np.median([r[key] for r in runs])) * 1e3
+
+    print(f"[bench] median of {args.runs} fresh processes; storage latency {args.storage_ms:.0f} ms/call")
+    for service in ("fastapi", "django"):
+        runs = [measure(service, env) for _ in range(args.runs)]
+        print(f"[bench] {service:<7} import                : {median(runs, 'import_s'):6.0f} ms "
+              f"(heavy packages loaded: {', '.join(runs[0]['heavy_imports']) or 'none'}; "
+              f"threads started: {', '.join(runs[0]['threads']) or 'none'})")
+        for hook in (False, True):
+            runs = []
+            for i in range(args.runs):
+                env["ARTIFACT_CACHE_DIR"] = os.path.join(tmp, f"{service}-{hook}-{i}")
+                runs.append(measure(service, env, bucket_path, hook))
+            label = "startup hook" if hook else "lazy, no hook"
+            print(f"[bench] {service:<7} {label:<14}: warm-up {median(runs, 'startup_s'):6.0f} ms, "
+                  f"first request {median(runs, 'first_request_s'):6.0f} ms, "
+                  f"time to first prediction {median(runs, 'first_prediction_s'):6.0f} ms")
+
+    checks = [manage_check(env) for _ in range(args.runs)]
+    print(f"[bench] manage.py check               : {np.median(checks) * 1e3:6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
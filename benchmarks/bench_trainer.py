@@ -0,0 +1,105 @@
+"""
+bench_trainer.py
+----------------
+Wall-clock time of the candidate search in trainer.py on synthetic data of
+several sizes:
+
+  single split : the previous path (one 80/20 split, candidates fitted one
+                 after another in this process)
+  CV, 1 worker : k-fold CV of every candidate, sequentially in-process
+  CV, N workers: the same tasks on the process pool
+
+plus a run with a tight --budget showing which candidates get cancelled.
+Speedup needs more than one core (see the worker count printed).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_trainer [--sizes 2000 20000 100000] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier  # noqa: E402
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.metrics import roc_auc_score  # noqa: E402
+from sklearn.model_selection import train_test_split  # noqa: E402
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+
+from production_model import trainer  # noqa: E402
+
+
+def make_data(n_rows, n_features=11, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    y = (X[:, 3] + 0.5 * X[:, 0] + rng.normal(size=n_rows) > 1.0).astype(int)
+    return X, y
+
+
+def single_split(X, y):
+    """The sequential path train_model used before CV and the process pool."""
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler().fit(X_train)
+    models = {
+        "RandomForest": RandomForestClassifier(n_estimators=100, random_state=42,
+                                               class_weight="balanced"),
+        "GradientBoosting": GradientBoostingClassifier(random_state=42),
+        "LogisticRegression": LogisticRegression(max_iter=1000, class_weight="balanced"),
+    }
+    for name, model in models.items():
+        if name == "LogisticRegression":
+            model.fit(scaler.transform(X_train), y_train)
+            roc_auc_score(y_test, model.predict_proba(scaler.transform(X_test))[:, 1])
+        else:
+            model.fit(X_train, y_train)
+            roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 100000])
+    parser.add_argument("--folds", type=int, default=trainer.CV_FOLDS)
+    parser.add_argument("--workers", type=int, default=trainer.TRAIN_WORKERS)
+    parser.add_argument("--budget", type=float, default=5.0)
+    args = parser.parse_args()
+    print(f"[bench] {os.cpu_count()} CPU(s), {args.workers} pool worker(s), {args.folds} folds\n")
+
+    rows = []
+    for n in args.sizes:
+        X, y = make_data(n)
+        old = timed(lambda: single_split(X, y))
+        seq = timed(lambda: trainer.evaluate_candidates(X, y, folds=args.folds, workers=1))
+        par = timed(lambda: trainer.evaluate_candidates(X, y, folds=args.folds, workers=args.workers))
+        rows.append((n, old, seq, par))
+
+    print(f"\n[bench] {'rows':>8} {'single split':>13} {'CV 1 worker':>12} "
+          f"{'CV pool':>9} {'pool speedup':>13}")
+    for n, old, seq, par in rows:
+        print(f"[bench] {n:>8} {old:>12.2f}s {seq:>11.2f}s {par:>8.2f}s {seq / par:>12.2f}x")
+
+    n = args.sizes[-1]
+    print(f"\n[bench] budget of {args.budget}s on {n} rows:")
+    X, y = make_data(n)
+    results = trainer.evaluate_candidates(X, y, folds=args.folds, workers=args.workers,
+                                          budget=args.budget)
+    for name, r in results.items():
+        print(f"[bench]   {name:<20} {r['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+bench_weather_store.py
+----------------------
+Load time and in-memory size of the hourly weather data read from the raw
+monthly CSVs vs the partitioned Parquet store (full scan and a pushed-down
+city + time-range query). The store is built in a temp directory.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_weather_store
+"""
+
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from production_model import weather_store  # noqa: E402
+
+
+def csv_path():
+    frames = [pd.read_csv(f) for f in sorted(glob.glob(os.path.join(weather_store.RAW_DIR, "*.csv")))]
+    df = pd.concat(frames, ignore_index=True)
+    df["datetime"] = pd.to_datetime(df["datetime"], utc=True)
+    return df
+
+
+def report(label, fn):
+    start = time.perf_counter()
+    df = fn()
+    ms = (time.perf_counter() - start) * 1e3
+    mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f"  {label:<34}: {ms:8.1f} ms  {len(df):>7} rows  {mb:7.2f} MB")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as store_dir:
+        start = time.perf_counter()
+        weather_store.ingest_directory(store_dir=store_dir)
+        print(f"[bench] initial ingest: {(time.perf_counter() - start) * 1e3:.0f} ms")
+        start = time.perf_counter()
+        weather_store.ingest_directory(store_dir=store_dir)
+        print(f"[bench] re-run (nothing new): {(time.perf_counter() - start) * 1e3:.1f} ms\n")
+
+        report("CSV: all months + parse datetime", csv_path)
+        report("store: all months", lambda: weather_store.read_weather(store_dir))
+        report("store: 1 city, 1 week", lambda: weather_store.read_weather(
+            store_dir, cities="Quezon City", start="2025-09-08", end="2025-09-15"))
+        report("store: 3 cities, 1 month, 3 cols", lambda: weather_store.read_weather(
+            store_dir, cities=["Manila", "Pasig", "Quezon City"], start="2025-07-01",
+            end="2025-08-01", columns=["rain1h", "main.pressure", "main.humidity"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+fakes.py
+--------
+In-process stand-ins for the services the app talks to, so benchmarks run
+offline:
+
+- FakeBucket / FakeStorage / FakeSupabase: the subset of the Supabase
+  storage API the code uses (download, upload, list).
+- fake_nominatim: a reverse-geocoder lookup with a configurable delay.
+- install_fake_supabase: replaces supabase.create_client before the shared
+  client (production_model/storage.py) is created, so every storage access
+  goes to the fake.
+"""
+
+import hashlib
+import io
+import os
+import random
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+TRAINING_CSV = os.path.join(ROOT, "data", "interim", "flooded_roads_phase1.csv")
+
+
+class FakeBucket:
+    def __init__(self, files, latency=0.0):
+        self.files = dict(files)
+        self.latency = latency
+        self.downloads = self.uploads = 0
+
+    def download(self, name):
+        time.sleep(self.latency)
+        self.downloads += 1
+        return self.files[name]
+
+    def upload(self, name, f, file_options=None):
+        time.sleep(self.latency)
+        self.uploads += 1
+        self.files[name] = f.read()
+
+    def list(self, path=None, options=None):
+        time.sleep(self.latency)
+        return [
+            {"name": name, "updated_at": None,
+             "metadata": {"eTag": hashlib.md5(data).hexdigest(), "size": len(data)}}
+            for name, data in self.files.items()
+            if not options or options.get("search", "") in name
+        ]
+
+
+class FakeStorage:
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def from_(self, _name):
+        return self.bucket
+
+
+class FakeSupabase:
+    def __init__(self, storage):
+        self.storage = storage
+
+
+def synthetic_model_bytes(seed=42):
+    """A pickled RandomForest over FEATURE_COLUMNS, as trainer.py would upload."""
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    from production_model.feature_store import FEATURE_COLUMNS
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(5000, len(FEATURE_COLUMNS)))
+    y = (X[:, 3] + 0.5 * X[:, 0] + rng.normal(scale=0.7, size=len(X)) > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=100, random_state=seed).fit(X, y)
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getvalue()
+
+
+def seeded_bucket(latency=0.0):
+    """Bucket holding the training CSV and a synthetic best_flood_model.pkl."""
+    with open(TRAINING_CSV, "rb") as f:
+        csv_bytes = f.read()
+    return FakeBucket({"flooded_roads_phase1.csv": csv_bytes,
+                       "best_flood_model.pkl": synthetic_model_bytes()}, latency=latency)
+
+
+def install_fake_supabase(bucket):
+    """Make every later `create_client(...)` return a client backed by `bucket`."""
+    import supabase
+
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("SUPABASE_KEY", "fake")
+    storage = FakeStorage(bucket)
+    supabase.create_client = lambda url, key, *args, **kwargs: FakeSupabase(storage)
+    return storage
+
+
+def fake_nominatim(delay=0.0, slow_fraction=0.0, slow_delay=0.0, seed=0):
+    rng = random.Random(seed)
+
+    def lookup(lat, lon, timeout=10):
+        time.sleep(min(slow_delay if rng.random() < slow_fraction else delay, timeout))
+        return {"city": "Quezon City", "road": "EDSA", "neighborhood": None,
+                "full_address": f"{lat:.4f}, {lon:.4f}"}
+    return lookup
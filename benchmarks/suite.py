@@ -0,0 +1,298 @@
+"""
+suite.py
+--------
+End-to-end benchmark / load-test suite for both services, fully offline.
+
+Supabase storage and Nominatim are replaced by the in-process fakes in
+fakes.py (installed before the shared storage client is first created).
+Caches go to a temp directory. Scenarios:
+
+  fastapi.predict, fastapi.predict_batch, fastapi.retrain
+  django.predict, django.predict_async, django.roads, django.roads_filtered,
+  django.roads_nearby, django.retrain
+  pipeline.<stage>   every stage of run_pipeline(force=True)
+
+The AI microservice has no /roads endpoint, so /roads is covered on the
+Django side only. Each scenario reports throughput and p50/p95/p99
+latency. Results can be saved as a JSON baseline, and a later run
+compared against it: the run fails (exit 1) when a scenario's p95 grows,
+or its throughput drops, by more than the allowed fraction.
+
+Usage (from the repo root):
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json --max-regression 0.25
+    python -m benchmarks.suite --only fastapi pipeline --threshold fastapi.retrain=0.5
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import fake_nominatim, install_fake_supabase, seeded_bucket  # noqa: E402
+
+GROUPS = ("fastapi", "django", "pipeline")
+
+
+# -------------------------------
+# Measurement
+# -------------------------------
+def summarize(latencies, seconds):
+    ms = np.asarray(latencies) * 1e3
+    return {
+        "count": len(ms),
+        "rps": round(len(ms) / seconds, 2),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def measure(fn, requests, concurrency=1, warmup=5):
+    """Call fn(i) `requests` times from `concurrency` threads."""
+    for i in range(warmup):
+        fn(i)
+
+    def one(i):
+        start = time.perf_counter()
+        fn(i)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        latencies = [one(i) for i in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(one, range(requests)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def expect(response, status=200):
+    if response.status_code != status:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.content[:300]!r}")
+    return response
+
+
+def predict_payloads(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"latitude": round(float(rng.uniform(14.40, 14.75)), 5),
+             "longitude": round(float(rng.uniform(120.95, 121.10)), 5),
+             "radius": 500, "rain1h": round(float(rng.exponential(3.0)), 2)} for _ in range(n)]
+
+
+def retrain_runs(submit, status, runs, pipeline_cache):
+    """Wall time of full retrain jobs (pipeline cache cleared before each)."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(runs):
+        shutil.rmtree(pipeline_cache, ignore_errors=True)
+        start = time.perf_counter()
+        job = submit()
+        while job["status"] in ("queued", "running"):
+            time.sleep(0.05)
+            job = status(job["job_id"])
+        if job["status"] != "succeeded":
+            raise RuntimeError(f"retrain failed: {job['error']}")
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+# -------------------------------
+# Scenarios
+# -------------------------------
+def fastapi_scenarios(args, pipeline_cache):
+    from fastapi.testclient import TestClient
+
+    from production_model import app as app_module
+
+    client = TestClient(app_module.app)
+    payloads = [{k: v for k, v in p.items() if k not in ("latitude", "longitude", "radius")}
+                | {"city": "Quezon City"} for p in predict_payloads(args.requests)]
+    batch = {"rows": payloads[:100]}
+    yield "fastapi.predict", measure(
+        lambda i: expect(client.post("/predict", json=payloads[i % len(payloads)])),
+        args.requests, args.concurrency)
+    yield "fastapi.predict_batch", measure(
+        lambda i: expect(client.post("/predict/batch", json=batch)), max(args.requests // 10, 10))
+    yield "fastapi.retrain", retrain_runs(
+        lambda: expect(client.post("/retrain"), 202).json(),
+        lambda job_id: expect(client.get(f"/retrain/{job_id}")).json(),
+        args.retrain_runs, pipeline_cache)
+
+
+def django_scenarios(args, pipeline_cache):
+    import django
+
+    django.setup()
+    from django.test import Client
+
+    from flood import views
+    from flood.geocoding import get_geocoder
+
+    geocoder = get_geocoder()
+    geocoder.offline, geocoder.disk, geocoder.lru_size = False, None, 0
+    geocoder.network_lookup = fake_nominatim(delay=args.geocode_ms / 1e3)
+    views.load_model()
+
+    client = Client()
+    payloads = predict_payloads(args.requests)
+
+    def post(path, i):
+        return expect(client.post(path, json.dumps(payloads[i % len(payloads)]),
+                                  content_type="application/json"))
+
+    yield "django.predict", measure(lambda i: post("/api/predict/", i), args.requests, args.concurrency)
+    yield "django.predict_async", measure(lambda i: post("/api/predict/async/", i),
+                                          args.requests, args.concurrency)
+    yield "django.roads", measure(lambda i: expect(client.get("/api/roads/")), args.requests, args.concurrency)
+    yield "django.roads_filtered", measure(
+        lambda i: expect(client.get("/api/roads/", {"city": "Quezon City", "fields": "city,location,flood_depth"})),
+        args.requests, args.concurrency)
+    yield "django.roads_nearby", measure(
+        lambda i: expect(client.get("/api/roads/nearby/", {"lat": payloads[i % len(payloads)]["latitude"],
+                                                           "lon": payloads[i % len(payloads)]["longitude"],
+                                                           "radius": 1000})),
+        args.requests, args.concurrency)
+    yield "django.retrain", retrain_runs(
+        lambda: expect(client.post("/api/retrain/"), 202).json(),
+        lambda job_id: expect(client.get(f"/api/retrain/{job_id}/")).json(),
+        args.retrain_runs, pipeline_cache)
+
+
+def pipeline_scenarios(args, pipeline_cache):
+    from production_model import pipeline
+
+    stage_seconds = {}
+    for _ in range(args.pipeline_runs):
+        result = pipeline.run_pipeline(force=True)
+        for name, info in result["stages"].items():
+            stage_seconds.setdefault(name, []).append(info["seconds"])
+    for name, seconds in stage_seconds.items():
+        yield f"pipeline.{name}", summarize(seconds, max(sum(seconds), 1e-9))
+
+
+# -------------------------------
+# Baselines
+# -------------------------------
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "commit": commit, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def compare(results, baseline, max_regression, thresholds):
+    """Printable lines and the names of scenarios that regressed."""
+    lines, failures = [], []
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            lines.append(f"  {name:<24} (no baseline)")
+            continue
+        limit = thresholds.get(name, max_regression)
+        p95_change = current["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps_change = current["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        regressed = p95_change > limit or rps_change < -limit
+        if regressed:
+            failures.append(name)
+        lines.append(f"  {name:<24} p95 {p95_change:+7.1%}  rps {rps_change:+7.1%}  "
+                     f"(limit {limit:.0%}){'  REGRESSED' if regressed else ''}")
+    return lines, failures
+
+
+def parse_thresholds(items):
+    thresholds = {}
+    for item in items:
+        name, _, value = item.partition("=")
+        thresholds[name] = float(value)
+    return thresholds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--retrain-runs", type=int, default=2)
+    parser.add_argument("--pipeline-runs", type=int, default=2)
+    parser.add_argument("--geocode-ms", type=float, default=0.0, help="fake Nominatim delay")
+    parser.add_argument("--storage-ms", type=float, default=0.0, help="fake Supabase delay per call")
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--save-baseline", help="write this run's results as the baseline")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed fractional p95 increase / throughput drop")
+    parser.add_argument("--threshold", nargs="*", default=[], metavar="SCENARIO=FRACTION",
+                        help="per-scenario override of --max-regression")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="flood-bench-")
+    pipeline_cache = os.path.join(tmp, "pipeline")
+    os.environ.update({
+        "ARTIFACT_CACHE_DIR": os.path.join(tmp, "artifacts"),
+        "PIPELINE_CACHE_DIR": pipeline_cache,
+        "GEOCODE_CACHE_PATH": "",
+        "MICROSERVICE_URL": "",
+    })
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    os.environ.setdefault("DJANGO_SECRET_KEY", "bench")
+    # One training process keeps retrain timings comparable across machines
+    os.environ.setdefault("TRAIN_WORKERS", "1")
+    install_fake_supabase(seeded_bucket(latency=args.storage_ms / 1e3))
+
+    # Scraping reads the local tweet dump; keep its output out of data/
+    from production_model import pipeline, scraper
+
+    def fetch_latest_data():
+        return scraper.fetch_latest_data(output_path=os.path.join(tmp, "mmda_scraped_roads.csv"))
+    pipeline.fetch_latest_data = fetch_latest_data
+
+    scenarios = {"fastapi": fastapi_scenarios, "django": django_scenarios, "pipeline": pipeline_scenarios}
+    results = {}
+    try:
+        for group in args.only:
+            for name, summary in scenarios[group](args, pipeline_cache):
+                results[name] = summary
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n[suite] {'scenario':<24} {'count':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(f"[suite] {name:<24} {r['count']:>6} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+    report = {"meta": metadata(), "results": results}
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[suite] Results written to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, failures = compare(results, baseline, args.max_regression, parse_thresholds(args.threshold))
+        print(f"\n[suite] Against baseline {args.compare} (commit {baseline['meta'].get('commit')}):")
+        print("\n".join(lines))
+        if failures:
+            print(f"[suite] Regressed: {', '.join(failures)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
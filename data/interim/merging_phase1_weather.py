@@ -1,15 +1,20 @@
-import pandas as pd  
+import os
+import sys
 
-floods = pd.read_csv("flooded_roads_phase1_hourly.csv")  
-weather = pd.read_csv("weather_all_months_hourly.csv")  
+import pandas as pd
 
-floods["date"] = pd.to_datetime(floods["datetime"]).dt.date  
-weather["date"] = pd.to_datetime(weather["datetime"]).dt.date  
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
 
-merged = pd.merge(
-    floods, weather,
-    on=["City", "date", "hour"],
-    how="inner"
-)  
+from production_model.temporal_join import asof_join_weather  # noqa: E402
+from production_model.weather_store import ingest_directory  # noqa: E402
 
-merged.to_csv("floods_with_weather.csv", index=False)  
+# Make sure every raw monthly CSV is in the partitioned weather store
+ingest_directory()
+
+floods = pd.read_csv(os.path.join(HERE, "flooded_roads_phase1.csv"))
+
+# Nearest preceding weather reading per city, at most 2 hours old
+merged, stats = asof_join_weather(floods, tolerance="2h")
+
+merged.to_csv(os.path.join(HERE, "floods_with_weather.csv"), index=False)
@@ -0,0 +1,192 @@
+# production_model/admission.py
+"""
+admission.py
+------------
+Admission control for /predict in both services, so a burst (e.g. during
+a typhoon) is shed early instead of piling up until every request times
+out.
+
+- At most `limit` requests are processed at once per worker.
+- Requests beyond that wait, first come first served, for up to
+  `max_wait` seconds; at most `max_waiting` of them at a time.
+- A request that finds the waiting line full, or is still waiting when
+  its time is up, is rejected at once with `Overloaded` (the endpoints
+  answer 503 with Retry-After) instead of holding a worker.
+- An admitted request is flagged `degraded` when it arrived while at
+  least `degrade_at` requests were in flight: the endpoint then skips
+  optional slow work (the backend answers from the geocoder's caches and
+  gazetteer instead of calling Nominatim), so the line drains quickly.
+
+    with admission.admit() as ticket:            # threads (WSGI views)
+        ...
+    async with admission.admit_async() as ticket:  # event loop (ASGI views)
+        ...
+
+Configuration (environment variables):
+  PREDICT_MAX_INFLIGHT   requests processed at once per worker (default 32)
+  PREDICT_MAX_WAITING    requests allowed to wait for a slot (default 64)
+  PREDICT_MAX_WAIT_MS    longest a request waits before it is shed (default 500)
+  PREDICT_DEGRADE_AT     in-flight requests from which new ones are served
+                         degraded (default PREDICT_MAX_INFLIGHT, i.e. the
+                         ones that had to wait)
+  PREDICT_RETRY_AFTER    Retry-After seconds sent with a shed request (default 1)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from .metrics import span
+
+MAX_INFLIGHT = int(os.getenv("PREDICT_MAX_INFLIGHT", "32"))
+MAX_WAITING = int(os.getenv("PREDICT_MAX_WAITING", "64"))
+MAX_WAIT = float(os.getenv("PREDICT_MAX_WAIT_MS", "500")) / 1e3
+DEGRADE_AT = int(os.getenv("PREDICT_DEGRADE_AT", "0")) or None
+RETRY_AFTER = int(os.getenv("PREDICT_RETRY_AFTER", "1"))
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; `retry_after` is the hint for the client."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    __slots__ = ("degraded", "waited")
+
+    def __init__(self, degraded, waited):
+        self.degraded = degraded
+        self.waited = waited  # seconds spent waiting for a slot
+
+
+class _Waiter:
+    __slots__ = ("wake", "granted", "degraded")
+
+    def __init__(self, wake, degraded):
+        self.wake = wake
+        self.granted = False
+        self.degraded = degraded
+
+
+class AdmissionControl:
+    def __init__(self, limit=MAX_INFLIGHT, max_waiting=MAX_WAITING, max_wait=MAX_WAIT,
+                 degrade_at=DEGRADE_AT, retry_after=RETRY_AFTER):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.degrade_at = degrade_at or limit
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self.counters = {"admitted": 0, "waited": 0, "degraded": 0,
+                         "shed_queue_full": 0, "shed_timeout": 0}
+
+    # -------------------------------
+    # Slot bookkeeping (all under self._lock)
+    # -------------------------------
+    def _enter(self, wake):
+        """
+        Take a slot or join the waiting line. Returns (waiter or None when
+        admitted at once, degraded); raises Overloaded when the line is full.
+        """
+        with self._lock:
+            degraded = self._in_flight >= self.degrade_at
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                self._admit(degraded)
+                return None, degraded
+            if len(self._waiters) >= self.max_waiting:
+                self.counters["shed_queue_full"] += 1
+                raise Overloaded("too many requests waiting", self.retry_after)
+            waiter = _Waiter(wake, degraded)
+            self._waiters.append(waiter)
+            self.counters["waited"] += 1
+            return waiter, degraded
+
+    def _admit(self, degraded):
+        self.counters["admitted"] += 1
+        self.counters["degraded"] += degraded
+
+    def _release(self):
+        """Free a slot, handing it straight to the first waiter if there is one."""
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                self._admit(waiter.degraded)
+                waiter.wake()
+            else:
+                self._in_flight -= 1
+
+    def _give_up(self, waiter, counter="shed_timeout"):
+        """Take a waiter out of the line. False if it was granted a slot just before."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            self._waiters.remove(waiter)
+            if counter:
+                self.counters[counter] += 1
+            return True
+
+    # -------------------------------
+    # Public API
+    # -------------------------------
+    @contextmanager
+    def admit(self):
+        """Hold a slot for the block (blocking wait); raises Overloaded when shed."""
+        granted = threading.Event()
+        waiter, degraded = self._enter(granted.set)
+        waited = 0.0
+        if waiter is not None:
+            started = time.perf_counter()
+            with span("admission_wait"):
+                on_time = granted.wait(self.max_wait)
+            waited = time.perf_counter() - started
+            if not on_time and self._give_up(waiter):
+                raise Overloaded("timed out waiting for a slot", self.retry_after)
+        try:
+            yield Ticket(degraded, waited)
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def admit_async(self):
+        """Like admit(), but waits on the event loop instead of blocking it."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+
+        waiter, degraded = self._enter(wake)
+        waited = 0.0
+        if waiter is not None:
+            started = time.perf_counter()
+            try:
+                with span("admission_wait"):
+                    await asyncio.wait_for(asyncio.shield(granted), self.max_wait)
+            except asyncio.TimeoutError:
+                if self._give_up(waiter):
+                    raise Overloaded("timed out waiting for a slot", self.retry_after)
+            except asyncio.CancelledError:
+                # Client went away while waiting: leave the line, or pass on the slot
+                if not self._give_up(waiter, counter=None):
+                    self._release()
+                raise
+            waited = time.perf_counter() - started
+        try:
+            yield Ticket(degraded, waited)
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, in_flight=self._in_flight, queue_depth=len(self._waiters),
+                        limit=self.limit, max_waiting=self.max_waiting)
@@ -1,63 +1,217 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
+from typing import List, Optional, Dict
+import asyncio
 import os
-from io import BytesIO
-import joblib
+import threading
+import time
 import numpy as np
-from supabase import create_client
-from dotenv import load_dotenv
 
-from .pipeline import run_pipeline
+from .storage import get_artifacts
+from .jobs import RetrainJobs, warmup
+from .compiled_model import serving_model
+from .feature_store import FEATURE_COLUMNS, api_name, get_latest_features
+from .heatmap import HeatmapRefresher, parse_tile_query
+from .prediction_cache import PredictionCache
+from .batching import MicroBatcher, QueueFull
+from .admission import AdmissionControl, Overloaded
+from .startup import Startup
+from . import metrics, prefork, profiler
+from .metrics import GaugeFunc, span
 
-# -------------------------------
-# Load environment variables
-# -------------------------------
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "../.env"))
+# Importing this module does no I/O and starts no threads: it only builds
+# inert objects (caches, batcher, admission state) and registers /metrics
+# gauges. Storage, the model and the weather snapshot are loaded, and the
+# batcher and heatmap threads started, by the startup hook run from the
+# lifespan (or on first use), so tools, benchmarks and a pre-forking
+# master can import it cheaply. GET /ready reports when warm-up is done.
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-BUCKET_NAME = "data"
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "1000"))
 
-# Supabase client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+@asynccontextmanager
+async def lifespan(app):
+    startup.start()
+    yield
 
 # -------------------------------
 # FastAPI app with /api root
 # -------------------------------
 app = FastAPI(
     title="Flood Prediction AI Microservice",
-    root_path="/api"  # all endpoints will be under /api
+    root_path="/api",  # all endpoints will be under /api
+    lifespan=lifespan,
 )
 
 # -------------------------------
 # Request model
 # -------------------------------
 class FloodFeatures(BaseModel):
-    main_temp: float
-    main_humidity: float
-    main_pressure: float
-    rain1h: float
-    wind_speed: float
-    hour: int
-    day_of_week: int
-    month: int
-    is_weekend: int
+    """
+    Model features. Weather features left out are filled from the latest
+    readings for `city` (metro-wide median without one); time features
+    default to now.
+    """
+    city: Optional[str] = None
+    main_temp: Optional[float] = None
+    main_humidity: Optional[float] = None
+    main_pressure: Optional[float] = None
+    rain1h: Optional[float] = None
+    wind_speed: Optional[float] = None
+    hour: Optional[int] = None
+    day_of_week: Optional[int] = None
+    month: Optional[int] = None
+    is_weekend: Optional[int] = None
+    rain_3h: Optional[float] = None
+    rain_6h: Optional[float] = None
+    rain_24h: Optional[float] = None
+    pressure_tendency_3h: Optional[float] = None
+    humidity_trend_3h: Optional[float] = None
+
+# Column order the model was trained on, as request field names
+FEATURE_ORDER = [api_name(c) for c in FEATURE_COLUMNS]
+
+def feature_vector(features: FloodFeatures) -> np.ndarray:
+    values = {c: getattr(features, f) for c, f in zip(FEATURE_COLUMNS, FEATURE_ORDER)}
+    with span("feature_build"):
+        return get_latest_features().vector(values, city=features.city)
+
+class FloodBatch(BaseModel):
+    """Either a list of rows or a columnar payload ({feature: [values...]})."""
+    rows: Optional[List[FloodFeatures]] = None
+    columns: Optional[Dict[str, List[float]]] = None
+
+def batch_to_matrix(batch: FloodBatch) -> np.ndarray:
+    if (batch.rows is None) == (batch.columns is None):
+        raise HTTPException(status_code=422, detail="Send exactly one of 'rows' or 'columns'")
+
+    if batch.rows is not None:
+        n_rows = len(batch.rows)
+    else:
+        unknown = [f for f in batch.columns if f not in FEATURE_ORDER]
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown columns: {unknown}")
+        lengths = {len(values) for values in batch.columns.values()}
+        if len(lengths) != 1:
+            raise HTTPException(status_code=422,
+                                detail="Send at least one column; all columns must have the same length")
+        n_rows = lengths.pop()
+
+    if n_rows > PREDICT_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {n_rows} rows exceeds limit of {PREDICT_MAX_BATCH_SIZE}"
+        )
+
+    if batch.rows is not None:
+        return np.array([feature_vector(row) for row in batch.rows],
+                        dtype=float).reshape(n_rows, len(FEATURE_ORDER))
+    # Columns left out are filled with the metro-wide latest weather / current time
+    defaults = get_latest_features().vector({})
+    return np.column_stack([
+        np.asarray(batch.columns[f], dtype=float) if f in batch.columns else np.full(n_rows, defaults[j])
+        for j, f in enumerate(FEATURE_ORDER)
+    ]).reshape(n_rows, len(FEATURE_ORDER))
 
 # -------------------------------
 # Load model
 # -------------------------------
 def load_model():
-    print("[startup] Downloading model from Supabase...")
+    print("[startup] Loading model from artifact cache...")
     try:
-        data = supabase.storage.from_(BUCKET_NAME).download("best_flood_model.pkl")
-        model = joblib.load(BytesIO(data))
+        with span("model_load"):
+            model = serving_model(get_artifacts().load_joblib("best_flood_model.pkl"))
         print("[startup] Model loaded successfully.")
         return model
     except Exception as e:
         print("[startup] Failed to load model:", e)
         return None
 
-model = load_model()
+model = None
+model_lock = threading.Lock()
+
+def get_model():
+    """The live model, loaded on first use if the startup hook has not loaded it yet."""
+    global model
+    if model is None:
+        with model_lock:
+            if model is None:
+                loaded = load_model()
+                if model is None:  # install_model may have run meanwhile
+                    model = loaded
+    return model
+
+def warm_model():
+    current = get_model()
+    if current is None:
+        raise RuntimeError("model not available")
+    warmup(current)
+
+def preload():
+    """
+    The model, loaded by the gunicorn master before it forks the workers
+    (see prefork.py); runs again on every reload.
+    """
+    global model
+    with span("model_load"):
+        model = serving_model(get_artifacts().load_joblib("best_flood_model.pkl", revalidate=True))
+    print("[startup] Model preloaded for the workers.")
+
+prefork.register(preload)
+
+# Probabilities of recently seen (rounded) feature vectors; clears itself on model swaps
+prediction_cache = PredictionCache()
+
+# Cache misses from concurrent /predict calls are scored together
+batcher = MicroBatcher()
+
+# Bounds in-flight /predict and /predict/batch work; the excess gets a fast 503
+admission = AdmissionControl()
+
+# Flood probability grid for the map, rescored when the model or weather changes
+heatmap = HeatmapRefresher(get_model=lambda: model, get_table=get_latest_features)
+
+# Warm-up run in the background once the server starts; /ready reports progress
+startup = Startup("ai", [
+    ("batcher", batcher.start),
+    ("model", warm_model),
+    ("features", get_latest_features),
+    ("heatmap", lambda: heatmap.start().poke()),
+])
+
+GaugeFunc("flood_prediction_cache", "Prediction cache counters and size.",
+          lambda: {k: v for k, v in prediction_cache.stats().items() if isinstance(v, (int, float))},
+          labelname="stat")
+GaugeFunc("flood_predict_queue_depth", "Rows waiting for the micro-batcher.",
+          lambda: batcher.stats()["queue_depth"])
+GaugeFunc("flood_predict_admission", "Admission control for /predict: in-flight, waiting and shed requests.",
+          lambda: admission.stats(), labelname="stat")
+
+def overloaded(e):
+    return HTTPException(status_code=503, detail=f"Server busy: {e.reason}",
+                         headers={"Retry-After": str(e.retry_after)})
+
+# -------------------------------
+# Instrumentation
+# -------------------------------
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    start = time.perf_counter()
+    if profiler.requested(request.headers.get(profiler.HEADER)):
+        # Samples the event loop thread, i.e. async endpoints such as /predict
+        with profiler.SamplingProfiler() as prof:
+            response = await call_next(request)
+        response.headers[profiler.HEADER] = f"{prof.save(request.url.path)}; samples={prof.samples}"
+    else:
+        response = await call_next(request)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    metrics.observe_request("ai", request.method, route, response.status_code, time.perf_counter() - start)
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 # -------------------------------
 # Endpoints
@@ -66,29 +220,108 @@ model = load_model()
 def root():
     return {"status": "ok", "message": "Flood AI microservice is running!"}
 
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once the startup warm-up finished, 503 before."""
+    state = startup.status()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
 @app.post("/predict")
-def predict(features: FloodFeatures):
-    if model is None:
+async def predict(features: FloodFeatures):
+    try:
+        async with admission.admit_async():
+            return await predict_admitted(features)
+    except Overloaded as e:
+        raise overloaded(e)
+
+async def predict_admitted(features: FloodFeatures):
+    current = model  # pin one model for the whole request
+    if current is None:
+        current = await asyncio.to_thread(get_model)
+    if current is None:
         raise HTTPException(status_code=503, detail="Model not available")
-    
-    feat_vector = np.array([[
-        features.main_temp,
-        features.main_humidity,
-        features.main_pressure,
-        features.rain1h,
-        features.wind_speed,
-        features.hour,
-        features.day_of_week,
-        features.month,
-        features.is_weekend
-    ]])
-    
-    prob = model.predict_proba(feat_vector)[0, 1]
-    return {"flood_probability": float(prob)}
-
-@app.post("/retrain")
-def retrain_models():
-    run_pipeline()
+
+    prob, key, row = prediction_cache.lookup(current, feature_vector(features))
+    if prob is None:
+        try:
+            prob = await asyncio.wait_for(asyncio.wrap_future(batcher.submit(current, row)), batcher.timeout)
+        except QueueFull:
+            raise HTTPException(status_code=503, detail="Too many pending predictions",
+                                headers={"Retry-After": "1"})
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Prediction timed out",
+                                headers={"Retry-After": "1"})
+        prediction_cache.store(current, key, prob)
+    return {"flood_probability": prob}
+
+@app.get("/predict/cache")
+def predict_cache_stats():
+    return prediction_cache.stats()
+
+@app.get("/predict/batching")
+def predict_batching_stats():
+    return batcher.stats()
+
+@app.post("/predict/batch")
+def predict_batch(batch: FloodBatch):
+    try:
+        with admission.admit():
+            return predict_batch_admitted(batch)
+    except Overloaded as e:
+        raise overloaded(e)
+
+def predict_batch_admitted(batch: FloodBatch):
+    current = get_model()
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not available")
+
+    feat_matrix = batch_to_matrix(batch)
+    if len(feat_matrix) == 0:
+        return {"flood_probabilities": [], "count": 0}
+
+    # One predict_proba call for the whole batch; output keeps input order
+    with span("predict_proba"):
+        probs = current.predict_proba(feat_matrix)[:, 1]
+    return {"flood_probabilities": probs.tolist(), "count": len(probs)}
+
+@app.get("/heatmap")
+def heatmap_tile(request: Request, response: Response):
+    """Precomputed flood probabilities. Query params: bbox (south,west,north,east), zoom."""
+    grid = heatmap.grid  # pin one version for the whole request
+    if grid is None:
+        raise HTTPException(status_code=503, detail="Heatmap not available yet")
+    try:
+        bbox, zoom = parse_tile_query(request.query_params)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    etag = grid.etag(bbox, zoom)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    candidates = [t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")]
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return grid.tile(bbox, zoom)
+
+def install_model(new_model):
     global model
-    model = load_model()  # reload newly trained model
-    return {"status": "training completed"}
+    model = serving_model(new_model)  # single reference swap; in-flight requests keep the old one
+    heatmap.poke()
+    prefork.request_reload()  # under a pre-forking master, every worker moves to the new model
+
+def run_retrain_pipeline():
+    from .pipeline import run_pipeline  # training code and sklearn load on the first retrain
+    return run_pipeline()
+
+retrain_jobs = RetrainJobs(train=run_retrain_pipeline, install=install_model, reload=load_model)
+
+@app.post("/retrain", status_code=202)
+def retrain_models():
+    return retrain_jobs.submit()
+
+@app.get("/retrain/{job_id}")
+def retrain_status(job_id: str):
+    job = retrain_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job
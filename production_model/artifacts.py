@@ -0,0 +1,177 @@
+# production_model/artifacts.py
+"""
+artifacts.py
+------------
+Content-addressed local cache for artifacts kept in Supabase Storage
+(models, CSVs). Shared by the AI microservice and the Django backend.
+
+Layout under ARTIFACT_CACHE_DIR (default ~/.cache/flood-artifacts):
+  objects/<sha256>   artifact bytes, named by content hash
+  refs/<name>.json   remote metadata + hash of the copy we hold
+  locks/<name>.lock  serializes downloads of one artifact across workers
+
+On fetch, a cached copy is revalidated against the remote listing metadata
+(eTag / size / updated_at) instead of being re-downloaded. Downloads are
+written to a temp file and renamed into place, so readers never see a
+partial file and concurrent workers download each artifact only once.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "flood-artifacts")
+
+# Skip the remote metadata check if the ref was validated this recently
+REVALIDATE_AFTER = float(os.getenv("ARTIFACT_REVALIDATE_AFTER", "60"))
+
+
+def _safe_name(name):
+    return name.replace("/", "__")
+
+
+def _atomic_write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class ArtifactCache:
+    def __init__(self, storage, bucket, cache_dir=None, revalidate_after=REVALIDATE_AFTER):
+        self.storage = storage
+        self.bucket = bucket
+        self.cache_dir = cache_dir or os.getenv("ARTIFACT_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.revalidate_after = revalidate_after
+        for sub in ("objects", "refs", "locks"):
+            os.makedirs(os.path.join(self.cache_dir, sub), exist_ok=True)
+
+    # -------------------------------
+    # Paths and refs
+    # -------------------------------
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest)
+
+    def _ref_path(self, name):
+        return os.path.join(self.cache_dir, "refs", _safe_name(name) + ".json")
+
+    def _read_ref(self, name):
+        try:
+            with open(self._ref_path(name)) as f:
+                ref = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._object_path(ref.get("sha256", ""))):
+            return None
+        return ref
+
+    def _write_ref(self, name, ref):
+        _atomic_write(self._ref_path(name), json.dumps(ref).encode())
+
+    # -------------------------------
+    # Remote metadata
+    # -------------------------------
+    def remote_metadata(self, name):
+        """
+        Identity of the remote object from the bucket listing, or None when
+        the listing is unavailable.
+        """
+        folder, _, base = name.rpartition("/")
+        try:
+            entries = self.storage.from_(self.bucket).list(folder or None, {"search": base})
+        except Exception as e:
+            print(f"[artifacts] Could not fetch metadata for '{name}':", e)
+            return None
+        for entry in entries or []:
+            if entry.get("name") == base:
+                meta = entry.get("metadata") or {}
+                return {
+                    "etag": meta.get("eTag"),
+                    "size": meta.get("size"),
+                    "updated_at": entry.get("updated_at"),
+                }
+        return None
+
+    @staticmethod
+    def _matches(ref, meta):
+        return all(ref.get(k) == meta.get(k) for k in ("etag", "size", "updated_at"))
+
+    # -------------------------------
+    # Fetch
+    # -------------------------------
+    def fetch(self, name, revalidate=False):
+        """
+        Return a local path holding the current contents of `name`.
+        revalidate: check the remote copy even if it was checked recently
+        """
+        ref = self._read_ref(name)
+        if ref and not revalidate and time.time() - ref.get("checked_at", 0) < self.revalidate_after:
+            return self._object_path(ref["sha256"])
+
+        meta = self.remote_metadata(name)
+        if ref and (meta is None or self._matches(ref, meta)):
+            # Unchanged remotely (or remote unreachable): keep serving our copy
+            ref["checked_at"] = time.time()
+            self._write_ref(name, ref)
+            return self._object_path(ref["sha256"])
+
+        lock_path = os.path.join(self.cache_dir, "locks", _safe_name(name) + ".lock")
+        with open(lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another worker may have refreshed it while we waited
+                ref = self._read_ref(name)
+                if ref and meta is not None and self._matches(ref, meta):
+                    return self._object_path(ref["sha256"])
+                return self._download(name, meta)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _download(self, name, meta):
+        print(f"[artifacts] Downloading '{name}' from bucket '{self.bucket}'...")
+        data = self.storage.from_(self.bucket).download(name)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            _atomic_write(path, data)
+
+        old = self._read_ref(name)
+        self._write_ref(name, dict(meta or {}, sha256=digest, checked_at=time.time()))
+        if old and old["sha256"] != digest:
+            self._prune(old["sha256"])
+        print(f"[artifacts] Cached '{name}' as {digest[:12]} ({len(data)} bytes).")
+        return path
+
+    def _prune(self, digest):
+        """Delete an object no ref points to (open mmaps stay valid on POSIX)."""
+        refs_dir = os.path.join(self.cache_dir, "refs")
+        for ref_file in os.listdir(refs_dir):
+            try:
+                with open(os.path.join(refs_dir, ref_file)) as f:
+                    if json.load(f).get("sha256") == digest:
+                        return
+            except (OSError, ValueError):
+                continue
+        try:
+            os.unlink(self._object_path(digest))
+        except OSError:
+            pass
+
+    def load_joblib(self, name, mmap_mode="r", revalidate=False):
+        """
+        joblib.load a cached artifact. Numpy arrays in uncompressed joblib
+        files are memory-mapped read-only, so workers share the page cache.
+        """
+        import joblib
+
+        return joblib.load(self.fetch(name, revalidate=revalidate), mmap_mode=mmap_mode)
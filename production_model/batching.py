@@ -0,0 +1,164 @@
+# production_model/batching.py
+"""
+batching.py
+-----------
+Micro-batching for single-row /predict requests.
+
+A predict_proba call has a fixed per-call cost (input validation, tree
+traversal setup) that dwarfs the cost of one extra row, so concurrent
+requests are cheaper scored together. `MicroBatcher.submit` enqueues a row
+and returns a concurrent.futures.Future. A worker thread takes the first
+queued row, waits up to `window` seconds (or until `max_batch` rows are
+queued), scores the batch with one call per model and resolves every
+caller's future. With a zero window the worker still batches whatever
+queued up while the previous model call ran, without ever waiting.
+
+When `max_queue` rows are already waiting, `submit` raises QueueFull
+instead of queueing more (the endpoint answers 503 with Retry-After).
+
+The worker thread starts on the first `submit` (or `start()`), not when
+the batcher is built, and `submit` restarts it if it has died. In a
+process forked from one that already used the batcher (a pre-forking
+gunicorn master, see prefork.py), the queue and locks are rebuilt and a
+fresh thread is started, since threads do not survive a fork. Callers
+wait at most `timeout` seconds for their future; the endpoint answers 503
+if it has not resolved by then.
+
+Configuration (environment variables):
+  PREDICT_BATCH_WINDOW_MS  how long the first row waits for company (default 0;
+                           2-5 helps when arrivals are spread out)
+  PREDICT_BATCH_MAX        max rows per model call (default 64)
+  PREDICT_QUEUE_MAX        max queued rows before rejecting (default 1024)
+  PREDICT_BATCH_TIMEOUT_MS longest a caller waits for its prediction (default 5000)
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from .metrics import span
+
+BATCH_WINDOW = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "0")) / 1e3
+BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", "64"))
+QUEUE_MAX = int(os.getenv("PREDICT_QUEUE_MAX", "1024"))
+RESULT_TIMEOUT = float(os.getenv("PREDICT_BATCH_TIMEOUT_MS", "5000")) / 1e3
+
+# Recent batches kept for the size / delay percentiles in stats()
+STATS_WINDOW = 10000
+
+
+class QueueFull(Exception):
+    """Raised by submit when the queue is at max_queue."""
+
+
+class MicroBatcher:
+    def __init__(self, window=BATCH_WINDOW, max_batch=BATCH_MAX, max_queue=QUEUE_MAX,
+                 timeout=RESULT_TIMEOUT):
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self._reset()
+
+    def _reset(self):
+        """Fresh queue, locks and stats for this process (no thread yet)."""
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._sizes = deque(maxlen=STATS_WINDOW)
+        self._delays = deque(maxlen=STATS_WINDOW)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "batches": 0, "rejected": 0, "errors": 0}
+        self._thread = None
+        self._pid = os.getpid()
+
+    def start(self):
+        """Start the worker thread unless it is running. Returns self."""
+        if self._pid != os.getpid():
+            # Forked: the parent's thread is gone and its locks may be held
+            self._reset()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, model, row):
+        """
+        Future resolving to P(flood) of `row` under `model`; raises QueueFull.
+        Wait on it for at most `self.timeout` seconds.
+        """
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            self.start()
+        future = Future()
+        try:
+            self._queue.put_nowait((model, row, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.counters["rejected"] += 1
+            raise QueueFull(f"{self._queue.maxsize} predictions already queued")
+        return future
+
+    def _collect(self):
+        """Block for the first item, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = batch[0][3] + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            # Skip rows whose caller gave up; the rest can no longer be cancelled
+            batch = [item for item in self._collect() if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            # Normally one model; a hot-swap mid-window splits the batch
+            by_model = {}
+            for item in batch:
+                by_model.setdefault(id(item[0]), []).append(item)
+            errors = 0
+            for items in by_model.values():
+                futures = [item[2] for item in items]
+                try:
+                    X = np.vstack([item[1] for item in items])
+                    with span("predict_proba"):
+                        probs = items[0][0].predict_proba(X)[:, 1]
+                except Exception as e:
+                    errors += 1
+                    for future in futures:
+                        future.set_exception(e)
+                    continue
+                for future, prob in zip(futures, probs.tolist()):
+                    future.set_result(prob)
+            with self._lock:
+                self.counters["requests"] += len(batch)
+                self.counters["batches"] += 1
+                self.counters["errors"] += errors
+                self._sizes.append(len(batch))
+                self._delays.extend(started - item[3] for item in batch)
+
+    def stats(self):
+        with self._lock:
+            sizes = np.array(self._sizes, dtype=float)
+            delays_ms = np.array(self._delays, dtype=float) * 1e3
+            counters = dict(self.counters)
+        summary = dict(counters, queue_depth=self._queue.qsize(), window_ms=self.window * 1e3,
+                       max_batch=self.max_batch, max_queue=self._queue.maxsize)
+        if len(sizes):
+            summary.update(
+                batch_size_mean=round(float(sizes.mean()), 2),
+                batch_size_p50=float(np.percentile(sizes, 50)),
+                batch_size_max=int(sizes.max()),
+                queue_delay_ms_p50=round(float(np.percentile(delays_ms, 50)), 3),
+                queue_delay_ms_p99=round(float(np.percentile(delays_ms, 99)), 3),
+            )
+        return summary
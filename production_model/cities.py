@@ -0,0 +1,58 @@
+# production_model/cities.py
+"""
+cities.py
+---------
+Canonical Metro Manila city names. Flood reports use names like
+"Manila City" / "Parañaque City" while the weather feed uses "Manila",
+"Paranaque City", "City of Marikina", ... Everything that joins the two
+goes through `canonical_city` so both sides agree.
+"""
+
+import unicodedata
+
+CITIES = [
+    "Caloocan City", "Las Piñas City", "Makati City", "Malabon City",
+    "Mandaluyong City", "Manila City", "Marikina City", "Muntinlupa City",
+    "Navotas City", "Parañaque City", "Pasay City", "Pasig City", "Pateros",
+    "Quezon City", "San Juan City", "Taguig City", "Valenzuela City",
+]
+
+
+# Approximate centroids of the Metro Manila LGUs, (lat, lon)
+CITY_CENTROIDS = {
+    "Caloocan City": (14.6507, 120.9676),
+    "Las Piñas City": (14.4445, 120.9939),
+    "Makati City": (14.5547, 121.0244),
+    "Malabon City": (14.6681, 120.9658),
+    "Mandaluyong City": (14.5794, 121.0359),
+    "Manila City": (14.5995, 120.9842),
+    "Marikina City": (14.6507, 121.1029),
+    "Muntinlupa City": (14.4081, 121.0415),
+    "Navotas City": (14.6667, 120.9417),
+    "Parañaque City": (14.4793, 121.0198),
+    "Pasay City": (14.5378, 121.0014),
+    "Pasig City": (14.5764, 121.0851),
+    "Pateros": (14.5454, 121.0687),
+    "Quezon City": (14.6760, 121.0437),
+    "San Juan City": (14.6019, 121.0355),
+    "Taguig City": (14.5176, 121.0509),
+    "Valenzuela City": (14.7011, 120.9830),
+}
+
+
+def _key(name):
+    """Accent-, case- and affix-insensitive lookup key."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    text = text.lower().strip()
+    text = text.removeprefix("city of ").removesuffix(" city").strip()
+    return " ".join(text.split())
+
+
+_CANONICAL = {_key(city): city for city in CITIES}
+
+
+def canonical_city(name):
+    """Map any known spelling to its canonical name; unknown names pass through."""
+    if name is None or name != name:  # None / NaN
+        return name
+    return _CANONICAL.get(_key(name), name)
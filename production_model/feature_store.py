@@ -0,0 +1,243 @@
+# production_model/feature_store.py
+"""
+feature_store.py
+----------------
+Model features shared by training (trainer.py) and serving (/predict in
+both services), so both compute them the same way.
+
+- `add_rolling_features` derives per-city rolling features from the hourly
+  weather data with vectorized groupby/rolling: 3h/6h/24h rain sums,
+  3h pressure tendency and 3h humidity trend.
+- `attach_features` joins them to flood reports (as-of join per city).
+- `LatestFeatures` keeps the newest value of every weather feature per city
+  in one float32 matrix; serving fills features a caller left out with a
+  dict lookup by city.
+
+FEATURE_COLUMNS is the column order the model is trained and served with.
+"""
+
+import glob
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .cities import canonical_city
+from . import weather_store
+
+BASE_FEATURES = ["main.temp", "main.humidity", "main.pressure", "rain1h", "wind.speed"]
+TIME_FEATURES = ["hour", "day_of_week", "month", "is_weekend"]
+ROLLING_FEATURES = ["rain_3h", "rain_6h", "rain_24h", "pressure_tendency_3h", "humidity_trend_3h"]
+FEATURE_COLUMNS = BASE_FEATURES + TIME_FEATURES + ROLLING_FEATURES
+
+# Per-city weather features served from the latest-values table
+STORE_FEATURES = BASE_FEATURES + ROLLING_FEATURES
+
+RAIN_WINDOWS = {"rain_3h": 3, "rain_6h": 6, "rain_24h": 24}
+TREND_HOURS = 3
+# Observations are hourly with a few seconds of jitter; trimming the window
+# keeps an "Nh" sum at N readings instead of occasionally N + 1
+WINDOW_SLACK = pd.Timedelta(minutes=10)
+TREND_TOLERANCE = pd.Timedelta(minutes=30)
+
+# Rebuild the latest-values table when it is older than this many seconds
+TABLE_TTL = float(os.getenv("FEATURE_TABLE_TTL", "600"))
+
+
+def api_name(column):
+    """Request field name for a feature column ("main.temp" -> "main_temp")."""
+    return column.replace(".", "_")
+
+
+# -------------------------------
+# Feature computation
+# -------------------------------
+def time_features(times):
+    """hour / day_of_week / month / is_weekend for a Series of timestamps."""
+    times = pd.Series(pd.to_datetime(times))
+    day_of_week = times.dt.dayofweek
+    return pd.DataFrame({
+        "hour": times.dt.hour,
+        "day_of_week": day_of_week,
+        "month": times.dt.month,
+        "is_weekend": (day_of_week >= 5).astype(int),
+    }, index=times.index)
+
+
+def _value_hours_ago(df, column, hours):
+    """`column` of the same city's reading `hours` earlier (NaN if none close)."""
+    times = df["datetime"].to_numpy(dtype="datetime64[ns]")  # UTC, avoids object arrays
+    left = pd.DataFrame({"city": df["city"].to_numpy(), "_t": times - np.timedelta64(hours, "h"),
+                         "_row": np.arange(len(df))}).sort_values("_t", kind="stable")
+    right = pd.DataFrame({"city": df["city"].to_numpy(), "_t": times,
+                          "_prev": df[column].to_numpy()}).sort_values("_t", kind="stable")
+    merged = pd.merge_asof(left, right, on="_t", by="city", direction="nearest",
+                           tolerance=TREND_TOLERANCE)
+    prev = np.full(len(df), np.nan)
+    prev[merged["_row"].to_numpy()] = merged["_prev"].to_numpy()
+    return prev
+
+
+def _canonical_cities(values):
+    codes, uniques = pd.factorize(pd.Series(values).astype(str))
+    return np.array([canonical_city(u) for u in uniques], dtype=object)[codes]
+
+
+def add_rolling_features(weather):
+    """
+    Add ROLLING_FEATURES to hourly weather rows with `city` and `datetime`.
+    Returns a copy sorted by city and time.
+    """
+    df = weather.copy()
+    df["city"] = _canonical_cities(df["city"])
+    df["rain1h"] = df["rain1h"].fillna(0.0)
+    df = df.sort_values(["city", "datetime"], kind="stable").reset_index(drop=True)
+
+    # Rows are contiguous per city in group order, so results line up with df
+    grouped = df.groupby("city", sort=False)
+    for name, hours in RAIN_WINDOWS.items():
+        window = pd.Timedelta(hours=hours) - WINDOW_SLACK
+        df[name] = grouped.rolling(window, on="datetime")["rain1h"].sum().to_numpy()
+
+    df["pressure_tendency_3h"] = df["main.pressure"] - _value_hours_ago(df, "main.pressure", TREND_HOURS)
+    df["humidity_trend_3h"] = df["main.humidity"] - _value_hours_ago(df, "main.humidity", TREND_HOURS)
+    for name in ROLLING_FEATURES:
+        df[name] = df[name].astype(np.float32)
+    return df
+
+
+def load_weather(store_dir=weather_store.STORE_DIR, raw_dir=weather_store.RAW_DIR, start=None):
+    """Hourly weather from the Parquet store, or the raw monthly CSVs if it is empty."""
+    if weather_store.available_months(store_dir):
+        return weather_store.read_weather(store_dir, start=start).drop(columns="month")
+    paths = sorted(glob.glob(os.path.join(raw_dir, "[0-9]" * 6 + ".csv")))
+    if start is not None:
+        first = pd.Timestamp(start).strftime("%Y%m")
+        paths = [p for p in paths if os.path.basename(p)[:6] >= first] or paths[-1:]
+    if not paths:
+        return pd.DataFrame()
+    return pd.concat([weather_store.parse_raw_month(p) for p in paths], ignore_index=True)
+
+
+def weather_fingerprint(store_dir=weather_store.STORE_DIR, raw_dir=weather_store.RAW_DIR):
+    """
+    Name, size and mtime of every file `load_weather` would read, so adding
+    or re-ingesting a month changes it without reading the data.
+    """
+    if weather_store.available_months(store_dir):
+        paths = glob.glob(os.path.join(store_dir, "**", "*.parquet"), recursive=True)
+        base = store_dir
+    else:
+        paths = glob.glob(os.path.join(raw_dir, "[0-9]" * 6 + ".csv"))
+        base = raw_dir
+    files = []
+    for path in sorted(paths):
+        stat = os.stat(path)
+        files.append([os.path.relpath(path, base), stat.st_size, stat.st_mtime_ns])
+    return files
+
+
+def attach_features(reports, weather=None, tolerance="2h", city_col="city", time_col="datetime"):
+    """
+    Join every flood report to its city's weather features at or before the
+    report time. Reports without weather keep NaN features.
+    """
+    from .temporal_join import asof_join_weather
+
+    if weather is None:
+        weather = load_weather()
+    if weather.empty:
+        print("[features] No weather data available; skipping weather features.")
+        return reports
+    features = add_rolling_features(weather)[["city", "datetime"] + STORE_FEATURES]
+    merged, _ = asof_join_weather(reports, features, tolerance=tolerance, flood_city_col=city_col,
+                                  flood_time_col=time_col, keep_unmatched=True)
+    return merged.drop(columns="weather_datetime")
+
+
+# -------------------------------
+# Serving: latest values per city
+# -------------------------------
+class LatestFeatures:
+    def __init__(self, cities, values, as_of):
+        self.cities = list(cities)
+        self.index = {city: i for i, city in enumerate(self.cities)}
+        self.values = np.ascontiguousarray(values, dtype=np.float32)  # (cities, STORE_FEATURES)
+        self.as_of = list(as_of)
+        # Metro-wide fallback for unknown or missing cities
+        self.default = np.nanmedian(self.values, axis=0) if len(self.cities) else \
+            np.zeros(len(STORE_FEATURES), dtype=np.float32)
+        self.columns = {name: j for j, name in enumerate(STORE_FEATURES)}
+        self.built_at = time.time()
+
+    @classmethod
+    def from_weather(cls, weather):
+        if weather.empty:
+            return cls([], np.empty((0, len(STORE_FEATURES))), [])
+        latest = add_rolling_features(weather).groupby("city", sort=True).tail(1)
+        return cls(latest["city"], latest[STORE_FEATURES].to_numpy(dtype=np.float32),
+                   [t.isoformat() for t in latest["datetime"]])
+
+    def lookup(self, city):
+        """STORE_FEATURES values for `city` (metro-wide median if unknown)."""
+        i = self.index.get(canonical_city(city)) if city else None
+        row = self.default if i is None else self.values[i]
+        return dict(zip(STORE_FEATURES, row.tolist()))
+
+    def vector(self, values, city=None, when=None):
+        """
+        FEATURE_COLUMNS vector from caller-supplied `values` (keyed by
+        column name; None/missing entries are filled from the city's latest
+        weather, time features from `when`, default now).
+        """
+        i = self.index.get(canonical_city(city)) if city else None
+        row = self.default if i is None else self.values[i]
+        when = pd.Timestamp(when) if when is not None else datetime.now()
+        day_of_week = when.weekday()
+        times = {"hour": when.hour, "day_of_week": day_of_week, "month": when.month,
+                 "is_weekend": int(day_of_week >= 5)}
+        out = np.empty(len(FEATURE_COLUMNS), dtype=np.float64)
+        for k, name in enumerate(FEATURE_COLUMNS):
+            value = values.get(name)
+            if value is None:
+                value = times[name] if name in times else row[self.columns[name]]
+            out[k] = value
+        return np.nan_to_num(out, nan=0.0)
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_latest_features(refresh=False):
+    """Shared latest-values table, rebuilt when older than TABLE_TTL."""
+    global _table
+    table = _table
+    if table is not None and not refresh and time.time() - table.built_at < TABLE_TTL:
+        return table
+    with _table_lock:
+        if _table is None or refresh or time.time() - _table.built_at >= TABLE_TTL:
+            try:
+                weather = load_weather(start=_recent_start())
+            except Exception as e:
+                print("[features] Could not load weather data:", e)
+                weather = pd.DataFrame()
+            _table = LatestFeatures.from_weather(weather)
+            print(f"[features] Latest-values table built for {len(_table.cities)} cities.")
+        return _table
+
+
+def _recent_start():
+    """Start of the window needed for the newest readings' 24h features."""
+    months = weather_store.available_months()
+    if not months:
+        paths = sorted(glob.glob(os.path.join(weather_store.RAW_DIR, "[0-9]" * 6 + ".csv")))
+        months = [int(os.path.basename(p)[:6]) for p in paths]
+    if not months:
+        return None
+    first_day = pd.Timestamp(year=months[-1] // 100, month=months[-1] % 100, day=1,
+                             tz=weather_store.LOCAL_TZ)
+    return first_day - pd.Timedelta(days=1)
@@ -0,0 +1,46 @@
+# production_model/gunicorn.conf.py
+"""
+gunicorn.conf.py
+----------------
+Gunicorn settings for pre-fork serving (see prefork.py), for either service:
+
+    # Django backend, from backend/
+    gunicorn -c ../production_model/gunicorn.conf.py backend.wsgi
+
+    # AI microservice, from the repo root
+    gunicorn -c production_model/gunicorn.conf.py -k uvicorn.workers.UvicornWorker production_model.app:app
+
+The master imports the app, loads the model (and road data) and freezes
+it, then forks the workers. `kill -HUP <master>` (sent automatically after
+a retrain) reloads the model and replaces the workers gracefully.
+
+Configuration (environment variables):
+  WEB_CONCURRENCY   number of workers (read by gunicorn itself; default 1)
+  PORT              port to bind on 0.0.0.0 (read by gunicorn itself)
+  SERVE_PRELOAD     "0" to skip preloading: every worker imports the app
+                    and loads its own copy of the model (default "1")
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from production_model import prefork  # noqa: E402
+
+preload_app = os.getenv("SERVE_PRELOAD", "1") != "0"
+prefork.enable()
+
+
+def when_ready(server):
+    prefork.preload()
+
+
+def on_reload(server):
+    prefork.preload()
+
+
+def post_fork(server, worker):
+    prefork.after_fork()
@@ -0,0 +1,244 @@
+# production_model/heatmap.py
+"""
+heatmap.py
+----------
+Flood probability over a regular lat/lon grid covering Metro Manila, for
+the map view (instead of one geocode + model call per click).
+
+- `score_grid` builds one feature row per grid cell and scores them all in
+  a single predict_proba call. Weather features are interpolated between
+  the cities of the latest-values table (inverse-distance weights over the
+  nearest city centroids); time features are the same for every cell.
+- The result is a float32 (rows, cols) array; its content hash is the
+  grid version used for ETags.
+- `HeatmapRefresher` rescores in a background thread whenever the model,
+  the latest weather snapshot or the hour of day changes (polled, or right
+  away via `poke`).
+- `HeatmapGrid.tile` cuts a bounding box out of the grid and downsamples it
+  for coarse zoom levels, keeping the highest probability of each block.
+  Zooms coarse enough to cover the whole grid return a single cell.
+
+Configuration (environment variables):
+  HEATMAP_STEP_DEG   grid spacing in degrees (default 0.005, ~550 m)
+  HEATMAP_MAX_ZOOM   map zoom served at full grid resolution (default 14)
+  HEATMAP_INTERVAL   seconds between change checks (default 60)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .cities import CITY_CENTROIDS
+from .metrics import span
+
+# south, west, north, east
+GRID_BOUNDS = (14.35, 120.90, 14.78, 121.15)
+GRID_STEP = float(os.getenv("HEATMAP_STEP_DEG", "0.005"))
+MAX_ZOOM = int(os.getenv("HEATMAP_MAX_ZOOM", "14"))
+MIN_ZOOM = 0
+REFRESH_INTERVAL = float(os.getenv("HEATMAP_INTERVAL", "60"))
+
+# Cities blended into each cell's weather features
+NEAREST_CITIES = 3
+
+
+def grid_axes(bounds=GRID_BOUNDS, step=GRID_STEP):
+    """Cell-center latitudes (south to north) and longitudes (west to east)."""
+    south, west, north, east = bounds
+    lat = south + step * (np.arange(int(round((north - south) / step))) + 0.5)
+    lon = west + step * (np.arange(int(round((east - west) / step))) + 0.5)
+    return lat, lon
+
+
+def idw_weights(lat, lon, city_lat, city_lon, k=NEAREST_CITIES):
+    """
+    (cells, cities) inverse-distance weights over the k nearest cities;
+    every row sums to 1.
+    """
+    # Equirectangular distances are plenty at city scale
+    scale = np.cos(np.radians(np.mean(city_lat)))
+    d = np.hypot(lat[:, None] - city_lat[None, :], (lon[:, None] - city_lon[None, :]) * scale)
+    k = min(k, d.shape[1])
+    nearest = np.argsort(d, axis=1)[:, :k]
+    near_d = np.take_along_axis(d, nearest, axis=1)
+    inv = 1.0 / np.maximum(near_d, 1e-6) ** 2
+    weights = np.zeros_like(d)
+    np.put_along_axis(weights, nearest, inv / inv.sum(axis=1, keepdims=True), axis=1)
+    return weights
+
+
+def grid_features(table, lat, lon, when=None):
+    """FEATURE_COLUMNS matrix with one row per cell (row-major over lat, lon)."""
+    cities = [c for c in table.cities if c in CITY_CENTROIDS]
+    cell_lat, cell_lon = (a.ravel() for a in np.meshgrid(lat, lon, indexing="ij"))
+    if not cities:
+        return np.tile(table.vector({}, when=when), (len(cell_lat), 1))
+    city_rows = np.stack([table.vector({}, city=c, when=when) for c in cities])
+    city_lat = np.array([CITY_CENTROIDS[c][0] for c in cities])
+    city_lon = np.array([CITY_CENTROIDS[c][1] for c in cities])
+    # Time features are equal across cities and weights sum to 1, so they pass through
+    return idw_weights(cell_lat, cell_lon, city_lat, city_lon) @ city_rows
+
+
+class HeatmapGrid:
+    def __init__(self, probabilities, bounds=GRID_BOUNDS, step=GRID_STEP, as_of=None):
+        self.probabilities = np.ascontiguousarray(probabilities, dtype=np.float32)  # (rows, cols)
+        self.bounds = tuple(bounds)
+        self.step = float(step)
+        self.as_of = as_of
+        self.version = hashlib.sha1(self.probabilities.tobytes()).hexdigest()[:16]
+        self.built_at = time.time()
+
+    @property
+    def shape(self):
+        return self.probabilities.shape
+
+    def _window(self, bbox):
+        """Row/col slice of the cells whose centers fall inside bbox."""
+        south, west, north, east = bbox
+        g_south, g_west, _, _ = self.bounds
+        rows, cols = self.shape
+        r0 = int(np.clip(np.ceil((south - g_south) / self.step - 0.5), 0, rows))
+        r1 = int(np.clip(np.floor((north - g_south) / self.step - 0.5) + 1, r0, rows))
+        c0 = int(np.clip(np.ceil((west - g_west) / self.step - 0.5), 0, cols))
+        c1 = int(np.clip(np.floor((east - g_west) / self.step - 0.5) + 1, c0, cols))
+        return r0, r1, c0, c1
+
+    def _factor(self, zoom):
+        # Past the point where the whole grid is one block, coarser zooms
+        # would only pad the array; cap them at a single cell.
+        return min(downsample_factor(zoom), max(self.shape))
+
+    def etag(self, bbox=None, zoom=MAX_ZOOM):
+        window = self._window(bbox or self.bounds)
+        key = f"{self.version}:{window}:{self._factor(zoom)}:{zoom}"
+        return '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+    def tile(self, bbox=None, zoom=MAX_ZOOM):
+        """JSON-ready dict for the cells inside bbox at the given zoom."""
+        r0, r1, c0, c1 = self._window(bbox or self.bounds)
+        factor = self._factor(zoom)
+        block = downsample_max(self.probabilities[r0:r1, c0:c1], factor)
+        g_south, g_west, _, _ = self.bounds
+        step = self.step * factor
+        return {
+            "version": self.version,
+            "as_of": self.as_of,
+            "zoom": zoom,
+            # Outer edges of the returned cells; rows run south to north
+            "bbox": [round(g_south + r0 * self.step, 6), round(g_west + c0 * self.step, 6),
+                     round(g_south + min(r0 + block.shape[0] * factor, r1) * self.step, 6),
+                     round(g_west + min(c0 + block.shape[1] * factor, c1) * self.step, 6)],
+            "cell_deg": step,
+            "shape": list(block.shape),
+            "probabilities": np.round(block, 3).tolist(),
+        }
+
+
+def downsample_factor(zoom):
+    return 2 ** max(0, MAX_ZOOM - int(zoom))
+
+
+def downsample_max(values, factor):
+    """Max over factor x factor blocks (edge blocks may be smaller)."""
+    if factor <= 1 or values.size == 0:
+        return values
+    rows, cols = values.shape
+    pad_r, pad_c = -rows % factor, -cols % factor
+    padded = np.pad(values, ((0, pad_r), (0, pad_c)), constant_values=-np.inf)
+    blocks = padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor)
+    return blocks.max(axis=(1, 3))
+
+
+def parse_tile_query(params):
+    """(bbox, zoom) from query params `bbox=south,west,north,east` and `zoom`."""
+    bbox = None
+    if params.get("bbox"):
+        try:
+            bbox = [float(v) for v in str(params["bbox"]).split(",")]
+        except ValueError:
+            raise ValueError("bbox must be four numbers: south,west,north,east")
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError("bbox must be four numbers: south,west,north,east")
+    try:
+        zoom = int(params.get("zoom", MAX_ZOOM))
+    except (TypeError, ValueError):
+        raise ValueError("zoom must be an integer")
+    if not MIN_ZOOM <= zoom <= 22:
+        raise ValueError("zoom must be between 0 and 22")
+    return bbox, zoom
+
+
+def scoring_hour():
+    """Now, truncated to the hour: every time feature is constant within it."""
+    return datetime.now().replace(minute=0, second=0, microsecond=0)
+
+
+def score_grid(model, table, when=None, bounds=GRID_BOUNDS, step=GRID_STEP):
+    lat, lon = grid_axes(bounds, step)
+    X = grid_features(table, lat, lon, when=when)
+    probabilities = model.predict_proba(X)[:, 1].reshape(len(lat), len(lon))
+    as_of = max(table.as_of) if table.as_of else None
+    return HeatmapGrid(probabilities, bounds=bounds, step=step, as_of=as_of)
+
+
+# -------------------------------
+# Background refresh
+# -------------------------------
+class HeatmapRefresher:
+    def __init__(self, get_model, get_table, interval=REFRESH_INTERVAL):
+        """
+        get_model: returns the live model (or None while it is loading)
+        get_table: returns the current LatestFeatures table
+        """
+        self.get_model = get_model
+        self.get_table = get_table
+        self.interval = interval
+        self.grid = None
+        self.last_refresh_seconds = None
+        self._key = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Rescore if the model, weather snapshot or hour changed. Returns the grid."""
+        with self._lock:
+            model, table = self.get_model(), self.get_table()
+            if model is None:
+                return self.grid
+            hour = scoring_hour()
+            key = (id(model), tuple(table.as_of), table.values.tobytes(), hour)
+            if not force and key == self._key:
+                return self.grid
+            started = time.perf_counter()
+            with span("heatmap_refresh"):
+                grid = score_grid(model, table, when=hour)
+            self.last_refresh_seconds = time.perf_counter() - started
+            self.grid, self._key = grid, key  # single reference swap
+            print(f"[heatmap] Scored {grid.probabilities.size} cells in "
+                  f"{self.last_refresh_seconds * 1e3:.0f} ms (version {grid.version}).")
+            return grid
+
+    def poke(self):
+        """Ask the background thread to check for changes now."""
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print("[heatmap] Refresh failed:", e)
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,119 @@
+# production_model/jobs.py
+"""
+jobs.py
+-------
+Background retraining with atomic model hot-swap, shared by the AI
+microservice and the Django backend.
+
+- Only one training job runs at a time, on a dedicated worker thread.
+- While a job runs, at most one follow-up job is queued; further retrain
+  requests coalesce into that queued job (it will see the newest data).
+- A finished model is warmed up with a dummy prediction before `install`
+  swaps it in, so serving never sees a gap or a None model.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from .feature_store import FEATURE_COLUMNS
+
+MAX_JOB_HISTORY = 50
+
+
+def warmup(model):
+    """Run one prediction so lazy initialization happens off the hot path."""
+    n_features = getattr(model, "n_features_in_", len(FEATURE_COLUMNS))
+    model.predict_proba(np.zeros((1, n_features)))
+
+
+class RetrainJobs:
+    def __init__(self, train, install, reload=None):
+        """
+        train:   runs the pipeline; returns the new model, a dict with a
+                 "model" key, or None (then `reload` is used)
+        install: called with the warmed-up model to make it live
+        reload:  loads the latest model from storage
+        """
+        self.train = train
+        self.install = install
+        self.reload = reload
+        self._jobs = OrderedDict()
+        self._pending = deque()
+        self._running = None
+        self._lock = threading.Lock()
+
+    def submit(self):
+        """Queue a retrain (or join the one already queued). Returns the job dict."""
+        with self._lock:
+            if self._pending:
+                job = self._jobs[self._pending[0]]
+                job["coalesced"] += 1
+                return dict(job)
+
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                "job_id": job_id,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "coalesced": 0,
+                "error": None,
+                "result": None,
+            }
+            self._jobs[job_id] = job
+            self._pending.append(job_id)
+            while len(self._jobs) > MAX_JOB_HISTORY:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest]["status"] in ("queued", "running"):
+                    break
+                self._jobs.popitem(last=False)
+
+            if self._running is None:
+                self._running = threading.Thread(target=self._worker, name="retrain-worker", daemon=True)
+                self._running.start()
+            return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._running = None
+                    return
+                job = self._jobs[self._pending.popleft()]
+                job["status"] = "running"
+                job["started_at"] = time.time()
+            self._run(job)
+
+    def _run(self, job):
+        print(f"[retrain] Job {job['job_id']} started.")
+        try:
+            output = self.train()
+            info = {}
+            if isinstance(output, dict):
+                info = {k: v for k, v in output.items() if isinstance(v, (int, float, str, dict))}
+                output = output.get("model")
+            new_model = output if output is not None else (self.reload() if self.reload else None)
+            if new_model is None:
+                raise RuntimeError("training produced no model")
+
+            warmup(new_model)
+            self.install(new_model)
+            status, error = "succeeded", None
+            info["model"] = type(new_model).__name__
+            print(f"[retrain] Job {job['job_id']} finished; new model is live.")
+        except Exception as e:
+            status, error, info = "failed", str(e), None
+            print(f"[retrain] Job {job['job_id']} failed; keeping the current model:", e)
+
+        with self._lock:
+            job.update(status=status, error=error, result=info, finished_at=time.time())
@@ -0,0 +1,191 @@
+# production_model/metrics.py
+"""
+metrics.py
+----------
+Counters, histograms and timing spans shared by the AI microservice and
+the Django backend, rendered in the Prometheus text format at /metrics.
+
+    with span("geocode"):
+        ...
+
+records the block's duration in `flood_span_seconds{span="geocode"}`.
+One span costs two perf_counter() calls and a short locked update (a few
+microseconds; see benchmarks/bench_instrumentation.py). METRICS_ENABLED=0
+turns spans and request timings into no-ops.
+
+Kept dependency-free on purpose (no prometheus_client): a handful of
+metric types is all either service needs.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.getenv("METRICS_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+
+# Seconds; covers a dict lookup up to a full retrain
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount=1, labels=()):
+        """Add `amount`; `labels` are the label values in labelnames order."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value, labels=()):
+        """Record `value`; `labels` are the label values in labelnames order."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class GaugeFunc:
+    """Gauge read from a callback at scrape time: a number or {label value: number}."""
+    kind = "gauge"
+
+    def __init__(self, name, help, fn, labelname=None, registry=REGISTRY):
+        self.name, self.help, self.fn, self.labelname = name, help, fn, labelname
+        registry.register(self)
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if isinstance(value, dict):
+            return [f"{self.name}{_format_labels((self.labelname,), (k,))} {_format_value(v)}"
+                    for k, v in value.items() if v is not None]
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+
+# -------------------------------
+# Shared metrics
+# -------------------------------
+SPAN_SECONDS = Histogram("flood_span_seconds", "Duration of instrumented operations.", ["span"])
+REQUEST_SECONDS = Histogram("flood_http_request_seconds", "HTTP request latency.",
+                            ["service", "method", "route", "status"])
+
+
+class span:
+    """Context manager / decorator timing a block into flood_span_seconds."""
+    __slots__ = ("labels", "start")
+
+    def __init__(self, name):
+        self.labels = (name,)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if ENABLED:
+            SPAN_SECONDS.observe(time.perf_counter() - self.start, self.labels)
+        return False
+
+    def __call__(self, fn):
+        labels = self.labels
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if ENABLED:
+                    SPAN_SECONDS.observe(time.perf_counter() - start, labels)
+        wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return wrapper
+
+
+def observe_request(service, method, route, status, seconds):
+    if ENABLED:
+        REQUEST_SECONDS.observe(seconds, (service, method, route, str(status)))
+
+
+def render():
+    return REGISTRY.render()
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -2,23 +2,83 @@
 """
 pipeline.py
 ------------
-Automates the entire flood model training pipeline:
-1. (Optional) Fetch data (scraper.py)
-2. Download training CSV from Supabase
-3. Preprocess it
-4. Train model
-5. Upload trained .pkl to Supabase
+Automates the entire flood model training pipeline as a small DAG of
+stages (see stages.py):
+
+1. scrape   - parse new MMDA tweets (scraper.py)
+2. download - training CSV from Supabase, via the local artifact cache
+3. clean    - merge the scraped records into it and preprocess
+4. train    - train and select the model
+5. upload   - upload the trained artifacts to Supabase
+
+Each stage is fingerprinted from its code, parameters and inputs (the
+training CSV's eTag/size from the bucket listing for `download`, the
+tweet dump's content hash for `scrape`, the weather files' names, sizes
+and mtimes for `train`), so rerunning with unchanged inputs reuses the
+cached model instead of retraining and skips the upload. `force` rebuilds everything, or just the named stages and what
+depends on them.
+
+Returns the freshly trained (or cached) model so callers can hot-swap it
+without downloading it back, together with per-stage timings.
+
+Usage:
+    python -m production_model.pipeline [--force] [--force-stage train ...]
 """
 
-from .scraper import fetch_latest_data
-from .preprocess import download_training_data, clean_dataset
-from .trainer import train_model
+import argparse
+import time
+
+from .scraper import dump_fingerprint, fetch_latest_data
+from .preprocess import download_training_data, clean_dataset, training_data_fingerprint
+from .stages import Pipeline, Stage
+from . import cities, compiled_model, feature_store, trainer, weather_store
+from .trainer import train_model, upload_artifacts
+
+TRAINING_CSV = "flooded_roads_phase1.csv"
 
-def run_pipeline():
+
+def build_pipeline(filename=TRAINING_CSV, cache_dir=None):
+    return Pipeline([
+        # Fingerprinted by the dump it parses, so new tweets invalidate clean/train
+        Stage("scrape", fetch_latest_data, source=dump_fingerprint, cache=False),
+        Stage("download", download_training_data, params={"filename": filename},
+              source=lambda: training_data_fingerprint(filename), cache=False),
+        # Training data = the remote CSV plus the records scraped from the tweet dump
+        Stage("clean", clean_dataset, deps=["download", "scrape"]),
+        # Worker count changes speed, not the result, so it is not a parameter.
+        # Training joins the hourly weather (feature_store.attach_features),
+        # so the weather files and the code reading them are part of it.
+        Stage("train", train_model, deps=["clean"],
+              params={"folds": trainer.CV_FOLDS, "budget": trainer.TRAIN_BUDGET},
+              source=feature_store.weather_fingerprint,
+              modules=[feature_store, weather_store, cities, compiled_model]),
+        Stage("upload", upload_artifacts, deps=["train"]),
+    ], cache_dir=cache_dir)
+
+
+def run_pipeline(force=False):
     print("[pipeline] Starting flood prediction training pipeline...")
-    fetch_latest_data()
-    df = download_training_data("flooded_roads_phase1.csv")
-    df_clean = clean_dataset(df)
-    train_model(df_clean)
+    started = time.perf_counter()
+    outputs, report = build_pipeline().run(targets=["scrape", "train", "upload"], force=force)
+    result = outputs["train"]
     print("[pipeline] ✅ Pipeline completed successfully.")
+    return {
+        "model": result["model"],
+        "auc": result["auc"],
+        "retrained": report["train"]["status"] == "ran",
+        "stages": report,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the flood model training pipeline.")
+    parser.add_argument("--force", action="store_true", help="rebuild every stage")
+    parser.add_argument("--force-stage", nargs="+", default=[], metavar="STAGE",
+                        help="rebuild these stages and everything downstream")
+    args = parser.parse_args()
+    run_pipeline(force=True if args.force else args.force_stage)
+
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# production_model/prediction_cache.py
+"""
+prediction_cache.py
+-------------------
+Bounded LRU + TTL cache of flood probabilities, shared by /predict in the
+AI microservice and the Django backend.
+
+Nearby points under the same weather produce (almost) the same feature
+vector, so the key is the vector rounded per feature. Only the key is
+rounded: a miss scores the request's own vector, so it gets the same
+answer as /predict/batch, and a hit returns the answer for a vector within
+one rounding step of it.
+
+The cache remembers which model object filled it and clears itself the
+first time it sees a different one, so reloads and retrains invalidate
+it without any extra wiring.
+
+Configuration (environment variables):
+  PREDICT_CACHE_SIZE      max entries (default 10000, 0 disables)
+  PREDICT_CACHE_TTL       seconds an entry stays valid (default 300)
+  PREDICT_CACHE_ROUNDING  per-feature decimals overriding the defaults,
+                          e.g. "rain1h=2,main.temp=0"
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .feature_store import FEATURE_COLUMNS
+from .metrics import span
+
+# Decimals kept per feature: about the precision of the weather feed
+DEFAULT_ROUNDING = {
+    "main.temp": 1,
+    "main.humidity": 0,
+    "main.pressure": 0,
+    "rain1h": 1,
+    "wind.speed": 1,
+    "hour": 0,
+    "day_of_week": 0,
+    "month": 0,
+    "is_weekend": 0,
+    "rain_3h": 1,
+    "rain_6h": 1,
+    "rain_24h": 1,
+    "pressure_tendency_3h": 1,
+    "humidity_trend_3h": 0,
+}
+
+
+def parse_rounding(spec):
+    """{feature: decimals} from "name=decimals,..."; raises ValueError on bad input."""
+    rounding = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, decimals = item.partition("=")
+        if name.strip() not in FEATURE_COLUMNS:
+            raise ValueError(f"unknown feature in PREDICT_CACHE_ROUNDING: {name.strip()!r}")
+        rounding[name.strip()] = int(decimals)
+    return rounding
+
+
+class PredictionCache:
+    def __init__(self, maxsize=None, ttl=None, rounding=None, columns=FEATURE_COLUMNS):
+        self.maxsize = int(os.getenv("PREDICT_CACHE_SIZE", "10000")) if maxsize is None else maxsize
+        self.ttl = float(os.getenv("PREDICT_CACHE_TTL", "300")) if ttl is None else ttl
+        if rounding is None:
+            rounding = parse_rounding(os.getenv("PREDICT_CACHE_ROUNDING", ""))
+        rounding = {**DEFAULT_ROUNDING, **rounding}
+        self.columns = list(columns)
+        self.decimals = np.array([rounding.get(c, 3) for c in self.columns])
+        self.scale = 10.0 ** self.decimals
+
+        self._entries = OrderedDict()  # key -> (probability, expires_at)
+        self._model = None
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def quantize(self, row):
+        """Rounded copy of one feature row."""
+        return np.round(np.asarray(row, dtype=np.float64) * self.scale) / self.scale
+
+    def key(self, quantized):
+        # Integer grid coordinates make -0.0 / 0.0 and float noise hash the same
+        return np.rint(quantized * self.scale).astype(np.int64).tobytes()
+
+    def _check_model(self, model):
+        """Drop every entry if `model` is not the one that filled the cache."""
+        if model is not self._model:
+            if self._entries:
+                self.counters["invalidations"] += 1
+            self._entries.clear()
+            self._model = model
+
+    def lookup(self, model, row):
+        """
+        (probability or None, key, row as float64). On a miss, score the
+        returned row and hand the result to `store`.
+        """
+        row = np.asarray(row, dtype=np.float64)
+        if self.maxsize <= 0:
+            return None, None, row
+        key = self.key(self.quantize(row))
+        now = time.monotonic()
+        with self._lock:
+            self._check_model(model)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return entry[0], key, row
+                del self._entries[key]
+                self.counters["expirations"] += 1
+            self.counters["misses"] += 1
+        return None, key, row
+
+    def store(self, model, key, prob):
+        with self._lock:
+            if key is None or model is not self._model:  # disabled, or a newer model was installed
+                return
+            self._entries[key] = (prob, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def predict(self, model, row):
+        """P(flood) for one feature row, from the cache when possible."""
+        prob, key, row = self.lookup(model, row)
+        if prob is None:
+            # Concurrent misses on one key both compute; the last store wins
+            with span("predict_proba"):
+                prob = float(model.predict_proba(row[None, :])[0, 1])
+            self.store(model, key, prob)
+        return prob
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._model = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return dict(
+                self.counters,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+                ttl=self.ttl,
+                hit_ratio=round(self.counters["hits"] / lookups, 4) if lookups else None,
+            )
@@ -0,0 +1,98 @@
+# production_model/prefork.py
+"""
+prefork.py
+----------
+Pre-fork serving for both services: the gunicorn master loads the model
+(and, for the Django backend, the road data) once and then forks the
+workers, which share those pages copy-on-write instead of each loading
+its own copy. See gunicorn.conf.py for the commands.
+
+- gunicorn.conf.py calls `enable()` in the master and preloads the app
+  (preload_app), so the service modules are imported there. Importing
+  them only registers work: `register(loader)` for what the master
+  loads, `worker_start(fn)` for what each worker starts after the fork.
+- when_ready -> `preload()`: runs the loaders, then gc.collect() and
+  gc.freeze(). Frozen objects are never visited by the collector again,
+  so a worker's collections do not write to (and copy) the pages that
+  hold the preloaded model.
+- post_fork -> `after_fork()`: runs the `worker_start` callbacks (the
+  services' startup hooks) in the new worker.
+
+Reload: when a retrain installs a new model in one worker, it calls
+`request_reload()`, which sends SIGHUP to the master. Gunicorn re-reads
+its config, the on_reload hook runs `preload()` again (the loaders fetch
+the new model from storage) and new workers are forked from the master
+while the old ones finish their requests and exit, so every worker ends
+up on the new model, still shared.
+
+Outside a pre-forking gunicorn master (runserver, uvicorn, tests,
+benchmarks) `worker_start` runs its callback at once, `preload` is never
+called and `request_reload` does nothing.
+"""
+
+import gc
+import os
+import signal
+import time
+
+_master_pid = None
+_loaders = []
+_worker_callbacks = []
+
+
+def enable():
+    """Mark this process as the pre-forking master (called by gunicorn.conf.py)."""
+    global _master_pid
+    _master_pid = os.getpid()
+
+
+def in_master():
+    return _master_pid == os.getpid()
+
+
+def register(loader):
+    """Run `loader()` in the master before workers fork, and again on every reload."""
+    if loader not in _loaders:
+        _loaders.append(loader)
+
+
+def worker_start(fn):
+    """Run `fn()` in each worker: now, or right after the fork when called in the master."""
+    if in_master():
+        if fn not in _worker_callbacks:
+            _worker_callbacks.append(fn)
+    else:
+        fn()
+
+
+def preload():
+    """Run the registered loaders, then freeze everything they allocated."""
+    started = time.perf_counter()
+    enable()  # gunicorn --daemon forks the master after reading its config
+    gc.unfreeze()  # on reload, let the collector reclaim what the old model left behind
+    for loader in _loaders:
+        try:
+            loader()
+        except Exception as e:
+            print("[prefork] Preload failed; workers will load it on first use:", e)
+    gc.collect()
+    gc.freeze()
+    print(f"[prefork] Preloaded {len(_loaders)} loader(s) in {time.perf_counter() - started:.2f}s; "
+          f"{gc.get_freeze_count()} objects frozen before forking.")
+
+
+def after_fork():
+    for fn in _worker_callbacks:
+        fn()
+
+
+def request_reload():
+    """
+    Ask the master to preload again and replace its workers (after a model
+    swap). Returns True if a reload was requested.
+    """
+    if _master_pid is None or in_master():
+        return False
+    print(f"[prefork] Asking master {_master_pid} to reload and re-fork workers...")
+    os.kill(_master_pid, signal.SIGHUP)
+    return True
@@ -4,39 +4,50 @@ preprocess.py
 -------------
 Downloads CSV training data from Supabase Storage ("data" bucket)
 and prepares it for training.
+
+Downloads go through the local artifact cache (artifacts.py): the CSV is
+only fetched when its remote metadata changed, and is parsed straight from
+the cached copy. The clean step also merges in the records parsed from
+the MMDA tweet dump (scraper.py), so newly scraped floods reach the model.
 """
 
-from dotenv import load_dotenv
 import os
 import pandas as pd
-from supabase import create_client
-
-# Load .env from project root (3 levels up)
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "../.env"))
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-BUCKET_NAME = "data"
+from .storage import BUCKET_NAME, get_artifacts
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+def training_data_fingerprint(filename: str):
+    """
+    Identity of the current remote CSV from the bucket listing (eTag, size,
+    updated_at), so fingerprinting does not download it. When the listing
+    is unavailable, the content hash of the copy the download stage will use.
+    """
+    artifacts = get_artifacts()
+    meta = artifacts.remote_metadata(filename)
+    if meta is not None:
+        return meta
+    return os.path.basename(artifacts.fetch(filename))
 
-def download_training_data(filename: str, local_path: str = "training_data.csv") -> pd.DataFrame:
-    print(f"[preprocess] Downloading {filename} from Supabase bucket '{BUCKET_NAME}'...")
-    res = supabase.storage.from_(BUCKET_NAME).download(filename)
-    print("[preprocess] Listing files in Supabase bucket before downloading...")
-    files = supabase.storage.from_(BUCKET_NAME).list()
-    for f in files:
-        print("  -", f["name"])
-
-    with open(local_path, "wb") as f:
-        f.write(res)
-    print("[preprocess] Download complete.")
-    df = pd.read_csv(local_path)
+def download_training_data(filename: str) -> pd.DataFrame:
+    print(f"[preprocess] Loading {filename} from Supabase bucket '{BUCKET_NAME}' (cached)...")
+    df = pd.read_csv(get_artifacts().fetch(filename))
     print(f"[preprocess] Loaded dataset with shape: {df.shape}")
     return df
 
-def clean_dataset(df: pd.DataFrame) -> pd.DataFrame:
+def add_scraped_records(df: pd.DataFrame, scraped_path) -> pd.DataFrame:
+    """Append the scraper's records (same schema as the training CSV) that df lacks."""
+    if not scraped_path or not os.path.exists(scraped_path):
+        return df
+    scraped = pd.read_csv(scraped_path).drop_duplicates()
+    # Only rows the training CSV does not have yet (it was built from the same tweets)
+    new = scraped.merge(df.drop_duplicates(), how="left", indicator=True)
+    new = new[new["_merge"] == "left_only"].drop(columns="_merge")
+    print(f"[preprocess] Added {len(new)} of {len(scraped)} scraped records from {scraped_path}")
+    return pd.concat([df, new], ignore_index=True)
+
+def clean_dataset(df: pd.DataFrame, scraped_path=None) -> pd.DataFrame:
     print("[preprocess] Cleaning dataset...")
+    df = add_scraped_records(df, scraped_path)
 
     # Normalize column names
     df.columns = [c.strip().lower() for c in df.columns]
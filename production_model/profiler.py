@@ -0,0 +1,81 @@
+# production_model/profiler.py
+"""
+profiler.py
+-----------
+Opt-in sampling profiler for single requests.
+
+When PROFILE_REQUESTS=1 and a request carries `X-Profile: 1`, the
+service samples the handling thread's stack every PROFILE_INTERVAL_MS
+while the request runs, then writes the samples in collapsed-stack format
+("frame;frame;frame count", one line per distinct stack, ready for
+flamegraph.pl / speedscope) to PROFILE_DIR. The response names the file
+in its `X-Profile` header.
+
+With PROFILE_REQUESTS unset, the only per-request cost is one header
+lookup.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+ALLOWED = os.getenv("PROFILE_REQUESTS", "0").strip().lower() in ("1", "true", "yes", "on")
+INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "2")) / 1e3
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "flood-profiles"))
+HEADER = "X-Profile"
+
+
+def requested(header_value):
+    """True if profiling is allowed and the request asked for it."""
+    return ALLOWED and bool(header_value) and header_value.strip().lower() in ("1", "true", "yes")
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id=None, interval=INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+                self.samples += 1
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+        return False
+
+    def save(self, label="request"):
+        """Write collapsed stacks to PROFILE_DIR; returns the file name."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label.strip('/').replace('/', '_') or 'root'}-" \
+               f"{uuid.uuid4().hex[:6]}.collapsed"
+        with open(os.path.join(PROFILE_DIR, name), "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return name
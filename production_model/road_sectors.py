@@ -0,0 +1,110 @@
+# production_model/road_sectors.py
+"""
+road_sectors.py
+---------------
+Maps free-text MMDA locations to the `Road_Sector` values used in
+flooded_roads_phase1.csv (ported from notebooks/road_normalization.ipynb so
+newly scraped reports are labelled the same way).
+"""
+
+import re
+
+_DIRECTIONS = re.compile(r"\b(NB|SB|EB|WB|NORTHBOUND|SOUTHBOUND|EASTBOUND|WESTBOUND)\b")
+_DESCRIPTORS = re.compile(r"SERVICE ROAD|AFTER FLYOVER|BEFORE FLYOVER|TUNNEL|INTERSECTION")
+_SPACES = re.compile(r"\s+")
+
+EDSA_SEGMENTS = {
+    "EDSA_CALOOCAN": ["MONUMENTO", "BALINTAWAK"],
+    "EDSA_QC_NORTH": ["ROOSEVELT", "NORTH AVENUE", "MUÑOZ", "MUNOZ", "DARIO", "OLIVEROS", "BAGONG BARRIO"],
+    "EDSA_QC_CENTRAL": ["QUEZON AVENUE", "CENTRIS", "CENTRAL TERMINAL"],
+    "EDSA_QC_SOUTH": ["KAMUNING", "TIMOG", "SCOUT", "MOTHER IGNACIA", "WEST AVENUE", "MAIN AVENUE",
+                      "WHITEPLAINS", "P. TUAZON"],
+    "EDSA_QC_BOUNDARY": ["AURORA", "SANTOLAN", "AGUINALDO", "LIBERTY"],
+    "EDSA_SAN_JUAN": ["SAN JUAN"],
+    "EDSA_MANDALUYONG": ["ORTIGAS", "SHAW", "MEGAMALL", "BONI", "WACK WACK"],
+    "EDSA_MAKATI": ["AYALA", "BUENDIA", "MAGALLANES", "GUADALUPE"],
+    "EDSA_PASAY": ["TAFT", "ROXAS", "TRAMO", "MALL OF ASIA", "MOA"],
+}
+
+C5_SEGMENTS = {
+    "C5_NORTH": ["NLEX", "HARBOR", "KARUHATAN", "VALENZUELA"],
+    "C5_CONGRESSIONAL": ["CONGRESSIONAL", "BAHAY TORO", "CULIAT", "PASONG TAMO"],
+    "C5_LUZON": ["LUZON", "COMMONWEALTH", "FLYOVER"],
+    "C5_TANDANG_SORA": ["TANDANG SORA", "U.P.", "DILIMAN"],
+    "C5_KATIPUNAN": ["KATIPUNAN", "LOYOLA", "MIRIAM", "ATENEO", "PROJECT 4", "PANSOL"],
+    "C5_BONNY_SERRANO": ["BONNY", "SERRANO", "LIBIS", "TUNNEL"],
+    "C5_E_RODRIGUEZ": ["E. RODRIGUEZ", "EULOGIO"],
+    "C5_GARCIA": ["CARLOS GARCIA", "C.P. GARCIA", "BGC", "TAGUIG"],
+    "C5_EXTENSION": ["EXTENSION", "SLEX", "NAIA", "AIRPORT", "PARAÑAQUE", "LAS PIÑAS"],
+}
+
+# (keywords, sector[, only in city]), checked in order; the first match wins
+ROAD_RULES = [
+    (["ELLIPTICAL"], "EAST AVENUE"),
+    (["C3", "CONNECTOR"], "C3 ROAD"),
+    (["N.S AMORANTO", "NS AMORANTO"], "N.S. AMORANTO AVENUE"),
+    (["ESPANA", "ESPAÑA"], "ESPAÑA BOULEVARD"),
+    (["TAFT", "QUIRINO STATION"], "TAFT AVENUE"),
+    (["DR. A. SANTOS", "A. SANTOS", "SM SUCAT"], "DR. SANTOS AVENUE", "Parañaque City"),
+    (["JOSE ABAD SANTOS", "JAS"], "ABAD SANTOS AVENUE"),
+    (["COMMONWEALTH"], "COMMONWEALTH AVENUE"),
+    (["ARANETA"], "ARANETA AVENUE"),
+    (["MC ARTHUR", "MCARTHUR"], "MACARTHUR HIGHWAY"),
+    (["ROXAS"], "ROXAS BOULEVARD"),
+    (["QUIRINO AVE"], "QUIRINO AVENUE"),
+    (["RIZAL AVE"], "RIZAL AVENUE"),
+    (["PEDRO GIL"], "PEDRO GIL Street"),
+    (["QUEZON AVE"], "QUEZON AVENUE"),
+    (["BONIFACIO AVE"], "ANDRES BONIFACIO AVENUE"),
+    (["RECTO"], "RECTO AVENUE"),
+    (["SAMSON ROAD"], "SAMSON ROAD"),
+    (["DEL PILAR"], "DEL PILAR STREET"),
+    (["DON BASILIO BAUTISTA"], "DON BASILIO BAUTISTA BOULEVARD"),
+    (["ANDREW"], "ANDREWS AVENUE"),
+    (["GOV. PASCUAL"], "GOVERNOR PASCUAL AVENUE"),
+    (["OSMENIA", "OSMEÑA"], "OSMEÑA HIGHWAY"),
+    (["PADRE FAURA"], "PADRE FAURA STREET"),
+    (["MIA"], "MIA Road"),
+    (["ZAPOTE"], "ALABANG-ZAPOTE ROAD"),
+    (["MAGALLANES"], "MAGALLANES INTERCHANGE"),
+    (["PALANCA"], "CARLOS PALANCA STREET"),
+    (["PNU TO AYALA", "AYALA BLVD"], "AYALA BOULEVARD"),
+    (["UN. AVE"], "UN AVENUE"),
+]
+
+# Landmark-only locations that cannot be pinned to a road
+UNMAPPED = ["IN FRONT", "GATE", "BRGY", "CITY HALL"]
+
+
+def normalize_location(text):
+    """Standardize a location string before matching."""
+    text = _DIRECTIONS.sub("", text.upper())
+    text = text.replace("AVE.", "AVENUE").replace("AVE", "AVENUE")
+    text = text.replace("EXT.", "EXTENSION").replace("RD.", "ROAD").replace("RD", "ROAD")
+    text = _DESCRIPTORS.sub("", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def _first_segment(loc, segments, default):
+    for segment, keywords in segments.items():
+        if any(kw in loc for kw in keywords):
+            return segment
+    return default
+
+
+def map_road_segment(location, city):
+    """Road_Sector for a location, or None for landmark-only locations."""
+    loc = normalize_location(location)
+    if "EDSA" in loc:
+        return _first_segment(loc, EDSA_SEGMENTS, "EDSA_GENERAL")
+    if "C5" in loc or "KATIPUNAN" in loc:
+        return _first_segment(loc, C5_SEGMENTS, "C5_GENERAL")
+
+    for keywords, sector, *only_city in ROAD_RULES:
+        if only_city and city != only_city[0]:
+            continue
+        if any(kw in loc for kw in keywords):
+            return sector
+    if any(kw in loc for kw in UNMAPPED):
+        return None
+    return loc
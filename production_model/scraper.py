@@ -2,8 +2,407 @@
 """
 scraper.py
 -----------
-Fetch latest flood/weather data. Currently optional.
+Incremental parser for the MMDA flood tweet dump
+(data/raw/flooded-roads/mmda_flooded_roads.txt, tweets separated by
+`===TWEET===`).
+
+- The dump is streamed line by line, one tweet at a time, so memory stays
+  constant however large it grows.
+- All patterns are compiled once at import.
+- A high-water mark (byte offset + fingerprints of the bytes before it, and
+  the newest tweet time seen) is stored next to the output, so a rerun only
+  parses what was appended. If the dump was rewritten instead (e.g. newer
+  tweets prepended), it is rescanned and only tweets newer than the mark
+  are emitted.
+- Records are appended in the flooded_roads_phase1.csv schema; the
+  training pipeline merges them into the training data (see pipeline.py).
+
+Usage:
+    python -m production_model.scraper [--full]
 """
 
-def fetch_latest_data():
-    print("[scraper] Skipping scraping step (data pulled from Supabase manually).")
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+from .cities import CITIES, canonical_city
+from .road_sectors import map_road_segment
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+RAW_DUMP = os.path.join(ROOT_DIR, "data", "raw", "flooded-roads", "mmda_flooded_roads.txt")
+OUTPUT_CSV = os.path.join(ROOT_DIR, "data", "interim", "mmda_scraped_roads.csv")
+
+OUTPUT_COLUMNS = ["City", "Location", "Flood Type/Depth", "Passability", "datetime", "Road_Sector"]
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+DELIMITER = b"===TWEET==="
+FINGERPRINT_BYTES = 4096
+# Year-less tweets held back until a tweet with an explicit year is seen
+PENDING_LIMIT = 100
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+
+# -------------------------------
+# Patterns
+# -------------------------------
+_CLOCK = r"(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m\b\.?"
+TWEET_TIME_RE = re.compile(r"(?:as of|time:[\s:]*)\s*" + _CLOCK, re.I)
+NUMERIC_DATE_RE = re.compile(r"\b(\d{2})-(\d{2})-(\d{4})\b")
+NAMED_DATE_RE = re.compile(r"\b(" + "|".join(MONTHS) + r")\.?\s+(\d{1,2})\b(?:,?\s*(\d{4}))?", re.I)
+INTRO_CITY_RE = re.compile(r"\bareas? in ([A-ZÑ][\w .ñÑ]*? City)\b")
+
+BULLET_RE = re.compile(r"^[-•*]\s*")
+CITY_PREFIX_RE = re.compile(r"^([^\W\d][^:\-–]*?)\s*(?::|\s[-–])\s*(.*)$")
+LINE_TIME_RE = re.compile(r"^(?:as of\s+)?" + _CLOCK + r"\s*[-–]\s*", re.I)
+SUBSIDED_RE = re.compile(r"^subsided\b(?:\s+as of\s+" + _CLOCK + r")?\s*[-–:]?\s*([^:]*)", re.I)
+DEPTH_RE = re.compile(
+    r"\b(?:(?:above|half|haft)[- ]+)?(?:(?:gutter|knee|tire|waist)[- ]+(?:to[- ]+)?)?"
+    r"(?:gutter|knee|tire|waist|chest)[- ]+deep\b"
+    r"|\b\d+(?:\.\d+)?\s*(?:feet|ft)\.?\s*deep\b",
+    re.I,
+)
+PASSABILITY_RE = re.compile(r"\b(not\s+)?passable\s+to\s+(all|light)\b|\b(NPLV|NPATV|PATV)\b", re.I)
+TRAILING_NOTE_RE = re.compile(r"\s*\([^()]*\)\s*$")
+TRAILING_CITY_RE = re.compile(r",\s*([^,]+)$")
+SPACES_RE = re.compile(r"\s+")
+# "Dr.A.Santos" -> "Dr. A. Santos" (but keep "U.N.")
+INITIAL_RE = re.compile(r"\b([A-Z]|Dr|Gen|Gov|Pres|Sto|Sta)\.(?=[A-Z][a-z]|(?<=r\.)[A-Z])")
+ABBREVIATIONS = {"ave", "st", "sts", "blvd", "rd", "int", "ext", "hwy", "brgy", "cor", "jr", "sr"}
+
+DEPTH_WORDS = {"gutter", "knee", "tire", "waist", "chest"}
+PASSABILITY_CODES = {
+    "PATV": "Passable to all vehicles",
+    "NPLV": "Not passable to light vehicles",
+    "NPATV": "Not passable to all vehicles",
+}
+
+
+# -------------------------------
+# Field normalization
+# -------------------------------
+@lru_cache(maxsize=4096)
+def _city(name):
+    """Canonical city name if `name` is one of the Metro Manila LGUs, else None."""
+    name = name.strip(" :.-")
+    if not name or len(name) > 30:
+        return None
+    city = canonical_city(name)
+    return city if city in CITIES else None
+
+
+# Locations repeat across updates, so sector mapping is memoized
+_road_sector = lru_cache(maxsize=16384)(map_road_segment)
+
+
+def _clock(hour, minute, meridiem):
+    hour = int(hour) % 12 + (12 if meridiem.lower() == "p" else 0)
+    return hour, int(minute or 0)
+
+
+def normalize_depth(text):
+    words = [w for w in re.split(r"[\s-]+", text.lower()) if w != "to"]
+    words = ["half" if w == "haft" else w for w in words]
+    if len(words) == 3 and words[0] in DEPTH_WORDS and words[1] in DEPTH_WORDS:
+        return f"{words[0].title()}-{words[1].title()} Deep"  # e.g. Knee-Waist Deep
+    return " ".join(w.title() for w in words)
+
+
+def normalize_passability(text):
+    m = PASSABILITY_RE.search(text)
+    if m is None:
+        return "Unknown"
+    if m.group(3):
+        return PASSABILITY_CODES[m.group(3).upper()]
+    prefix = "Not passable" if m.group(1) else "Passable"
+    return f"{prefix} to {m.group(2).lower()} vehicles"
+
+
+def _strip_punctuation(text):
+    text = text.strip(" :;,-–").lstrip(".")
+    while text.endswith(".") and text[:-1].rsplit(" ", 1)[-1].lower() not in ABBREVIATIONS:
+        text = text[:-1].rstrip(" :;,-–")
+    return text
+
+
+def clean_location(text):
+    text = _strip_punctuation(INITIAL_RE.sub(r"\1. ", SPACES_RE.sub(" ", text)))
+    while True:
+        stripped = TRAILING_NOTE_RE.sub("", text)
+        m = TRAILING_CITY_RE.search(stripped)
+        if m and _city(m.group(1)):
+            stripped = stripped[:m.start()]
+        stripped = _strip_punctuation(stripped)
+        if stripped == text:
+            return text
+        text = stripped
+
+
+# -------------------------------
+# Tweet parsing
+# -------------------------------
+def explicit_year(text):
+    """Year written in the tweet's date, or None."""
+    m = NUMERIC_DATE_RE.search(text)
+    if m:
+        return int(m.group(3))
+    m = NAMED_DATE_RE.search(text)
+    return int(m.group(3)) if m and m.group(3) else None
+
+
+def tweet_date(text, default_year):
+    """(year, month, day) of the report, or None if the tweet has no date."""
+    m = NUMERIC_DATE_RE.search(text)
+    if m:
+        return int(m.group(3)), int(m.group(1)), int(m.group(2))
+    m = NAMED_DATE_RE.search(text)
+    if m:
+        year = int(m.group(3)) if m.group(3) else default_year
+        return year, MONTHS.index(m.group(1).lower()) + 1, int(m.group(2))
+    return None
+
+
+def parse_tweet(text, default_year=None):
+    """
+    Flood records in one tweet, as dicts with OUTPUT_COLUMNS keys.
+    Tweets without a recognizable date or time yield nothing.
+    """
+    if not unicodedata.is_normalized("NFKC", text):
+        text = unicodedata.normalize("NFKC", text)
+    date = tweet_date(text, default_year or datetime.now().year)
+    clock = TWEET_TIME_RE.search(text)
+    if date is None or clock is None:
+        return []
+    tweet_clock = _clock(*clock.groups())
+
+    intro = INTRO_CITY_RE.search(text)
+    city = _city(intro.group(1)) if intro else None
+
+    records = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        line_clock = tweet_clock
+        is_entry = False
+
+        m = BULLET_RE.match(line)
+        if m:
+            line, is_entry = line[m.end():], True
+        header_city = _city(line)
+        if header_city:
+            city = header_city
+            continue
+        m = CITY_PREFIX_RE.match(line)
+        if m and _city(m.group(1)):
+            city, line, is_entry = _city(m.group(1)), m.group(2), True
+            line = BULLET_RE.sub("", line)
+        m = LINE_TIME_RE.match(line)
+        if m:
+            line_clock, line, is_entry = _clock(*m.groups()), line[m.end():], True
+
+        m = SUBSIDED_RE.match(line)
+        if m:
+            if m.group(1):
+                line_clock = _clock(*m.groups()[:3])
+            location, depth, passability = clean_location(m.group(4)), "Subsided", \
+                "Passable to all vehicles"
+        elif is_entry:
+            depth_match = DEPTH_RE.search(line)
+            if depth_match is None:
+                continue
+            location = clean_location(line[:depth_match.start()])
+            depth = normalize_depth(depth_match.group())
+            passability = normalize_passability(line[depth_match.end():])
+        else:
+            continue
+        if not location or city is None:
+            continue
+
+        try:
+            when = datetime(*date, *line_clock)
+        except ValueError:
+            continue
+        records.append({
+            "City": city,
+            "Location": location,
+            "Flood Type/Depth": depth,
+            "Passability": passability,
+            "datetime": when.strftime(TIME_FORMAT),
+            "Road_Sector": _road_sector(location, city),
+        })
+    return records
+
+
+def iter_tweets(path, start=0, stop=None):
+    """
+    Yield (tweet_text, end_offset) for each tweet between byte `start` and
+    `stop` (default: end of file), reading one line at a time.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset, lines = start, []
+        for line in f:
+            if stop is not None and offset >= stop:
+                break
+            offset += len(line)
+            if line.strip() == DELIMITER:
+                tweet = b"".join(lines).strip()
+                if tweet:
+                    yield tweet.decode("utf-8", "replace"), offset - len(line)
+                lines = []
+            else:
+                lines.append(line)
+        tweet = b"".join(lines).strip()
+        if tweet:
+            yield tweet.decode("utf-8", "replace"), offset
+
+
+# -------------------------------
+# High-water mark
+# -------------------------------
+def _fingerprint(path, end):
+    """Hashes of the first and last FINGERPRINT_BYTES before `end`."""
+    with open(path, "rb") as f:
+        head = f.read(min(end, FINGERPRINT_BYTES))
+        f.seek(max(0, end - FINGERPRINT_BYTES))
+        tail = f.read(min(end, FINGERPRINT_BYTES))
+    return hashlib.sha1(head).hexdigest(), hashlib.sha1(tail).hexdigest()
+
+
+def dump_fingerprint(raw_path=RAW_DUMP):
+    """Content hash of the tweet dump (None without one); it determines what scrape() outputs."""
+    if not os.path.exists(raw_path):
+        return None
+    digest = hashlib.sha256()
+    with open(raw_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_state(state_path):
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state_path, state):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def resume_offset(path, state):
+    """Byte offset to resume from, or 0 if the dump was not just appended to."""
+    offset = state.get("offset", 0)
+    if not offset or os.path.getsize(path) < offset:
+        return 0
+    head, tail = _fingerprint(path, offset)
+    if [head, tail] != [state.get("head"), state.get("tail")]:
+        return 0
+    return offset
+
+
+# -------------------------------
+# Entry points
+# -------------------------------
+def scrape(raw_path=RAW_DUMP, output_path=OUTPUT_CSV, state_path=None, full=False):
+    """
+    Parse tweets added since the last run and append their records to
+    output_path. full=True ignores the high-water mark and rewrites the
+    output. Returns run statistics.
+    """
+    state_path = state_path or output_path + ".state.json"
+    state = {} if full else load_state(state_path)
+    start = resume_offset(raw_path, state)
+    # After a rewrite we rescan, so skip tweets at or before the newest one seen
+    newer_than = state.get("latest") if start == 0 else None
+    year = int(state["latest"][:4]) if start and state.get("latest") else None
+    if full and os.path.exists(output_path):
+        os.remove(output_path)
+
+    stats = {"resumed_from": start, "tweets": 0, "skipped_old": 0, "records": 0}
+    latest = state.get("latest")
+    size = os.path.getsize(raw_path)
+    started = time.perf_counter()
+
+    new_file = not os.path.exists(output_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "a", newline="", encoding="utf-8") as out:
+        writer = csv.DictWriter(out, fieldnames=OUTPUT_COLUMNS)
+        if new_file:
+            writer.writeheader()
+
+        def emit(text, year):
+            nonlocal latest
+            records = parse_tweet(text, year)
+            if not records:
+                return
+            tweet_time = max(r["datetime"] for r in records)
+            if newer_than and tweet_time <= newer_than:
+                stats["skipped_old"] += 1
+                return
+            writer.writerows(records)
+            stats["records"] += len(records)
+            latest = max(latest or tweet_time, tweet_time)
+
+        pending = []
+        for text, _ in iter_tweets(raw_path, start, size):
+            stats["tweets"] += 1
+            text = unicodedata.normalize("NFKC", text)
+            year = explicit_year(text) or year
+            if year is None and len(pending) < PENDING_LIMIT:
+                pending.append(text)
+                continue
+            for held in pending:
+                emit(held, year)
+            pending = []
+            emit(text, year)
+        for held in pending:
+            emit(held, datetime.now().year)
+
+    stats["seconds"] = round(time.perf_counter() - started, 4)
+    stats["tweets_per_sec"] = round(stats["tweets"] / stats["seconds"]) if stats["seconds"] else 0
+    head, tail = _fingerprint(raw_path, size)
+    save_state(state_path, {"offset": size, "head": head, "tail": tail, "latest": latest})
+    print(f"[scraper] Parsed {stats['tweets']} new tweets from byte {start} -> "
+          f"{stats['records']} records ({stats['skipped_old']} already seen), "
+          f"{stats['tweets_per_sec']} tweets/s.")
+    return stats
+
+
+def fetch_latest_data(raw_path=RAW_DUMP, output_path=OUTPUT_CSV):
+    """
+    Bring the scraped records up to date. Returns the path of the scraped
+    CSV (merged into the training data by the clean stage), or None if
+    nothing was ever scraped.
+    """
+    if not os.path.exists(raw_path):
+        print(f"[scraper] No tweet dump at {raw_path}; skipping scraping step.")
+    else:
+        scrape(raw_path, output_path)
+    return output_path if os.path.exists(output_path) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse the MMDA flood tweet dump incrementally.")
+    parser.add_argument("--raw", default=RAW_DUMP)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--full", action="store_true", help="ignore the high-water mark")
+    args = parser.parse_args()
+    scrape(args.raw, args.output, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
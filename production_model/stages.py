@@ -0,0 +1,189 @@
+# production_model/stages.py
+"""
+stages.py
+---------
+A small DAG runner for the training pipeline.
+
+Each stage has a fingerprint built from its code (the module defining it,
+plus any other modules it names), its parameters, the fingerprints of the
+stages it depends on and, for stages that read outside data, a fingerprint
+of that input. A stage whose fingerprint matches a
+cached output is not run: the cached output is loaded instead, and its
+upstream stages are not even evaluated.
+
+Cached outputs live under PIPELINE_CACHE_DIR (default
+~/.cache/flood-pipeline) as <stage>/<fingerprint>.joblib; only the latest
+output of each stage is kept.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import joblib
+
+from .metrics import span
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "flood-pipeline")
+
+
+def _module_hash(module):
+    path = getattr(module, "__file__", None)
+    if not path:
+        return module.__name__
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _code_hash(fn, modules=()):
+    """Hash of the module defining `fn` and of `modules`, so editing any invalidates the stage."""
+    module = sys.modules.get(fn.__module__)
+    own = _module_hash(module) if module is not None else fn.__qualname__
+    if not modules:
+        return own
+    return [own] + [_module_hash(m) for m in modules]
+
+
+class Stage:
+    def __init__(self, name, run, deps=(), params=None, source=None, cache=True, modules=()):
+        """
+        run:     called as run(*dep_outputs, **params)
+        source:  optional callable returning a fingerprint of outside input
+        cache:   persist the output; uncached stages run whenever needed
+        modules: other modules whose code decides the output
+        """
+        self.name = name
+        self.run = run
+        self.deps = list(deps)
+        self.params = dict(params or {})
+        self.source = source
+        self.cache = cache
+        self.modules = list(modules)
+
+
+class Pipeline:
+    def __init__(self, stages, cache_dir=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir or os.getenv("PIPELINE_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+    # -------------------------------
+    # Fingerprints
+    # -------------------------------
+    def fingerprints(self):
+        """Fingerprint of every stage, computed in dependency order."""
+        fps = {}
+
+        def visit(name):
+            if name not in fps:
+                stage = self.stages[name]
+                payload = {
+                    "stage": name,
+                    "code": _code_hash(stage.run, stage.modules),
+                    "params": stage.params,
+                    "deps": [visit(dep) for dep in stage.deps],
+                    "source": stage.source() if stage.source else None,
+                }
+                blob = json.dumps(payload, sort_keys=True, default=str).encode()
+                fps[name] = hashlib.sha256(blob).hexdigest()
+            return fps[name]
+
+        for name in self.stages:
+            visit(name)
+        return fps
+
+    def descendants(self, names):
+        found = set(names)
+        changed = True
+        while changed:
+            changed = False
+            for stage in self.stages.values():
+                if stage.name not in found and found.intersection(stage.deps):
+                    found.add(stage.name)
+                    changed = True
+        return found
+
+    # -------------------------------
+    # Cache
+    # -------------------------------
+    def _cache_path(self, name, fp):
+        return os.path.join(self.cache_dir, name, fp + ".joblib")
+
+    def _load(self, name, fp):
+        path = self._cache_path(name, fp)
+        if not os.path.exists(path):
+            return False, None
+        try:
+            return True, joblib.load(path)
+        except Exception as e:
+            print(f"[pipeline] Ignoring unreadable cache for '{name}':", e)
+            return False, None
+
+    def _store(self, name, fp, value):
+        stage_dir = os.path.join(self.cache_dir, name)
+        os.makedirs(stage_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=stage_dir, prefix=".tmp-")
+        os.close(fd)
+        try:
+            joblib.dump(value, tmp_path)
+            os.replace(tmp_path, self._cache_path(name, fp))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        for old in os.listdir(stage_dir):
+            if old.endswith(".joblib") and old != fp + ".joblib":
+                os.unlink(os.path.join(stage_dir, old))
+
+    # -------------------------------
+    # Run
+    # -------------------------------
+    def run(self, targets=None, force=False):
+        """
+        Produce the outputs of `targets` (default: every stage).
+        force: True to rebuild everything, or stage names to rebuild (their
+        downstream stages are rebuilt too).
+        Returns (outputs by stage name, report by stage name).
+        """
+        started = time.perf_counter()
+        fps = self.fingerprints()
+        fingerprint_seconds = time.perf_counter() - started
+        forced = set(self.stages) if force is True else self.descendants(force or ())
+
+        outputs = {}
+        report = {name: {"status": "skipped", "seconds": 0.0, "fingerprint": fps[name][:12]}
+                  for name in self.stages}
+
+        def resolve(name):
+            if name in outputs:
+                return outputs[name]
+            stage, fp = self.stages[name], fps[name]
+            t0 = time.perf_counter()
+            if stage.cache and name not in forced:
+                hit, value = self._load(name, fp)
+                if hit:
+                    report[name].update(status="cached", seconds=round(time.perf_counter() - t0, 4))
+                    outputs[name] = value
+                    return value
+
+            args = [resolve(dep) for dep in stage.deps]
+            t0 = time.perf_counter()
+            with span(f"pipeline.{name}"):
+                value = stage.run(*args, **stage.params)
+            report[name].update(status="ran", seconds=round(time.perf_counter() - t0, 4))
+            if stage.cache:
+                self._store(name, fp, value)
+            outputs[name] = value
+            return value
+
+        for name in targets or list(self.stages):
+            resolve(name)
+
+        total = time.perf_counter() - started
+        print(f"[pipeline] Stage summary (fingerprints took {fingerprint_seconds:.2f}s, "
+              f"total {total:.2f}s):")
+        for name, info in report.items():
+            print(f"  - {name:<10} {info['status']:<8} {info['seconds']:8.3f}s  {info['fingerprint']}")
+        return outputs, report
@@ -0,0 +1,86 @@
+# production_model/startup.py
+"""
+startup.py
+----------
+Explicit startup hook and readiness state, shared by the AI microservice
+and the Django backend.
+
+Module imports in both services are side-effect free; the expensive
+warm-up (storage client, model download, road data, weather snapshot,
+heatmap) is a list of named steps that a server runs once it has started:
+
+    startup = Startup("ai", [("model", warm_model), ("features", get_latest_features)])
+    startup.start()        # from the ASGI lifespan / wsgi.py; returns immediately
+    startup.status()       # {"ready": ..., "steps": {...}} for the /ready endpoint
+
+Steps run in order on one background thread, so the server accepts
+connections (and liveness probes pass) while it warms up. A failed step
+is reported and the remaining steps still run; the services load
+whatever is missing on first use.
+"""
+
+import threading
+import time
+
+
+class Startup:
+    def __init__(self, name, steps):
+        """
+        name:  label for log lines
+        steps: [(step name, callable)], run in order
+        """
+        self.name = name
+        self.steps = list(steps)
+        self.state = {step: "pending" for step, _ in self.steps}
+        self.seconds = {}
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, background=True):
+        """Run the steps (once per process). Returns self."""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self.run, name=f"{self.name}-startup", daemon=True)
+        if background:
+            self._thread.start()
+        else:
+            self.run()
+        return self
+
+    def run(self):
+        for step, fn in self.steps:
+            self.state[step] = "running"
+            started = time.perf_counter()
+            try:
+                fn()
+                self.state[step] = "ok"
+            except Exception as e:
+                self.state[step] = f"failed: {e}"
+                print(f"[startup] {self.name}: step '{step}' failed:", e)
+            self.seconds[step] = round(time.perf_counter() - started, 4)
+        self.finished_at = time.time()
+        self._done.set()
+        print(f"[startup] {self.name}: warm-up finished in {self.finished_at - self.started_at:.2f}s "
+              f"({', '.join(f'{s}={v}' for s, v in self.state.items())}).")
+
+    def wait(self, timeout=None):
+        """Block until the steps have run; True if they finished in time."""
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self):
+        return self._done.is_set() and all(v == "ok" for v in self.state.values())
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "steps": dict(self.state),
+            "seconds": dict(self.seconds),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
@@ -0,0 +1,90 @@
+# production_model/storage.py
+"""
+storage.py
+----------
+The process-wide Supabase client and the artifact cache on top of it,
+shared by the AI microservice, the training pipeline and the Django
+backend.
+
+Both are created on first use, not at import time: importing a module
+that needs storage does no network I/O and does not import the supabase
+package, so manage.py commands, benchmarks and worker boots only pay for
+it when something is actually fetched or uploaded.
+
+A client created here is dropped in a forked child (e.g. a gunicorn
+worker forked from a master that preloaded the model, see prefork.py), so
+processes never share its connections; clients installed with
+`configure` are kept.
+
+Configuration (environment variables, also read from the project .env):
+  SUPABASE_URL, SUPABASE_KEY   project credentials
+  ARTIFACT_CACHE_DIR           local artifact cache (see artifacts.py)
+"""
+
+import os
+import threading
+
+from dotenv import load_dotenv
+
+from .artifacts import ArtifactCache
+
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "../.env"))
+
+BUCKET_NAME = "data"
+
+_client = None
+_artifacts = None
+_owned = False  # _client was created by get_client, not installed by configure
+_lock = threading.Lock()
+
+
+def get_client():
+    """The shared Supabase client, created on the first call."""
+    global _client, _owned
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from supabase import create_client
+
+                print("[storage] Creating Supabase client...")
+                _client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+                _owned = True
+    return _client
+
+
+def get_storage():
+    return get_client().storage
+
+
+def get_artifacts():
+    """The shared ArtifactCache over the "data" bucket."""
+    global _artifacts
+    if _artifacts is None:
+        storage = get_storage()
+        with _lock:
+            if _artifacts is None:
+                _artifacts = ArtifactCache(storage, BUCKET_NAME)
+    return _artifacts
+
+
+def configure(client=None, artifacts=None):
+    """Install a client and/or artifact cache (e.g. in-memory fakes for benchmarks)."""
+    global _client, _artifacts, _owned
+    with _lock:
+        if client is not None:
+            _client = client
+            _artifacts = None
+            _owned = False
+        if artifacts is not None:
+            _artifacts = artifacts
+
+
+def _after_fork_in_child():
+    global _client, _artifacts, _owned, _lock
+    _lock = threading.Lock()
+    if _owned:
+        _client = _artifacts = None
+        _owned = False
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,121 @@
+# production_model/temporal_join.py
+"""
+temporal_join.py
+----------------
+Attaches to every flood report the most recent weather observation for the
+same city, taken at or before the report and no older than `tolerance`
+(a sorted as-of merge instead of an exact City/date/hour equi-join).
+
+Reports are processed in time-ordered chunks. For each chunk only the
+weather in [chunk start - tolerance, chunk end] is loaded, either sliced
+from an in-memory frame or read from the partitioned weather store with
+predicate pushdown, so memory stays bounded however many years of
+observations exist.
+"""
+
+import pandas as pd
+
+from .cities import canonical_city
+from . import weather_store
+
+LOCAL_TZ = "Asia/Manila"
+TIME_DTYPE = f"datetime64[ns, {LOCAL_TZ}]"
+
+
+def _as_local_time(values):
+    times = pd.to_datetime(values, errors="coerce")
+    if getattr(times.dt, "tz", None) is None:
+        times = times.dt.tz_localize(LOCAL_TZ)
+    return times.dt.tz_convert(LOCAL_TZ).astype(TIME_DTYPE)
+
+
+def _prepare_weather(weather, city_col):
+    weather = weather.rename(columns={city_col: "_city"}) if city_col != "_city" else weather
+    weather = weather.assign(
+        _city=weather["_city"].astype(str).map(canonical_city),
+        _weather_time=_as_local_time(weather["datetime"]),
+    ).drop(columns=["datetime"])
+    return weather.sort_values("_weather_time", kind="stable")
+
+
+def asof_join_weather(floods, weather=None, tolerance="2h", chunk_size=50_000,
+                      flood_city_col="City", flood_time_col="datetime",
+                      weather_city_col="city", store_dir=weather_store.STORE_DIR,
+                      keep_unmatched=False):
+    """
+    Join flood reports to the nearest preceding weather reading per city.
+
+    weather: DataFrame with `datetime` and `weather_city_col` columns, or
+             None to read from the weather store chunk by chunk.
+    Returns (merged DataFrame, stats dict). The weather timestamp used is
+    kept as `weather_datetime`; unmatched reports are dropped unless
+    keep_unmatched=True.
+    """
+    tolerance = pd.Timedelta(tolerance)
+    floods = floods.assign(
+        _city=floods[flood_city_col].map(canonical_city),
+        _flood_time=_as_local_time(floods[flood_time_col]),
+    )
+    invalid = floods["_flood_time"].isna()
+    timed = floods[~invalid].sort_values("_flood_time", kind="stable")
+
+    if weather is not None:
+        weather = _prepare_weather(weather, weather_city_col)
+        weather_times = weather["_weather_time"]
+
+    merged_chunks = []
+    for start in range(0, len(timed), chunk_size):
+        chunk = timed.iloc[start:start + chunk_size]
+        lo = chunk["_flood_time"].iloc[0] - tolerance
+        hi = chunk["_flood_time"].iloc[-1]
+
+        if weather is not None:
+            i = weather_times.searchsorted(lo, side="left")
+            j = weather_times.searchsorted(hi, side="right")
+            window = weather.iloc[i:j]
+            window = window[window["_city"].isin(chunk["_city"].unique())]
+        else:
+            window = weather_store.read_weather(
+                store_dir, cities=list(chunk["_city"].dropna().unique()),
+                start=lo, end=hi + pd.Timedelta(microseconds=1),
+            )
+            if len(window):
+                window = _prepare_weather(window.drop(columns="month"), "city")
+            else:
+                window = pd.DataFrame({"_city": pd.Series(dtype=object),
+                                       "_weather_time": pd.Series(dtype=TIME_DTYPE)})
+
+        window = window.assign(weather_datetime=window["_weather_time"])
+        overlap = [c for c in window.columns if c in chunk.columns and c != "_city"]
+        merged_chunks.append(pd.merge_asof(
+            chunk, window.drop(columns=overlap),
+            left_on="_flood_time", right_on="_weather_time", by="_city",
+            tolerance=tolerance, direction="backward", allow_exact_matches=True,
+        ))
+
+    columns = list(floods.columns)
+    merged = pd.concat(merged_chunks, ignore_index=True) if merged_chunks else floods.iloc[0:0]
+    matched_mask = merged["weather_datetime"].notna() if "weather_datetime" in merged else \
+        pd.Series(False, index=merged.index)
+
+    stats = {
+        "total": len(floods),
+        "matched": int(matched_mask.sum()),
+        "dropped_no_weather": int((~matched_mask).sum()),
+        "dropped_bad_time": int(invalid.sum()),
+    }
+    stats["dropped"] = stats["total"] - stats["matched"]
+    stats["match_rate"] = round(stats["matched"] / stats["total"], 4) if stats["total"] else 0.0
+    print(f"[temporal_join] matched {stats['matched']}/{stats['total']} reports "
+          f"(dropped {stats['dropped_no_weather']} without weather within {tolerance}, "
+          f"{stats['dropped_bad_time']} with unparseable times)")
+
+    if not keep_unmatched:
+        merged = merged[matched_mask]
+    elif stats["dropped_bad_time"]:
+        merged = pd.concat([merged, floods[invalid]], ignore_index=True)
+
+    helper = [c for c in ("_city", "_flood_time", "_weather_time") if c in merged.columns]
+    merged = merged.drop(columns=helper).reset_index(drop=True)
+    extra = [c for c in merged.columns if c not in columns]
+    return merged[[c for c in columns if not c.startswith("_")] + extra], stats
@@ -2,38 +2,179 @@
 """
 trainer.py
 -----------
-Trains a flood prediction model using preprocessed data,
-then saves the best model as:
-  - best_flood_model.pkl
-  - flood_model_scaler.pkl
-  - weather_main_encoder.pkl
-  - weather_desc_encoder.pkl
-Uploads all artifacts to Supabase Storage.
+Trains a flood prediction model using preprocessed data. Features
+(feature_store.FEATURE_COLUMNS) are built by the same code serving uses.
+
+Candidates are scored with stratified k-fold CV. Every (candidate, fold)
+fit, plus each candidate's final fit on all rows, is an independent task
+on a process pool, so folds and candidates train in parallel. With a
+wall-clock budget, unfinished tasks are cancelled when it runs out and the
+best candidate whose folds and final fit all finished wins.
+
+`upload_artifacts` then saves and uploads to Supabase Storage:
+  - best_flood_model.pkl (scaling, where a candidate needs it, is a step
+    of its sklearn pipeline, so there is no separate scaler artifact)
+  - best_flood_model_compiled.npz (tree ensembles only, see compiled_model.py)
 """
 
-from dotenv import load_dotenv
+import multiprocessing
 import os
-import joblib
+import queue
+import tempfile
+import time
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import roc_auc_score, classification_report
-from supabase import create_client
 
-# Load .env (3 levels up from this file)
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "../.env"))
+from .compiled_model import compile_model
+from .feature_store import (
+    BASE_FEATURES, FEATURE_COLUMNS, ROLLING_FEATURES, STORE_FEATURES, TIME_FEATURES,
+    attach_features, time_features,
+)
+from .storage import BUCKET_NAME, get_storage
+
+# sklearn and joblib are imported inside the functions that use them: they
+# take seconds to import and only training needs them
+
+CV_FOLDS = int(os.getenv("TRAIN_CV_FOLDS", "5"))
+TRAIN_WORKERS = int(os.getenv("TRAIN_WORKERS", "0")) or os.cpu_count() or 1
+# Wall-clock budget for candidate search in seconds (0 = unlimited)
+TRAIN_BUDGET = float(os.getenv("TRAIN_BUDGET_SECONDS", "0")) or None
+# "spawn" is safe from the services' background threads; "fork" starts faster
+MP_START_METHOD = os.getenv("TRAIN_MP_START", "spawn")
+RANDOM_STATE = 42
+
+
+def make_candidates():
+    """Candidate models, cheapest first so something finishes under a tight budget."""
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return {
+        # Scaling lives inside the pipeline so each fold fits its own scaler
+        "LogisticRegression": make_pipeline(
+            StandardScaler(), LogisticRegression(max_iter=1000, class_weight="balanced")
+        ),
+        "RandomForest": RandomForestClassifier(
+            n_estimators=100, random_state=RANDOM_STATE, class_weight="balanced", n_jobs=1
+        ),
+        "GradientBoosting": GradientBoostingClassifier(random_state=RANDOM_STATE),
+    }
+
+
+# -------------------------------
+# Fit tasks (run in pool workers)
+# -------------------------------
+_X = _y = None
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _fit_task(name, fold, n_folds):
+    """
+    Fit one candidate on one CV fold (returns its validation AUC) or, with
+    fold=None, on all rows (returns the fitted model).
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import StratifiedKFold
+
+    start = time.perf_counter()
+    model = clone(make_candidates()[name])
+    if fold is None:
+        model.fit(_X, _y)
+        return name, fold, model, time.perf_counter() - start
+
+    splits = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE)
+    train_idx, val_idx = list(splits.split(_X, _y))[fold]
+    model.fit(_X[train_idx], _y[train_idx])
+    auc = roc_auc_score(_y[val_idx], model.predict_proba(_X[val_idx])[:, -1])
+    return name, fold, auc, time.perf_counter() - start
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-BUCKET_NAME = "data"
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+def _run_tasks(tasks, X, y, workers, deadline):
+    """Yield task results as they finish until all are done or the deadline passes."""
+    if workers <= 1:
+        _init_worker(X, y)
+        try:
+            for task in tasks:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                try:
+                    yield _fit_task(*task)
+                except Exception as e:
+                    yield task[0], task[1], e, 0.0
+        finally:
+            _init_worker(None, None)
+        return
 
+    done = queue.Queue()
+    pool = multiprocessing.get_context(MP_START_METHOD).Pool(
+        workers, initializer=_init_worker, initargs=(X, y)
+    )
+    try:
+        for task in tasks:
+            pool.apply_async(_fit_task, task, callback=done.put,
+                             error_callback=lambda e, task=task: done.put((task[0], task[1], e, 0.0)))
+        for _ in tasks:
+            timeout = None if deadline is None else deadline - time.perf_counter()
+            if timeout is not None and timeout <= 0:
+                return
+            try:
+                yield done.get(timeout=timeout)
+            except queue.Empty:
+                return
+    finally:
+        # Cancels whatever is still queued or running once the budget is spent
+        pool.terminate()
+        pool.join()
+
+
+def evaluate_candidates(X, y, folds=CV_FOLDS, workers=TRAIN_WORKERS, budget=TRAIN_BUDGET):
+    """
+    Cross-validate and fit every candidate. Returns {name: summary}, where
+    finished candidates have status "finished", a mean/std AUC and the model
+    fitted on all rows; others are "failed" or "cancelled".
+    """
+    X, y = np.ascontiguousarray(X, dtype=np.float64), np.asarray(y)
+    folds = max(2, min(folds, int(np.bincount(y).min())))
+    names = list(make_candidates())
+    tasks = [(name, fold, folds) for name in names for fold in [*range(folds), None]]
+
+    results = {name: {"status": "cancelled", "fold_aucs": [], "model": None, "cpu_seconds": 0.0}
+               for name in names}
+    started = time.perf_counter()
+    deadline = started + budget if budget else None
+    for name, fold, value, seconds in _run_tasks(tasks, X, y, min(workers, len(tasks)), deadline):
+        summary = results[name]
+        summary["cpu_seconds"] += seconds
+        if isinstance(value, Exception):
+            summary["status"], summary["error"] = "failed", str(value)
+        elif fold is None:
+            summary["model"] = value
+        else:
+            summary["fold_aucs"].append(value)
 
-def train_model(df: pd.DataFrame):
+    for name, summary in results.items():
+        if summary["status"] == "cancelled" and summary["model"] is not None \
+                and len(summary["fold_aucs"]) == folds:
+            summary["status"] = "finished"
+            summary["auc"] = float(np.mean(summary["fold_aucs"]))
+            summary["auc_std"] = float(np.std(summary["fold_aucs"]))
+        print(f"[trainer] {name}: {summary['status']}"
+              + (f", CV AUC={summary['auc']:.4f} ± {summary['auc_std']:.4f}"
+                 if summary["status"] == "finished" else "")
+              + f" ({len(summary['fold_aucs'])}/{folds} folds)")
+    print(f"[trainer] Candidate search took {time.perf_counter() - started:.2f}s "
+          f"with {min(workers, len(tasks))} worker(s).")
+    return results
+
+
+def train_model(df: pd.DataFrame, folds=CV_FOLDS, workers=TRAIN_WORKERS, budget=TRAIN_BUDGET):
     print("[trainer] Starting model training...")
 
     # 🧭 Check class distribution
@@ -49,108 +190,76 @@ def train_model(df: pd.DataFrame):
         df = pd.concat([df, df_dummy], ignore_index=True)
         print(f"[trainer] Dataset now has class distribution:\n{df['is_flooded'].value_counts()}")
 
-    # 🧩 Feature Engineering
-    df["hour"] = df["datetime"].dt.hour
-    df["day_of_week"] = df["datetime"].dt.dayofweek
-    df["month"] = df["datetime"].dt.month
-    df["is_weekend"] = (df["day_of_week"] >= 5).astype(int)
+    # 🧩 Feature Engineering (same code as serving, see feature_store.py)
+    if "city" in df.columns and not set(STORE_FEATURES) <= set(df.columns):
+        df = attach_features(df)
+    df[TIME_FEATURES] = time_features(df["datetime"])
 
     # Ensure columns exist
-    for col in ["main.temp", "main.humidity", "main.pressure", "rain1h", "wind.speed"]:
+    for col in BASE_FEATURES:
         if col not in df.columns:
             df[col] = np.random.uniform(20, 30, size=len(df))  # mock if missing
-
-    # Handle weather categorical fields
-    for col in ["weather.main", "weather.description"]:
+    for col in ROLLING_FEATURES:
         if col not in df.columns:
-            df[col] = "Unknown"
-        df[col] = df[col].fillna("Unknown")
-
-    le_weather_main = LabelEncoder()
-    le_weather_desc = LabelEncoder()
-    df["weather_main_encoded"] = le_weather_main.fit_transform(df["weather.main"])
-    df["weather_desc_encoded"] = le_weather_desc.fit_transform(df["weather.description"])
-
-    feature_cols = [
-        "main.temp",
-        "main.humidity",
-        "main.pressure",
-        "rain1h",
-        "wind.speed",
-        "hour",
-        "day_of_week",
-        "month",
-        "is_weekend",
-        "weather_main_encoded",
-        "weather_desc_encoded",
-    ]
+            df[col] = 0.0
+
+    feature_cols = FEATURE_COLUMNS
 
     X = df[feature_cols].fillna(0)
     y = df["is_flooded"]
 
-    # 🔀 Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    # 🤖 Cross-validate candidates in parallel; the best finished one wins
+    results = evaluate_candidates(X.to_numpy(), y.to_numpy(), folds=folds, workers=workers,
+                                  budget=budget)
+    finished = {name: r for name, r in results.items() if r["status"] == "finished"}
+    if not finished:
+        raise RuntimeError("no candidate model finished within the training budget")
+    best_name = max(finished, key=lambda name: finished[name]["auc"])
+    best_model, best_auc = finished[best_name]["model"], finished[best_name]["auc"]
 
-    # ⚖️ Scale for LR
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-
-    # 🤖 Models
-    models = {
-        "RandomForest": RandomForestClassifier(
-            n_estimators=100, random_state=42, class_weight="balanced"
-        ),
-        "GradientBoosting": GradientBoostingClassifier(random_state=42),
-        "LogisticRegression": LogisticRegression(
-            max_iter=1000, class_weight="balanced"
-        ),
+    print(f"[trainer] ✅ Best model: {best_name} (CV AUC={best_auc:.4f})")
+    return {
+        "model": best_model,
+        "auc": best_auc,
+        "name": best_name,
+        "candidates": {name: {k: v for k, v in r.items() if k != "model"}
+                       for name, r in results.items()},
+        "artifacts": {
+            "best_flood_model.pkl": best_model,
+        },
     }
 
-    best_model, best_auc, best_name = None, 0, ""
 
-    for name, model in models.items():
-        if name == "LogisticRegression":
-            model.fit(X_train_scaled, y_train)
-            y_pred = model.predict(X_test_scaled)
-            y_proba_raw = model.predict_proba(X_test_scaled)
-        else:
-            model.fit(X_train, y_train)
-            y_pred = model.predict(X_test)
-            y_proba_raw = model.predict_proba(X_test)
-
-        y_proba = y_proba_raw[:, -1]  # safe extraction
-        auc = roc_auc_score(y_test, y_proba)
-        print(f"[trainer] {name}: AUC={auc:.4f}")
-        print(classification_report(y_test, y_pred))
-
-        if auc > best_auc:
-            best_model, best_auc, best_name = model, auc, name
-
-    print(f"[trainer] ✅ Best model: {best_name} (AUC={best_auc:.4f})")
-
-    # 💾 Save artifacts
-    joblib.dump(best_model, "best_flood_model.pkl")
-    joblib.dump(scaler, "flood_model_scaler.pkl")
-    joblib.dump(le_weather_main, "weather_main_encoder.pkl")
-    joblib.dump(le_weather_desc, "weather_desc_encoder.pkl")
-
-    print("[trainer] Saved model artifacts locally.")
-
-    # ☁️ Upload all artifacts to Supabase
-    for file_name in [
-        "best_flood_model.pkl",
-        "flood_model_scaler.pkl",
-        "weather_main_encoder.pkl",
-        "weather_desc_encoder.pkl",
-    ]:
-        with open(file_name, "rb") as f:
-            supabase.storage.from_(BUCKET_NAME).upload(
-                file_name, f, file_options={"upsert": "true"}  # <- string fix
-            )
-        print(f"[trainer] Uploaded '{file_name}' to Supabase bucket '{BUCKET_NAME}'.")
+def upload_artifacts(result):
+    """Save the artifacts of a `train_model` result and upload them to Supabase."""
+    import joblib
+
+    uploaded = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        paths = []
+        for file_name, obj in result["artifacts"].items():
+            path = os.path.join(out_dir, file_name)
+            joblib.dump(obj, path)
+            paths.append(path)
+
+        # 🌲 Flat-array export of tree ensembles for low-latency serving
+        compiled = compile_model(result["model"])
+        if compiled is not None:
+            path = os.path.join(out_dir, "best_flood_model_compiled.npz")
+            compiled.save(path)
+            paths.append(path)
+
+        print("[trainer] Saved model artifacts locally.")
+
+        # ☁️ Upload all artifacts to Supabase
+        for path in paths:
+            file_name = os.path.basename(path)
+            with open(path, "rb") as f:
+                get_storage().from_(BUCKET_NAME).upload(
+                    file_name, f, file_options={"upsert": "true"}  # <- string fix
+                )
+            uploaded.append(file_name)
+            print(f"[trainer] Uploaded '{file_name}' to Supabase bucket '{BUCKET_NAME}'.")
 
     print("[trainer] ✅ All artifacts uploaded successfully.")
-    return best_model, best_auc
+    return uploaded
@@ -0,0 +1,194 @@
+# production_model/weather_store.py
+"""
+weather_store.py
+----------------
+Converts the monthly raw weather CSVs (data/raw/weather-monthly/YYYYMM.csv)
+into a Parquet store partitioned by month and city:
+
+  data/processed/weather/month=202501/city=Quezon City/part-0.parquet
+
+- Timestamps are parsed once into tz-aware Asia/Manila datetimes.
+- Numeric columns are stored as float32, weather labels as dictionaries.
+- City names are canonicalized (see cities.py) so they match flood reports.
+- Months already in the store are skipped, so adding a new month never
+  rewrites old partitions.
+
+Readers get partition pruning on city/month and row-group statistics
+pushdown on the time range via `read_weather`.
+
+Usage:
+    python -m production_model.weather_store [--overwrite]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .cities import canonical_city
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+RAW_DIR = os.path.join(ROOT_DIR, "data", "raw", "weather-monthly")
+STORE_DIR = os.path.join(ROOT_DIR, "data", "processed", "weather")
+
+LOCAL_TZ = "Asia/Manila"
+
+FLOAT_COLUMNS = [
+    "visibility", "main.temp", "main.feels_like", "main.temp_min", "main.temp_max",
+    "main.pressure", "main.humidity", "main.sea_level", "main.grnd_level",
+    "wind.speed", "wind.deg", "wind.gust", "clouds.all", "rain1h",
+]
+TIME_COLUMNS = ["datetime", "sys.sunrise", "sys.sunset"]
+LABEL_COLUMNS = ["weather.main", "weather.description"]
+
+
+# pyarrow is imported by the functions that write or scan the store, so
+# importing this module (e.g. via feature_store) stays cheap
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(
+        pa.schema([("month", pa.int32()), ("city", pa.string())]), flavor="hive"
+    )
+
+
+def parse_raw_month(csv_path):
+    """Read one raw monthly CSV into a typed DataFrame with a canonical `city`."""
+    df = pd.read_csv(csv_path)
+    df = df.rename(columns={"rain.1h": "rain1h", "city_name": "city"})
+
+    for col in TIME_COLUMNS:
+        df[col] = pd.to_datetime(df[col], utc=True).dt.tz_convert(LOCAL_TZ)
+    # OpenWeather omits rain when none fell
+    df["rain1h"] = df["rain1h"].fillna(0.0)
+    for col in FLOAT_COLUMNS:
+        df[col] = df[col].astype(np.float32)
+    df["city"] = df["city"].map(canonical_city)
+    return df[TIME_COLUMNS + FLOAT_COLUMNS + LABEL_COLUMNS + ["city"]]
+
+
+def _month_dir(store_dir, month):
+    return os.path.join(store_dir, f"month={month}")
+
+
+def available_months(store_dir=STORE_DIR):
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(
+        int(name.split("=", 1)[1]) for name in os.listdir(store_dir)
+        if name.startswith("month=") and os.path.exists(os.path.join(store_dir, name, "_SUCCESS"))
+    )
+
+
+def ingest_month(csv_path, store_dir=STORE_DIR, overwrite=False):
+    """
+    Write one month into the store. The month is built in a temp directory
+    and renamed into place, so readers never see a half-written partition.
+    Returns the number of rows written (0 if the month was skipped).
+    """
+    month = int(os.path.splitext(os.path.basename(csv_path))[0])
+    target = _month_dir(store_dir, month)
+    if month in available_months(store_dir) and not overwrite:
+        return 0
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = parse_raw_month(csv_path)
+    os.makedirs(store_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".month={month}-", dir=store_dir)
+    try:
+        for city, part in df.groupby("city", sort=True):
+            city_dir = os.path.join(staging, f"city={city}")
+            os.makedirs(city_dir)
+            table = pa.Table.from_pandas(
+                part.drop(columns="city").sort_values("datetime"), preserve_index=False
+            )
+            for col in LABEL_COLUMNS:
+                idx = table.schema.get_field_index(col)
+                table = table.set_column(idx, col, table[col].dictionary_encode())
+            pq.write_table(table, os.path.join(city_dir, "part-0.parquet"), row_group_size=2048)
+        open(os.path.join(staging, "_SUCCESS"), "w").close()
+
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    print(f"[weather_store] Ingested {month}: {len(df)} rows, {df['city'].nunique()} cities.")
+    return len(df)
+
+
+def ingest_directory(raw_dir=RAW_DIR, store_dir=STORE_DIR, overwrite=False):
+    """Ingest every YYYYMM.csv in raw_dir that is not in the store yet."""
+    written = {}
+    for csv_path in sorted(glob.glob(os.path.join(raw_dir, "[0-9]" * 6 + ".csv"))):
+        rows = ingest_month(csv_path, store_dir, overwrite=overwrite)
+        if rows:
+            written[os.path.basename(csv_path)] = rows
+    if not written:
+        print("[weather_store] Store is up to date.")
+    return written
+
+
+def read_weather(store_dir=STORE_DIR, cities=None, start=None, end=None, columns=None):
+    """
+    Load weather rows, optionally restricted to some cities and to
+    start <= datetime < end. City and month filters prune whole partitions;
+    the time range is pushed down to Parquet row-group statistics.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if not available_months(store_dir):
+        return pd.DataFrame()
+    # Staging directories (".month=...") and markers ("_SUCCESS") are skipped
+    # by pyarrow's default ignore_prefixes.
+    dataset = ds.dataset(store_dir, format="parquet", partitioning=_partitioning())
+
+    expr = None
+
+    def _and(e):
+        return e if expr is None else expr & e
+
+    if cities is not None:
+        cities = [canonical_city(c) for c in ([cities] if isinstance(cities, str) else cities)]
+        expr = _and(ds.field("city").isin(cities))
+    if start is not None:
+        start = pd.Timestamp(start)
+        start = start.tz_localize(LOCAL_TZ) if start.tzinfo is None else start
+        expr = _and(ds.field("month") >= int(start.tz_convert(LOCAL_TZ).strftime("%Y%m")))
+        expr = _and(ds.field("datetime") >= pa.scalar(start, type=pa.timestamp("ns", tz=LOCAL_TZ)))
+    if end is not None:
+        end = pd.Timestamp(end)
+        end = end.tz_localize(LOCAL_TZ) if end.tzinfo is None else end
+        expr = _and(ds.field("month") <= int(end.tz_convert(LOCAL_TZ).strftime("%Y%m")))
+        expr = _and(ds.field("datetime") < pa.scalar(end, type=pa.timestamp("ns", tz=LOCAL_TZ)))
+
+    if columns is not None:
+        columns = list(dict.fromkeys(list(columns) + ["city", "datetime"]))
+    table = dataset.to_table(filter=expr, columns=columns)
+    df = table.to_pandas()
+    if "city" in df.columns:
+        df["city"] = df["city"].astype("category")
+    return df.sort_values(["city", "datetime"], kind="stable").reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the partitioned weather store.")
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--overwrite", action="store_true", help="rebuild months already stored")
+    args = parser.parse_args()
+    ingest_directory(args.raw_dir, args.store_dir, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()